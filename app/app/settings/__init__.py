@@ -0,0 +1,2 @@
+# development settings, production uses app.settings.prod
+from .base import *  # noqa
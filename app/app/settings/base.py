@@ -0,0 +1,287 @@
+"""
+Django settings for app project.
+
+Generated by 'django-admin startproject' using Django 2.2.16.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/2.2/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/2.2/ref/settings/
+"""
+
+import os
+
+# Build paths inside the project like this: os.path.join(BASE_DIR, ...)
+BASE_DIR = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+
+# Quick-start development settings - unsuitable for production
+# See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = "w!vejh3yph%o3%0cdym8h5dd#mkue%@&c6d1slxgjax8821*_z"
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = True
+
+ALLOWED_HOSTS = []
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    "django.contrib.admin",
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "django.contrib.sessions",
+    "django.contrib.messages",
+    "django.contrib.staticfiles",
+    "django.contrib.postgres",
+    "rest_framework",
+    "rest_framework.authtoken",
+    "core",
+    "user",
+    "shop",
+]
+
+MIDDLEWARE = [
+    "django.middleware.security.SecurityMiddleware",
+    "core.middleware.CompressionMiddleware",
+    "django.middleware.http.ConditionalGetMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "shop.middleware.CurrentShopMiddleware",
+    "core.middleware.ReplicaMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+]
+
+ROOT_URLCONF = "app.urls"
+
+TEMPLATES = [
+    {
+        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "DIRS": [],
+        "APP_DIRS": True,
+        "OPTIONS": {
+            "context_processors": [
+                "django.template.context_processors.debug",
+                "django.template.context_processors.request",
+                "django.contrib.auth.context_processors.auth",
+                "django.contrib.messages.context_processors.messages",
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = "app.wsgi.application"
+CORS_ORIGIN_ALLOW_ALL = True
+CORS_ALLOW_CREDENTIALS = True
+
+
+# Database
+# https://docs.djangoproject.com/en/2.2/ref/settings/#databases
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.postgresql",
+        "HOST": os.environ.get("DB_HOST"),
+        "NAME": os.environ.get("DB_NAME"),
+        "USER": os.environ.get("DB_USER"),
+        "PASSWORD": os.environ.get("DB_PASS"),
+        # seconds a connection is reused across requests, 0 closes it every time
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", 0)),
+    }
+}
+
+# Read replicas, comma separated hosts of streaming replicas of the default
+# database. Reads of the views marked with read_from_replica go to them, see
+# core.routers
+DATABASE_REPLICAS = []
+
+for index, host in enumerate(os.environ.get("DB_REPLICA_HOSTS", "").split(",")):
+    if host.strip():
+        alias = f"replica_{index}"
+        DATABASES[alias] = dict(
+            DATABASES["default"], HOST=host.strip(), TEST={"MIRROR": "default"}
+        )
+        DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["core.routers.ReplicaRouter"]
+
+# Seconds a client reads from the primary after a write, replicas may lag
+REPLICA_PIN_SECONDS = int(os.environ.get("DB_REPLICA_PIN_SECONDS", 10))
+
+# Password validation
+# https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.MinimumLengthValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.CommonPasswordValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.NumericPasswordValidator",
+    },
+]
+
+
+# Password hashing
+# PASSWORD_HASHER selects a profile: its first hasher hashes new passwords,
+# the others still verify existing hashes, which are upgraded on next login.
+# argon2 uses the argon2-cffi package and bcrypt the bcrypt package.
+# Compare the costs with scripts/bench_login.py before changing them.
+
+PASSWORD_HASHER_PROFILES = {
+    "pbkdf2": [
+        "core.hashers.TunedPBKDF2PasswordHasher",
+        "core.hashers.TunedArgon2PasswordHasher",
+        "core.hashers.TunedBCryptSHA256PasswordHasher",
+    ],
+    "argon2": [
+        "core.hashers.TunedArgon2PasswordHasher",
+        "core.hashers.TunedPBKDF2PasswordHasher",
+        "core.hashers.TunedBCryptSHA256PasswordHasher",
+    ],
+    "bcrypt": [
+        "core.hashers.TunedBCryptSHA256PasswordHasher",
+        "core.hashers.TunedPBKDF2PasswordHasher",
+        "core.hashers.TunedArgon2PasswordHasher",
+    ],
+}
+PASSWORD_HASHERS = PASSWORD_HASHER_PROFILES[os.environ.get("PASSWORD_HASHER", "pbkdf2")]
+PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get("PASSWORD_PBKDF2_ITERATIONS", 150000))
+PASSWORD_ARGON2_TIME_COST = int(os.environ.get("PASSWORD_ARGON2_TIME_COST", 2))
+PASSWORD_ARGON2_MEMORY_COST = int(os.environ.get("PASSWORD_ARGON2_MEMORY_COST", 512))
+PASSWORD_ARGON2_PARALLELISM = int(os.environ.get("PASSWORD_ARGON2_PARALLELISM", 1))
+PASSWORD_BCRYPT_ROUNDS = int(os.environ.get("PASSWORD_BCRYPT_ROUNDS", 10))
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/2.2/topics/i18n/
+
+LANGUAGE_CODE = "en-us"
+
+TIME_ZONE = "UTC"
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/2.2/howto/static-files/
+
+STATIC_URL = "/static/"
+MEDIA_URL = "/media/"
+
+MEDIA_ROOT = "/vol/web/media"
+STATIC_ROOT = "/vol/web/static"
+
+# Files of background jobs, outside MEDIA_ROOT so they are never served as
+# media. Exports are downloaded from the job endpoint, which sends them with
+# MEDIA_SERVING under JOB_FILES_ACCEL_PREFIX.
+JOB_FILES_ROOT = "/vol/web/private"
+JOB_FILES_ACCEL_PREFIX = "/protected-jobs/"
+
+AUTH_USER_MODEL = "core.User"
+
+# Uploads bigger than this are streamed to a temporary file instead of memory
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
+
+# Limits and variants of vendor transaction images
+TRANSACTION_IMAGE_MAX_BYTES = 8 * 1024 * 1024
+TRANSACTION_IMAGE_MAX_DIMENSION = 6000
+TRANSACTION_THUMBNAIL_SIZE = (320, 320)
+TRANSACTION_WEBP_SIZE = (1600, 1600)
+
+# Lifetime in seconds of the signed access tokens and of the refresh tokens
+ACCESS_TOKEN_LIFETIME = int(os.environ.get("ACCESS_TOKEN_LIFETIME", 15 * 60))
+REFRESH_TOKEN_LIFETIME = int(os.environ.get("REFRESH_TOKEN_LIFETIME", 24 * 60 * 60))
+
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    # per process on purpose, login floods are refused before any hashing
+    "ratelimit": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "ratelimit",
+    },
+}
+
+# Sliding window limits of login attempts: (attempts, window in seconds)
+LOGIN_RATE_PER_USERNAME = (10, 60)
+LOGIN_RATE_PER_IP = (120, 60)
+
+# Monthly partitioning of the ordered items and bill tables, Postgres 12+ only.
+# The migration converts the tables when enabled, "partitions" keeps them up.
+PARTITION_TABLES = os.environ.get("DB_PARTITION_TABLES") == "1"
+PARTITION_SHOP_BUCKETS = int(os.environ.get("DB_PARTITION_SHOP_BUCKETS", 0))
+PARTITION_MONTHS_AHEAD = 3
+# detaching is opt-in, 0 keeps every partition attached
+PARTITION_KEEP_MONTHS = int(os.environ.get("DB_PARTITION_KEEP_MONTHS", 0))
+
+# Settled transactions older than this many days are moved to the archive
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", 365))
+
+# Most results returned by the product, customer and vendor search
+SEARCH_RESULTS_LIMIT = 25
+
+# Seconds the code to product map of a shop stays cached, see core.codes
+PRODUCT_CODES_TIMEOUT = 60 * 60
+
+# Seconds the shop memberships of a user stay cached, see core.memberships
+SHOP_MEMBERSHIPS_TIMEOUT = 5 * 60
+
+# Seconds the cross shop report of an owner stays cached, see shop.reports
+OWNER_REPORT_TIMEOUT = 5 * 60
+
+# Render and parse JSON with orjson instead of the json module
+API_ORJSON = os.environ.get("API_ORJSON") == "1"
+
+REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": [
+        "core.renderers.ORJSONRenderer"
+        if API_ORJSON
+        else "rest_framework.renderers.JSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "core.renderers.ORJSONParser"
+        if API_ORJSON
+        else "rest_framework.parsers.JSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+}
+
+# Response compression, see core.middleware.CompressionMiddleware. Brotli is
+# used when the brotli package is installed and the client accepts it.
+COMPRESS_MIN_SIZE = 1024
+COMPRESS_BROTLI_QUALITY = 5
+COMPRESS_CONTENT_TYPES = (
+    "application/json",
+    "application/msgpack",
+    "text/csv",
+    "text/html",
+    "text/plain",
+)
+
+# How /media/ files are sent: "django" streams them from python (development),
+# "x-accel-redirect" (nginx) and "x-sendfile" (apache) hand them to the front
+# server, which sends MEDIA_ROOT files under MEDIA_ACCEL_PREFIX itself.
+MEDIA_SERVING = os.environ.get("MEDIA_SERVING", "django")
+MEDIA_ACCEL_PREFIX = "/protected-media/"
+# uploads have content hashed names, they never change
+MEDIA_CACHE_SECONDS = 365 * 24 * 60 * 60
@@ -0,0 +1,40 @@
+"""
+Production settings, served by gunicorn (see gunicorn.conf.py).
+
+Select them with DJANGO_SETTINGS_MODULE=app.settings.prod
+"""
+
+import os
+
+from .base import *  # noqa
+
+SECRET_KEY = os.environ["DJANGO_SECRET_KEY"]
+
+DEBUG = False
+
+ALLOWED_HOSTS = os.environ.get("ALLOWED_HOSTS", "*").split(",")
+
+
+# Database
+# Keep connections open between requests instead of connecting per request.
+# Every gunicorn thread holds its own connection, so postgres max_connections
+# must be above workers * threads.
+
+for database in DATABASES.values():
+    database["CONN_MAX_AGE"] = int(os.environ.get("DB_CONN_MAX_AGE", 60))
+    database["OPTIONS"] = {
+        "connect_timeout": 5,
+        # TCP keepalives detect connections dropped by the server or the network
+        "keepalives": 1,
+        "keepalives_idle": 30,
+        "keepalives_interval": 10,
+        "keepalives_count": 3,
+    }
+
+
+# Static and media files
+# nginx sends both, see nginx/app.conf. Static files get content hashed names
+# from collectstatic so they can be cached forever.
+
+STATICFILES_STORAGE = "django.contrib.staticfiles.storage.ManifestStaticFilesStorage"
+MEDIA_SERVING = os.environ.get("MEDIA_SERVING", "x-accel-redirect")
@@ -37,6 +37,7 @@ class UserAdmin(BaseUserAdmin):
 
 admin.site.register(models.User, UserAdmin)
 admin.site.register(models.Shop)
+admin.site.register(models.ShopMembership)
 admin.site.register(models.Warehouse)
 admin.site.register(models.Product)
 admin.site.register(models.Customer)
@@ -0,0 +1,80 @@
+"""
+Per shop maps of product codes (barcodes, SKUs) to product ids.
+
+A scan resolves its code from the map kept in the cache, the map of a
+shop is built with one query on a miss and dropped whenever a code of the
+shop is written. Products fetched by primary key afterwards are checked
+against their code and codes missing from the map are looked up with one
+query on the shop and sku index, which rebuilds the map only when one of
+them exists. A map left stale by another process is never trusted, while
+mistyped or foreign codes leave the map of the shop alone.
+"""
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+
+
+def cache_key(shop_id):
+    return f"product-codes:{shop_id}"
+
+
+def product_codes(shop_id):
+    """Code to product id map of a shop"""
+    codes = cache.get(cache_key(shop_id))
+
+    if codes is None:
+        codes = dict(
+            apps.get_model("core", "Product")
+            .objects.filter(shop_id=shop_id, sku__isnull=False)
+            .values_list("sku", "id")
+        )
+        cache.set(cache_key(shop_id), codes, settings.PRODUCT_CODES_TIMEOUT)
+
+    return codes
+
+
+def invalidate(shop_ids):
+    keys = [cache_key(shop_id) for shop_id in set(shop_ids) if shop_id is not None]
+
+    if keys:
+        cache.delete_many(keys)
+
+
+def product_ids(shop_id, codes):
+    """Product ids of the codes, a code missing from the map but known rebuilds it"""
+    ids = product_codes(shop_id)
+    missing = [code for code in codes if code not in ids]
+
+    if (
+        missing
+        and apps.get_model("core", "Product")
+        .objects.filter(shop_id=shop_id, sku__in=missing)
+        .exists()
+    ):
+        invalidate([shop_id])
+        ids = product_codes(shop_id)
+
+    return {code: ids[code] for code in codes if code in ids}
+
+
+def find_products(shop, codes):
+    """Products of the shop by code, unknown codes are left out"""
+    model = apps.get_model("core", "Product")
+
+    for _ in range(2):
+        ids = product_ids(shop.pk, codes)
+        products = model.objects.for_shop(shop).in_bulk(list(ids.values()))
+        found = {
+            code: products[product_id]
+            for code, product_id in ids.items()
+            if product_id in products and products[product_id].sku == code
+        }
+
+        if len(found) == len(ids):
+            return found
+
+        # a product changed its code since the map was built
+        invalidate([shop.pk])
+
+    return found
@@ -0,0 +1,123 @@
+"""
+Domain events keeping the bills of transactions in line with their items.
+
+Changes of ordered items are queued per order and the bills are recomputed
+once per order when the database transaction commits, so ten lines inserted
+in one transaction cost a single bill update. Outside of a transaction the
+bills are recomputed right away.
+"""
+
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+_local = threading.local()
+
+
+def bill_model(order_model):
+    """Bill model of a transaction model, from its one to one relation"""
+    return order_model._meta.get_field(
+        f"{order_model._meta.model_name}bill"
+    ).related_model
+
+
+def orders_created(order_model, orders):
+    """Create the empty bills of new transactions"""
+    model = bill_model(order_model)
+    bills = [
+        model(order=order, shop_id=order.shop_id, paid=0)
+        for order in orders
+        if order.pk is not None
+    ]
+    shop_ids = {order.shop_id for order in orders if order.pk is None}
+
+    if shop_ids:
+        # the database returned no ids, the new ones are those without a bill
+        bills.extend(
+            model(order_id=order_id, shop_id=shop_id, paid=0)
+            for order_id, shop_id in order_model.objects.filter(
+                shop_id__in=shop_ids,
+                **{f"{order_model._meta.model_name}bill__isnull": True},
+            ).values_list("pk", "shop_id")
+        )
+
+    if len(bills) == 1:
+        # a single save sets the primary key on every database
+        bills[0].save()
+    elif bills:
+        model.objects.bulk_create(bills)
+
+
+def recompute_bills(items_model, order_ids):
+    """Set bill and due of the orders from their items, in one query"""
+    order_model = items_model._meta.get_field("order").related_model
+    total = Coalesce(
+        Subquery(
+            items_model.objects.filter(order=OuterRef("order"))
+            .values("order")
+            .annotate(total=Sum("bill"))
+            .values("total")[:1]
+        ),
+        Value(0),
+    )
+
+    bill_model(order_model).objects.filter(order__in=order_ids).update(
+        bill=total,
+        due=Greatest(total - F("paid"), Value(0)),
+        modified_timestamp=timezone.now(),
+    )
+
+
+class PendingBills(defaultdict):
+    """Order ids whose bills must be recomputed, per ordered items model"""
+
+    def __init__(self):
+        super().__init__(set)
+
+    def run(self):
+        while self:
+            items_model, order_ids = self.popitem()
+            recompute_bills(items_model, order_ids)
+
+
+def pending_bills():
+    """Bills queued in the current transaction, scheduled on first use"""
+    connection = transaction.get_connection()
+    pending = getattr(_local, "pending", None)
+
+    # callbacks of rolled back transactions or savepoints are dropped, a
+    # batch whose run is not scheduled anymore is replaced
+    if pending is None or not any(
+        getattr(callback, "__self__", None) is pending
+        for sids, callback in connection.run_on_commit
+    ):
+        pending = _local.pending = PendingBills()
+        transaction.on_commit(pending.run)
+
+    return pending
+
+
+def order_items_changed(items_model, order_ids):
+    """Queue the bills of the orders whose items were written"""
+    order_ids = {order_id for order_id in order_ids if order_id is not None}
+
+    if not order_ids:
+        return
+
+    if not transaction.get_connection().in_atomic_block:
+        recompute_bills(items_model, order_ids)
+        return
+
+    pending_bills()[items_model].update(order_ids)
+
+
+def flush():
+    """Recompute the queued bills now, to read them before the commit"""
+    pending = getattr(_local, "pending", None)
+
+    if pending is not None:
+        pending.run()
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class TunedPBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """PBKDF2 with the iteration count of PASSWORD_PBKDF2_ITERATIONS"""
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+class TunedArgon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """Argon2 with the costs of PASSWORD_ARGON2_* settings"""
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class TunedBCryptSHA256PasswordHasher(hashers.BCryptSHA256PasswordHasher):
+    """bcrypt with the rounds of PASSWORD_BCRYPT_ROUNDS"""
+
+    @property
+    def rounds(self):
+        return settings.PASSWORD_BCRYPT_ROUNDS
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import models
+from shop.archive import ARCHIVES, ARCHIVE_BATCH_SIZE, archive_transactions
+
+
+class Command(BaseCommand):
+    """Django command to move settled transactions to the archive tables"""
+
+    help = "Archive fully paid transactions older than the retention window"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--kind", choices=sorted(ARCHIVES), action="append", dest="kinds"
+        )
+        parser.add_argument("--days", type=int, default=settings.ARCHIVE_AFTER_DAYS)
+        parser.add_argument("--shop", type=int)
+        parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        shop = None
+
+        if options["shop"] is not None:
+            try:
+                shop = models.Shop.objects.get(pk=options["shop"])
+            except models.Shop.DoesNotExist:
+                raise CommandError(f"Shop {options['shop']} does not exist")
+
+        for kind in options["kinds"] or sorted(ARCHIVES):
+            archived = archive_transactions(
+                kind, options["days"], shop=shop, batch_size=options["batch_size"]
+            )
+            self.stdout.write(
+                self.style.SUCCESS(f"Archived {archived} {kind} transactions")
+            )
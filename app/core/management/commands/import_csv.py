@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import models
+from shop.importers import IMPORTERS, IMPORT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    """Django command to bulk import products or customers of a shop"""
+
+    help = "Upsert products or customers of a shop from a csv file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(IMPORTERS))
+        parser.add_argument("path")
+        parser.add_argument("--shop", type=int, required=True)
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            shop = models.Shop.objects.get(pk=options["shop"])
+        except models.Shop.DoesNotExist:
+            raise CommandError(f"Shop {options['shop']} does not exist")
+
+        importer = IMPORTERS[options["kind"]](shop, batch_size=options["batch_size"])
+
+        with open(options["path"], newline="", encoding="utf-8-sig") as lines:
+            report = importer.run(lines)
+
+        for error in report["errors"]:
+            self.stdout.write(
+                self.style.WARNING(f"line {error['line']}: {error['errors']}")
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {report['created']}, updated {report['updated']}, "
+                f"failed {report['failed']}"
+            )
+        )
@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import partitions
+
+
+class Command(BaseCommand):
+    """Django command to maintain the monthly partitions of the big tables"""
+
+    help = (
+        "Create the partitions of the coming months and detach the old ones, "
+        "run it daily"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--convert",
+            action="store_true",
+            help="Partition the tables which are not partitioned yet",
+        )
+        parser.add_argument(
+            "--months-ahead", type=int, default=settings.PARTITION_MONTHS_AHEAD
+        )
+        parser.add_argument(
+            "--shop-buckets", type=int, default=settings.PARTITION_SHOP_BUCKETS
+        )
+        parser.add_argument(
+            "--keep-months",
+            type=int,
+            default=settings.PARTITION_KEEP_MONTHS,
+            help="Detach archived partitions older than this, 0 keeps everything",
+        )
+
+    def handle(self, *args, **options):
+        if not partitions.supported():
+            raise CommandError("Partitioning needs PostgreSQL 12 or newer")
+
+        if options["convert"]:
+            for model in partitions.PARTITIONED_MODELS:
+                table = model._meta.db_table
+
+                if partitions.is_partitioned(table):
+                    continue
+
+                self.stdout.write(f"Partitioning {table}...")
+                partitions.convert(
+                    model, options["shop_buckets"], options["months_ahead"]
+                )
+
+        created = partitions.create_future_partitions(
+            options["months_ahead"], options["shop_buckets"]
+        )
+        for name in created:
+            self.stdout.write(f"Created {name}")
+
+        if options["keep_months"]:
+            for name in partitions.detach_old_partitions(options["keep_months"]):
+                self.stdout.write(f"Detached {name} to {partitions.ARCHIVE_SCHEMA}")
+
+        self.stdout.write(self.style.SUCCESS("Partitions are up to date"))
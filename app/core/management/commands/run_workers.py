@@ -0,0 +1,66 @@
+import multiprocessing
+import os
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from shop import jobs
+
+
+def worker(poll_interval, burst):
+    """Entry point of a worker process"""
+    # every process must open its own database connection
+    connections.close_all()
+    jobs.work(poll_interval=poll_interval, burst=burst)
+
+
+class Command(BaseCommand):
+    """Django command to run background jobs from the database queue"""
+
+    help = "Run a pool of worker processes executing queued jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--poll-interval", type=float, default=1.0)
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit once the queue is empty instead of polling forever",
+        )
+
+    def handle(self, *args, **options):
+        requeued, failed = jobs.requeue_stale()
+
+        if requeued:
+            self.stdout.write(self.style.WARNING(f"Requeued {requeued} stale jobs"))
+        if failed:
+            self.stdout.write(
+                self.style.WARNING(f"Failed {failed} stale jobs out of attempts")
+            )
+
+        processes = max(options["processes"], 1)
+        self.stdout.write(f"Starting {processes} workers")
+
+        if processes == 1:
+            jobs.work(options["poll_interval"], options["burst"])
+            return
+
+        connections.close_all()
+        pool = [
+            multiprocessing.Process(
+                target=worker, args=(options["poll_interval"], options["burst"])
+            )
+            for _ in range(processes)
+        ]
+
+        for process in pool:
+            process.start()
+
+        try:
+            for process in pool:
+                process.join()
+        except KeyboardInterrupt:
+            for process in pool:
+                process.terminate()
+
+        self.stdout.write(self.style.SUCCESS("Workers stopped"))
@@ -0,0 +1,45 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_databases, teardown_databases
+
+from shop.stress import StressRun
+
+
+class Command(BaseCommand):
+    """Django command to stress the stock and money writes concurrently"""
+
+    help = (
+        "Fire concurrent sales, purchases, moves and payments at a throwaway "
+        "test database, check invariants"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--operations", type=int, default=500)
+        parser.add_argument("--products", type=int, default=5)
+        parser.add_argument("--seed", type=int)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql" and options["threads"] > 1:
+            raise CommandError("Concurrent runs need PostgreSQL, use --threads 1")
+
+        # like the test runner: never write to the configured databases
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            report = StressRun(
+                threads=options["threads"],
+                operations=options["operations"],
+                products=options["products"],
+                seed=options["seed"],
+            ).run()
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+        self.stdout.write(json.dumps(report, indent=2))
+
+        if report["violations"]:
+            raise CommandError(f"{len(report['violations'])} invariants broken")
+
+        self.stdout.write(self.style.SUCCESS("Invariants hold"))
@@ -0,0 +1,95 @@
+"""
+Per user maps of the shops a user works for to the role held there.
+
+The map of a user is cached, so picking the active shop of a request costs
+no query for users of one shop or of many. It is built on a miss and
+dropped whenever a membership of the user is written. The membership of
+the picked shop is still read from the database, a stale map can only
+lead to a rebuild, never to a shop the user isn't a member of.
+"""
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+
+
+def cache_key(user_id):
+    return f"shop-memberships:{user_id}"
+
+
+def load(user_id):
+    """Memberships of a user by shop id, with their shops, caching the map"""
+    memberships = {
+        membership.shop_id: membership
+        for membership in apps.get_model("core", "ShopMembership")
+        .objects.select_related("shop")
+        .filter(user_id=user_id)
+    }
+    cache.set(
+        cache_key(user_id),
+        {shop_id: membership.role for shop_id, membership in memberships.items()},
+        settings.SHOP_MEMBERSHIPS_TIMEOUT,
+    )
+
+    return memberships
+
+
+def shop_roles(user_id):
+    """Shop id to role map of a user"""
+    roles = cache.get(cache_key(user_id))
+
+    if roles is None:
+        roles = {
+            shop_id: membership.role for shop_id, membership in load(user_id).items()
+        }
+
+    return roles
+
+
+def invalidate(user_ids):
+    keys = [cache_key(user_id) for user_id in set(user_ids) if user_id is not None]
+
+    if keys:
+        cache.delete_many(keys)
+
+
+def pick_shop(roles, shop_id=None, default=None):
+    """Id of the active shop: the asked one, else the default or the first one"""
+    if shop_id is not None:
+        return shop_id if shop_id in roles else None
+
+    if default in roles:
+        return default
+
+    return min(roles, default=None)
+
+
+def active_membership(user_id, shop_id=None, default=None):
+    """
+    Membership of the user in the active shop, with its shop, None if none.
+
+    One indexed query either way: all memberships of the user when the map
+    isn't cached, else the membership of the picked shop. A shop missing
+    from the cached map or a membership gone since it was built reloads it.
+    """
+    roles = cache.get(cache_key(user_id))
+
+    if roles is not None:
+        active = pick_shop(roles, shop_id, default)
+
+        if active is None and shop_id is None:
+            # a user without memberships
+            return None
+
+        if active is not None:
+            membership = (
+                apps.get_model("core", "ShopMembership")
+                .objects.select_related("shop")
+                .filter(user_id=user_id, shop_id=active)
+                .first()
+            )
+            if membership is not None:
+                return membership
+
+    memberships = load(user_id)
+    return memberships.get(pick_shop(memberships, shop_id, default))
@@ -0,0 +1,174 @@
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+
+from core.routers import replica_reads
+
+try:
+    import brotli
+except ImportError:  # optional, responses are gzipped only without it
+    brotli = None
+
+# cookie set after a write, its client reads from the primary until it expires
+REPLICA_PIN_COOKIE = "primary_pin"
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class ReplicaMiddleware:
+    """
+    Run safe requests of views marked with read_from_replica on a replica.
+
+    Clients are pinned to the primary for REPLICA_PIN_SECONDS after any
+    write, so they read their own writes despite the replication lag.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                REPLICA_PIN_COOKIE,
+                "1",
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, "cls", None)
+
+        if (
+            request.method in SAFE_METHODS
+            and getattr(view_class, "read_from_replica", False)
+            and REPLICA_PIN_COOKIE not in request.COOKIES
+        ):
+            with replica_reads():
+                response = view_func(request, *view_args, **view_kwargs)
+
+                if hasattr(response, "render"):
+                    # lazy responses are rendered while reading the replica
+                    response = response.render()
+
+            return response
+
+        return None
+
+
+ACCEPT_ENCODING = re.compile(r"\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?")
+
+
+def accepted_encodings(header):
+    """Encodings of an Accept-Encoding header, with a non zero quality"""
+    accepted = set()
+
+    for part in header.split(","):
+        match = ACCEPT_ENCODING.match(part)
+        if match and float(match.group(2) or 1) > 0:
+            accepted.add(match.group(1).lower())
+
+    return accepted
+
+
+def brotli_sequence(sequence):
+    compressor = brotli.Compressor(quality=settings.COMPRESS_BROTLI_QUALITY)
+
+    for chunk in sequence:
+        data = compressor.process(chunk)
+        # flush every chunk, clients see the rows as they are streamed
+        data += compressor.flush()
+        if data:
+            yield data
+
+    yield compressor.finish()
+
+
+ENCODERS = {
+    "br": (
+        lambda content: brotli.compress(
+            content, quality=settings.COMPRESS_BROTLI_QUALITY
+        ),
+        brotli_sequence,
+    ),
+    "gzip": (compress_string, compress_sequence),
+}
+
+
+class CompressionMiddleware:
+    """
+    Compress GET responses of compressible types with brotli or gzip.
+
+    Responses smaller than COMPRESS_MIN_SIZE, already encoded ones and other
+    content types, like the images under MEDIA_URL, are sent as they are.
+    Streaming responses are compressed chunk by chunk. Only safe requests
+    are compressed, so the secrets of the token endpoints aren't.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def encoding(self, request, response):
+        """Encoding to compress the response with, None to leave it"""
+        content_type = response.get("Content-Type", "").split(";")[0].strip()
+
+        if (
+            request.method not in ("GET", "HEAD")
+            or response.has_header("Content-Encoding")
+            or content_type not in settings.COMPRESS_CONTENT_TYPES
+        ):
+            return None
+
+        if (
+            not response.streaming
+            and len(response.content) < settings.COMPRESS_MIN_SIZE
+        ):
+            return None
+
+        accepted = accepted_encodings(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+
+        if brotli is not None and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        # compressible or not, the body depends on the accepted encodings
+        if (
+            response.get("Content-Type", "").split(";")[0]
+            in settings.COMPRESS_CONTENT_TYPES
+        ):
+            patch_vary_headers(response, ("Accept-Encoding",))
+
+        encoding = self.encoding(request, response)
+        if encoding is None:
+            return response
+
+        compress, compress_stream = ENCODERS[encoding]
+
+        if response.streaming:
+            response.streaming_content = compress_stream(response.streaming_content)
+            del response["Content-Length"]
+        else:
+            compressed = compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response["Content-Length"] = str(len(response.content))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            # the compressed body differs, its etag can only be weak
+            response["ETag"] = "W/" + etag
+
+        response["Content-Encoding"] = encoding
+        return response
@@ -0,0 +1,40 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_customerordereditems_custom_selling_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=64)),
+                ('payload', models.TextField(default='{}')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=3)),
+                ('result', models.TextField(blank=True)),
+                ('error', models.TextField(blank=True)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('started_timestamp', models.DateTimeField(null=True)),
+                ('finished_timestamp', models.DateTimeField(null=True)),
+                ('created_timestamp', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('modified_timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('shop', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='core.Shop')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'run_after'], name='core_job_status_df1a33_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:18
+
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendorordereditems',
+            name='image_webp',
+            field=models.ImageField(editable=False, null=True, upload_to=core.models.transaction_thumbnail_file_path),
+        ),
+        migrations.AddField(
+            model_name='vendorordereditems',
+            name='thumbnail',
+            field=models.ImageField(editable=False, null=True, upload_to=core.models.transaction_thumbnail_file_path),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_vendorordereditems_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customertrasnscationbill',
+            index=models.Index(condition=models.Q(due__gt=0), fields=['shop', 'created_timestamp'], name='customer_bill_open_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendortrasnscationbill',
+            index=models.Index(condition=models.Q(due__gt=0), fields=['shop', 'created_timestamp'], name='vendor_bill_open_due_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:19
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_open_due_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RefreshToken',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key_hash', models.CharField(max_length=64, unique=True)),
+                ('expires', models.DateTimeField()),
+                ('revoked', models.BooleanField(default=False)),
+                ('created_timestamp', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('modified_timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def partition_tables(apps, schema_editor):
+    """Opt-in, the tables are locked while their rows are copied"""
+    from core import partitions
+
+    if not settings.PARTITION_TABLES or not partitions.supported():
+        return
+
+    for model in partitions.PARTITIONED_MODELS:
+        if not partitions.is_partitioned(model._meta.db_table):
+            partitions.convert(
+                model, settings.PARTITION_SHOP_BUCKETS, settings.PARTITION_MONTHS_AHEAD
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0024_refreshtoken"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_tables, migrations.RunPython.noop),
+    ]
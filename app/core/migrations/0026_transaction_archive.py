@@ -0,0 +1,51 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_partition_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTransaction',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('customer', 'Customer'), ('vendor', 'Vendor')], max_length=10)),
+                ('order_id', models.PositiveIntegerField()),
+                ('party_id', models.PositiveIntegerField(null=True)),
+                ('bill', models.PositiveIntegerField(default=0)),
+                ('paid', models.PositiveIntegerField(default=0)),
+                ('data', models.BinaryField()),
+                ('created_timestamp', models.DateTimeField()),
+                ('archived_timestamp', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.Shop')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyBillRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('sell', 'Sell'), ('purchase', 'Purchase')], max_length=10)),
+                ('date', models.DateField()),
+                ('bill', models.PositiveIntegerField(default=0)),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.Shop')),
+            ],
+            options={
+                'unique_together': {('shop', 'kind', 'date')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedtransaction',
+            index=models.Index(fields=['shop', 'kind', 'created_timestamp'], name='core_archiv_shop_id_1400f3_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='archivedtransaction',
+            unique_together={('shop', 'kind', 'order_id')},
+        ),
+    ]
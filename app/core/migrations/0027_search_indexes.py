@@ -0,0 +1,61 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:35
+
+from django.db import migrations, models
+
+# (table, column) searched by shop.filters.TrigramSearchFilter
+SEARCHED_COLUMNS = (
+    ("core_product", "name"),
+    ("core_customer", "name"),
+    ("core_customer", "contact"),
+    ("core_vendor", "name"),
+    ("core_vendor", "contact"),
+)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """Postgres only: trigram indexes for fuzzy search, pattern ones for prefixes"""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table, column in SEARCHED_COLUMNS:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {table}_{column}_trgm "
+            f"ON {table} USING gin ({column} gin_trgm_ops)"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {table}_{column}_prefix "
+            f"ON {table} (UPPER({column}::text) text_pattern_ops)"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    for table, column in SEARCHED_COLUMNS:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {table}_{column}_trgm")
+        schema_editor.execute(f"DROP INDEX IF EXISTS {table}_{column}_prefix")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_transaction_archive'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['shop', 'name'], name='core_custom_shop_id_691d27_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['shop', 'name'], name='core_produc_shop_id_c66afc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendor',
+            index=models.Index(fields=['shop', 'name'], name='core_vendor_shop_id_f50950_idx'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='sku',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='product',
+            unique_together={('shop', 'sku')},
+        ),
+    ]
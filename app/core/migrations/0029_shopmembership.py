@@ -0,0 +1,63 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:51
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def add_memberships(apps, schema_editor):
+    """Owners of their shops, staff of the shops of the owner who created them"""
+    Shop = apps.get_model("core", "Shop")
+    User = apps.get_model("core", "User")
+    ShopMembership = apps.get_model("core", "ShopMembership")
+
+    memberships = [
+        ShopMembership(user_id=owner_id, shop_id=shop_id, role="owner")
+        for shop_id, owner_id in Shop.objects.filter(owner__isnull=False).values_list(
+            "id", "owner_id"
+        )
+    ]
+    staff = User.objects.filter(created_by__isnull=False).filter(
+        models.Q(is_manager=True) | models.Q(is_salesman=True)
+    )
+    for user_id, owner_id, is_manager in staff.values_list(
+        "id", "created_by_id", "is_manager"
+    ):
+        memberships.extend(
+            ShopMembership(
+                user_id=user_id,
+                shop_id=shop_id,
+                role="manager" if is_manager else "salesman",
+            )
+            for shop_id in Shop.objects.filter(owner_id=owner_id).values_list(
+                "id", flat=True
+            )
+        )
+
+    ShopMembership.objects.bulk_create(memberships, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_product_sku'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShopMembership',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('owner', 'Owner'), ('manager', 'Manager'), ('salesman', 'Salesman')], max_length=10)),
+                ('created_timestamp', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('modified_timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.Shop')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'shop')},
+            },
+        ),
+        migrations.RunPython(add_memberships, migrations.RunPython.noop),
+    ]
@@ -1,12 +1,12 @@
-import uuid
+import hashlib
 import os
 
 from django.db import models
 from django.conf import settings
-from django.dispatch import receiver
-from django.db.models import signals
 from django.utils import timezone
 
+from core import codes, events, memberships
+
 from django.contrib.auth.models import (
     AbstractBaseUser,
     PermissionsMixin,
@@ -14,14 +14,36 @@ from django.contrib.auth.models import (
 )
 
 
+def content_hashed_name(file, filename):
+    """
+    Name of a file after the sha256 of its content, keeping the extension.
+
+    A name never changes content, so the file can be cached forever.
+    """
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+
+    ext = filename.split(".")[-1]
+    return f"{digest.hexdigest()[:32]}.{ext}"
+
+
 def transaction_image_file_path(instance, filename):
     """Generate file path for new transaction image"""
-    ext = filename.split(".")[-1]
-    filename = f"{uuid.uuid4()}.{ext}"
+    filename = content_hashed_name(instance.image, filename)
 
     return os.path.join("uploads/transaction/", filename)
 
 
+def transaction_thumbnail_file_path(instance, filename):
+    """
+    Generate file path for the resized variants of a transaction image.
+
+    The variants are named after their content by shop.images.
+    """
+    return os.path.join("uploads/transaction/thumbnails/", filename)
+
+
 class UserManager(BaseUserManager):
     def create_user(self, username, password, **extra_kwargs):
         """Creates and saves an user"""
@@ -68,6 +90,119 @@ class User(AbstractBaseUser, PermissionsMixin):
         return self.name
 
 
+class RefreshToken(models.Model):
+    """Model for refresh tokens, only the hash of the token is stored"""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key_hash = models.CharField(max_length=64, unique=True)
+    expires = models.DateTimeField()
+    revoked = models.BooleanField(default=False)
+    created_timestamp = models.DateTimeField(default=timezone.now, editable=False)
+    modified_timestamp = models.DateTimeField(default=timezone.now)
+
+
+class ShopQuerySet(models.QuerySet):
+    """Queryset of a shop owned model"""
+
+    def for_shop(self, shop):
+        """Restricting the objects to the ones owned by the shop"""
+        return self.filter(shop=shop)
+
+
+class ShopManager(models.Manager.from_queryset(ShopQuerySet)):
+    """Manager of every model carrying a shop foreign key"""
+
+
+class TransactionQuerySet(ShopQuerySet):
+    """Queryset of transactions, creating the bills of new ones"""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        events.orders_created(self.model, objs)
+        return objs
+
+
+class TransactionManager(models.Manager.from_queryset(TransactionQuerySet)):
+    """Manager of customer and vendor transactions"""
+
+
+class OrderedItemsQuerySet(ShopQuerySet):
+    """Queryset of ordered items, batched writes also update the bills"""
+
+    def order_ids(self):
+        return set(self.values_list("order_id", flat=True))
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        events.order_items_changed(self.model, [obj.order_id for obj in objs])
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        super().bulk_update(objs, fields, *args, **kwargs)
+
+        if {"bill", "order"} & set(fields):
+            events.order_items_changed(self.model, [obj.order_id for obj in objs])
+
+    def update(self, **kwargs):
+        if not {"bill", "order", "order_id"} & set(kwargs):
+            return super().update(**kwargs)
+
+        order_ids = self.order_ids()
+        updated = super().update(**kwargs)
+
+        order = kwargs.get("order", kwargs.get("order_id"))
+        order_ids.add(getattr(order, "pk", order))
+        events.order_items_changed(self.model, order_ids)
+        return updated
+
+    def delete(self):
+        order_ids = self.order_ids()
+        deleted = super().delete()
+        events.order_items_changed(self.model, order_ids)
+        return deleted
+
+
+class OrderedItemsManager(models.Manager.from_queryset(OrderedItemsQuerySet)):
+    """Manager of customer and vendor ordered items"""
+
+
+class ProductQuerySet(ShopQuerySet):
+    """Queryset of products, writes of codes drop the code maps of the shops"""
+
+    def shop_ids(self):
+        return set(self.values_list("shop_id", flat=True))
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        codes.invalidate([obj.shop_id for obj in objs if obj.sku])
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        super().bulk_update(objs, fields, *args, **kwargs)
+
+        if "sku" in fields:
+            codes.invalidate([obj.shop_id for obj in objs])
+
+    def update(self, **kwargs):
+        if "sku" not in kwargs:
+            return super().update(**kwargs)
+
+        shop_ids = self.shop_ids()
+        updated = super().update(**kwargs)
+        codes.invalidate(shop_ids)
+        return updated
+
+    def delete(self):
+        shop_ids = self.shop_ids()
+        deleted = super().delete()
+        codes.invalidate(shop_ids)
+        return deleted
+
+
+class ProductManager(models.Manager.from_queryset(ProductQuerySet)):
+    """Manager of products"""
+
+
 class Shop(models.Model):
     """model for shop object"""
 
@@ -77,14 +212,81 @@ class Shop(models.Model):
     created_timestamp = models.DateTimeField(default=timezone.now, editable=False)
     modified_timestamp = models.DateTimeField(default=timezone.now)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_owner_id = instance.__dict__.get("owner_id")
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Make the owner a member of the shop, in place of the previous one"""
+        super().save(*args, **kwargs)
+        previous = getattr(self, "_loaded_owner_id", None)
+
+        if self.owner_id == previous:
+            return
+
+        if previous is not None:
+            ShopMembership.objects.filter(
+                user_id=previous, shop=self, role=ShopMembership.OWNER
+            ).delete()
+            memberships.invalidate([previous])
+
+        if self.owner_id:
+            ShopMembership.objects.update_or_create(
+                user_id=self.owner_id,
+                shop=self,
+                defaults={"role": ShopMembership.OWNER},
+            )
+
+        self._loaded_owner_id = self.owner_id
+
     def __str__(self):
         return self.name
 
 
+class ShopMembership(models.Model):
+    """Model for the role of a user in a shop, owners may have several shops"""
+
+    OWNER = "owner"
+    MANAGER = "manager"
+    SALESMAN = "salesman"
+
+    roles = (
+        (OWNER, "Owner"),
+        (MANAGER, "Manager"),
+        (SALESMAN, "Salesman"),
+    )
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE)
+    role = models.CharField(max_length=10, choices=roles)
+    created_timestamp = models.DateTimeField(default=timezone.now, editable=False)
+    modified_timestamp = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        # also the index of the lookups by user, see core.memberships
+        unique_together = ("user", "shop")
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        memberships.invalidate([self.user_id])
+
+    def delete(self, *args, **kwargs):
+        deleted = super().delete(*args, **kwargs)
+        memberships.invalidate([self.user_id])
+        return deleted
+
+    def __str__(self):
+        return f"{self.user_id} {self.role} of {self.shop_id}"
+
+
 class Product(models.Model):
     """Product model"""
 
     name = models.CharField(max_length=255)
+    # barcode or stock keeping unit, scanned at the checkout
+    sku = models.CharField(max_length=64, null=True, blank=True)
     shop = models.ForeignKey(Shop, on_delete=models.CASCADE)
     buying_price = models.PositiveIntegerField(default=0)
     avg_buying_price = models.PositiveIntegerField(default=0)
@@ -94,6 +296,35 @@ class Product(models.Model):
     created_timestamp = models.DateTimeField(default=timezone.now, editable=False)
     modified_timestamp = models.DateTimeField(default=timezone.now)
 
+    objects = ProductManager()
+
+    class Meta:
+        # also the index of the code lookups
+        unique_together = ("shop", "sku")
+        # prefix search of names, see shop.filters
+        indexes = [models.Index(fields=["shop", "name"])]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_sku = instance.__dict__.get("sku")
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Drop the code map of the shop when the code changed"""
+        super().save(*args, **kwargs)
+
+        if self.sku != getattr(self, "_loaded_sku", None):
+            codes.invalidate([self.shop_id])
+            self._loaded_sku = self.sku
+
+    def delete(self, *args, **kwargs):
+        deleted = super().delete(*args, **kwargs)
+
+        if self.sku:
+            codes.invalidate([self.shop_id])
+        return deleted
+
     def __str__(self):
         return self.name
 
@@ -106,6 +337,8 @@ class Warehouse(models.Model):
     created_timestamp = models.DateTimeField(default=timezone.now, editable=False)
     modified_timestamp = models.DateTimeField(default=timezone.now)
 
+    objects = ShopManager()
+
     def __str__(self):
         return self.name
 
@@ -120,6 +353,8 @@ class WareHouseProducts(models.Model):
     created_timestamp = models.DateTimeField(default=timezone.now, editable=False)
     modified_timestamp = models.DateTimeField(default=timezone.now)
 
+    objects = ShopManager()
+
     class Meta:
         unique_together = ("warehouse", "product")
 
@@ -133,6 +368,12 @@ class Customer(models.Model):
     created_timestamp = models.DateTimeField(default=timezone.now, editable=False)
     modified_timestamp = models.DateTimeField(default=timezone.now)
 
+    objects = ShopManager()
+
+    class Meta:
+        # prefix search of names, see shop.filters
+        indexes = [models.Index(fields=["shop", "name"])]
+
     def __str__(self):
         return self.name
 
@@ -146,6 +387,12 @@ class Vendor(models.Model):
     created_timestamp = models.DateTimeField(default=timezone.now, editable=False)
     modified_timestamp = models.DateTimeField(default=timezone.now)
 
+    objects = ShopManager()
+
+    class Meta:
+        # prefix search of names, see shop.filters
+        indexes = [models.Index(fields=["shop", "name"])]
+
     def __str__(self):
         return self.name
 
@@ -158,9 +405,19 @@ class CustomerTrasnscation(models.Model):
     created_timestamp = models.DateTimeField(default=timezone.now, editable=False)
     modified_timestamp = models.DateTimeField(default=timezone.now)
 
+    objects = TransactionManager()
+
     def __str__(self):
         return f"Trans {self.pk}---{self.shop}"
 
+    def save(self, *args, **kwargs):
+        """Auto create bill, when a Transaction is created"""
+        created = self._state.adding
+        super().save(*args, **kwargs)
+
+        if created:
+            events.orders_created(type(self), [self])
+
 
 class CustomerOrderedItems(models.Model):
     """Model for keeping customer ordered items"""
@@ -178,9 +435,22 @@ class CustomerOrderedItems(models.Model):
     created_timestamp = models.DateTimeField(default=timezone.now, editable=False)
     modified_timestamp = models.DateTimeField(default=timezone.now)
 
+    objects = OrderedItemsManager()
+
     class Meta:
         unique_together = ("order", "shop", "product")
 
+    def save(self, *args, **kwargs):
+        """Auto update bill, when the items of a Transaction change"""
+        super().save(*args, **kwargs)
+        events.order_items_changed(type(self), [self.order_id])
+
+    def delete(self, *args, **kwargs):
+        order_id = self.order_id
+        deleted = super().delete(*args, **kwargs)
+        events.order_items_changed(type(self), [order_id])
+        return deleted
+
 
 class CustomerTrasnscationBill(models.Model):
     """Model for tracking the bill of a transaction"""
@@ -196,36 +466,17 @@ class CustomerTrasnscationBill(models.Model):
     created_timestamp = models.DateTimeField(default=timezone.now, editable=False)
     modified_timestamp = models.DateTimeField(default=timezone.now)
 
+    objects = ShopManager()
 
-@receiver(signals.post_save, sender=CustomerTrasnscation)
-def create_customer_bill(sender, instance, created, **kwargs):
-    """Auto create bill, when customer creates a Transaction"""
-
-    if created:
-        CustomerTrasnscationBill.objects.create(
-            order=instance, paid=0, shop=instance.shop
-        )
-
-
-@receiver(signals.post_save, sender=CustomerOrderedItems)
-def update_customer_bill(sender, instance, created, **kwargs):
-    """Auto create bill, when customer creates a Transaction"""
-
-    if created:
-        bill_object = CustomerTrasnscationBill.objects.filter(order=instance.order)[0]
-
-        order_object = CustomerOrderedItems.objects.filter(order=instance.order)
-
-        bill = 0
-
-        for i in order_object:
-            bill += i.bill
-
-        if bill_object.due == 0:
-            bill_object.due = bill
-
-        bill_object.bill = bill
-        bill_object.save()
+    class Meta:
+        # open bills only, what due lists and ledgers read
+        indexes = [
+            models.Index(
+                fields=["shop", "created_timestamp"],
+                name="customer_bill_open_due_idx",
+                condition=models.Q(due__gt=0),
+            )
+        ]
 
 
 class VendorTrasnscation(models.Model):
@@ -236,9 +487,19 @@ class VendorTrasnscation(models.Model):
     created_timestamp = models.DateTimeField(default=timezone.now, editable=False)
     modified_timestamp = models.DateTimeField(default=timezone.now)
 
+    objects = TransactionManager()
+
     def __str__(self):
         return f"Trans {self.pk}---{self.shop}"
 
+    def save(self, *args, **kwargs):
+        """Auto create bill, when a Transaction is created"""
+        created = self._state.adding
+        super().save(*args, **kwargs)
+
+        if created:
+            events.orders_created(type(self), [self])
+
 
 class VendorOrderedItems(models.Model):
     """Model for keeping vendor ordered items"""
@@ -258,12 +519,31 @@ class VendorOrderedItems(models.Model):
     shop = models.ForeignKey(Shop, on_delete=models.CASCADE, null=True)
     bill = models.PositiveIntegerField(default=0)
     image = models.ImageField(null=True, upload_to=transaction_image_file_path)
+    thumbnail = models.ImageField(
+        null=True, editable=False, upload_to=transaction_thumbnail_file_path
+    )
+    image_webp = models.ImageField(
+        null=True, editable=False, upload_to=transaction_thumbnail_file_path
+    )
     created_timestamp = models.DateTimeField(default=timezone.now, editable=False)
     modified_timestamp = models.DateTimeField(default=timezone.now)
 
+    objects = OrderedItemsManager()
+
     class Meta:
         unique_together = ("order", "shop", "product", "delivery_warehouse")
 
+    def save(self, *args, **kwargs):
+        """Auto update bill, when the items of a Transaction change"""
+        super().save(*args, **kwargs)
+        events.order_items_changed(type(self), [self.order_id])
+
+    def delete(self, *args, **kwargs):
+        order_id = self.order_id
+        deleted = super().delete(*args, **kwargs)
+        events.order_items_changed(type(self), [order_id])
+        return deleted
+
 
 class VendorTrasnscationBill(models.Model):
     """Model for tracking the bill of a transaction"""
@@ -279,36 +559,17 @@ class VendorTrasnscationBill(models.Model):
     created_timestamp = models.DateTimeField(default=timezone.now, editable=False)
     modified_timestamp = models.DateTimeField(default=timezone.now)
 
+    objects = ShopManager()
 
-@receiver(signals.post_save, sender=VendorTrasnscation)
-def create_vendor_bill(sender, instance, created, **kwargs):
-    """Auto create bill, when vendor creates a Transaction"""
-
-    if created:
-        VendorTrasnscationBill.objects.create(
-            order=instance, paid=0, shop=instance.shop
-        )
-
-
-@receiver(signals.post_save, sender=VendorOrderedItems)
-def update_vendor_bill(sender, instance, created, **kwargs):
-    """Auto update bill, when vendor updates a Transaction"""
-
-    if created:
-        bill_object = VendorTrasnscationBill.objects.filter(order=instance.order)[0]
-
-        order_object = VendorOrderedItems.objects.filter(order=instance.order)
-
-        bill = 0
-
-        for i in order_object:
-            bill += i.bill
-
-        if bill_object.due == 0:
-            bill_object.due = bill
-
-        bill_object.bill = bill
-        bill_object.save()
+    class Meta:
+        # open bills only, what due lists and ledgers read
+        indexes = [
+            models.Index(
+                fields=["shop", "created_timestamp"],
+                name="vendor_bill_open_due_idx",
+                condition=models.Q(due__gt=0),
+            )
+        ]
 
 
 class MoveProduct(models.Model):
@@ -327,6 +588,8 @@ class MoveProduct(models.Model):
     created_timestamp = models.DateTimeField(default=timezone.now, editable=False)
     modified_timestamp = models.DateTimeField(default=timezone.now)
 
+    objects = ShopManager()
+
 
 class Expense(models.Model):
     """Model for expense"""
@@ -336,3 +599,95 @@ class Expense(models.Model):
     amount = models.PositiveIntegerField(default=0)
     created_timestamp = models.DateTimeField(default=timezone.now, editable=False)
     modified_timestamp = models.DateTimeField(default=timezone.now)
+
+    objects = ShopManager()
+
+
+class Job(models.Model):
+    """Model for background jobs executed by run_workers"""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    statuses = (
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    )
+
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, null=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    kind = models.CharField(max_length=64)
+    payload = models.TextField(default="{}")
+    status = models.CharField(max_length=10, choices=statuses, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    result = models.TextField(blank=True)
+    error = models.TextField(blank=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    started_timestamp = models.DateTimeField(null=True)
+    finished_timestamp = models.DateTimeField(null=True)
+    created_timestamp = models.DateTimeField(default=timezone.now, editable=False)
+    modified_timestamp = models.DateTimeField(default=timezone.now)
+
+    objects = ShopManager()
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "run_after"])]
+
+    def __str__(self):
+        return f"Job {self.pk}---{self.kind}"
+
+
+class ArchivedTransaction(models.Model):
+    """Model for settled transactions moved out of the hot tables"""
+
+    CUSTOMER = "customer"
+    VENDOR = "vendor"
+
+    kinds = (
+        (CUSTOMER, "Customer"),
+        (VENDOR, "Vendor"),
+    )
+
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=10, choices=kinds)
+    order_id = models.PositiveIntegerField()
+    party_id = models.PositiveIntegerField(null=True)
+    bill = models.PositiveIntegerField(default=0)
+    paid = models.PositiveIntegerField(default=0)
+    # zlib compressed json of the transaction, its bill and ordered items
+    data = models.BinaryField()
+    created_timestamp = models.DateTimeField()
+    archived_timestamp = models.DateTimeField(default=timezone.now, editable=False)
+
+    objects = ShopManager()
+
+    class Meta:
+        unique_together = ("shop", "kind", "order_id")
+        indexes = [models.Index(fields=["shop", "kind", "created_timestamp"])]
+
+
+class DailyBillRollup(models.Model):
+    """Model for the daily bill sums of the archived ordered items"""
+
+    SELL = "sell"
+    PURCHASE = "purchase"
+
+    kinds = (
+        (SELL, "Sell"),
+        (PURCHASE, "Purchase"),
+    )
+
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=10, choices=kinds)
+    date = models.DateField()
+    bill = models.PositiveIntegerField(default=0)
+
+    objects = ShopManager()
+
+    class Meta:
+        unique_together = ("shop", "kind", "date")
@@ -0,0 +1,322 @@
+"""
+Postgres declarative partitioning of the ordered items tables.
+
+The tables are range partitioned by month on created_timestamp, every
+month optionally hash sub-partitioned by shop_id. Rows outside of the
+created months land in a default partition. The bill tables are not
+partitioned, their one bill per transaction rule needs a unique order.
+"""
+
+from datetime import date, datetime, time
+
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from core import models
+
+PARTITIONED_MODELS = (models.CustomerOrderedItems, models.VendorOrderedItems)
+
+# daily rollups the remaining ordered items of a partition are summed in before
+# detaching, the items of archived transactions were summed by shop.archive
+ROLLUP_KINDS = {
+    models.CustomerOrderedItems: models.DailyBillRollup.SELL,
+    models.VendorOrderedItems: models.DailyBillRollup.PURCHASE,
+}
+
+# detached partitions are moved in this schema, out of the way of the app
+ARCHIVE_SCHEMA = "archive"
+
+# indexes of the partitioned tables, created on the parent and inherited by
+# every partition
+PARTITION_INDEXES = {
+    models.CustomerOrderedItems: (
+        ("shop_id", "created_timestamp"),
+        ("order_id",),
+        ("product_id",),
+        ("product_detail_id",),
+    ),
+    models.VendorOrderedItems: (
+        ("shop_id", "created_timestamp"),
+        ("order_id",),
+        ("product_id",),
+        ("product_detail_id",),
+        ("delivery_warehouse_id",),
+    ),
+}
+
+# unique together of the ordered items. Unique indexes must contain the
+# partition key, so the serializers also lock the order and check it.
+PARTITION_UNIQUE = {
+    models.CustomerOrderedItems: ("order_id", "shop_id", "product_id"),
+    models.VendorOrderedItems: (
+        "order_id",
+        "shop_id",
+        "product_id",
+        "delivery_warehouse_id",
+    ),
+}
+
+
+def supported():
+    return connection.vendor == "postgresql" and connection.pg_version >= 120000
+
+
+def add_months(month, count):
+    """First day of the month count months after the given month"""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def partition_name(table, month):
+    return f"{table}_p{month:%Y%m}"
+
+
+def month_range(month):
+    """Bounds of the partition of a month, the database session runs in UTC"""
+    start = datetime.combine(month, time.min, tzinfo=timezone.utc)
+    return start, datetime.combine(add_months(month, 1), time.min, tzinfo=timezone.utc)
+
+
+def partition_month(table, name):
+    """Month of a partition from its name, None for other tables"""
+    prefix = f"{table}_p"
+
+    if not name.startswith(prefix) or not name[len(prefix) :].isdigit():
+        return None
+
+    suffix = name[len(prefix) :]
+    return date(int(suffix[:4]), int(suffix[4:6]), 1)
+
+
+def is_partitioned(table):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p "
+            "JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [table],
+        )
+        return cursor.fetchone() is not None
+
+
+def partitions(table):
+    """Names of the attached partitions of a table"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass ORDER BY c.relname",
+            [table],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def create_partition(table, month, shop_buckets=0):
+    """Create the partition of a month, returns False if it already exists"""
+    name = partition_name(table, month)
+
+    if name in partitions(table):
+        return False
+
+    qn = connection.ops.quote_name
+    bounds = (
+        f"FOR VALUES FROM ('{month.isoformat()}') "
+        f"TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+    with connection.cursor() as cursor:
+        if not shop_buckets:
+            cursor.execute(f"CREATE TABLE {qn(name)} PARTITION OF {qn(table)} {bounds}")
+            return True
+
+        cursor.execute(
+            f"CREATE TABLE {qn(name)} PARTITION OF {qn(table)} {bounds} "
+            f"PARTITION BY HASH (shop_id)"
+        )
+        for remainder in range(shop_buckets):
+            cursor.execute(
+                f"CREATE TABLE {qn(f'{name}_h{remainder}')} PARTITION OF {qn(name)} "
+                f"FOR VALUES WITH (MODULUS {shop_buckets}, REMAINDER {remainder})"
+            )
+
+    return True
+
+
+def convert(model, shop_buckets=0, months_ahead=3):
+    """
+    Turn the table of a model into a partitioned one, copying its rows.
+
+    The table is locked while the rows are copied, it should run in a
+    maintenance window.
+    """
+    table = model._meta.db_table
+    old = f"{table}_unpartitioned"
+    qn = connection.ops.quote_name
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [table],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(
+            "SELECT date_trunc('month', min(created_timestamp))::date "
+            f"FROM {qn(table)}"
+        )
+        oldest = cursor.fetchone()[0]
+
+        cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(old)}")
+        cursor.execute(
+            f"CREATE TABLE {qn(table)} (LIKE {qn(old)} INCLUDING DEFAULTS "
+            f"INCLUDING CONSTRAINTS INCLUDING STORAGE) "
+            f"PARTITION BY RANGE (created_timestamp)"
+        )
+        cursor.execute(
+            f"CREATE TABLE {qn(f'{table}_default')} PARTITION OF {qn(table)} DEFAULT"
+        )
+
+        today = timezone.localdate()
+        month = oldest or month_start(today)
+        last = add_months(month_start(today), months_ahead)
+        while month <= last:
+            create_partition(table, month, shop_buckets)
+            month = add_months(month, 1)
+
+        cursor.execute(f"INSERT INTO {qn(table)} SELECT * FROM {qn(old)}")
+        cursor.execute(f"ALTER SEQUENCE {qn(f'{table}_id_seq')} OWNED BY NONE")
+        cursor.execute(f"DROP TABLE {qn(old)}")
+        cursor.execute(
+            f"ALTER SEQUENCE {qn(f'{table}_id_seq')} OWNED BY {qn(table)}.id"
+        )
+
+        # indexes and constraints once the old ones are gone, to reuse names
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(f'{table}_pkey')} "
+            f"PRIMARY KEY (id, created_timestamp)"
+        )
+        for columns in PARTITION_INDEXES[model]:
+            cursor.execute(
+                f"CREATE INDEX {qn(f'{table}_{columns[0]}_part')} ON {qn(table)} "
+                f"({', '.join(qn(column) for column in columns)})"
+            )
+        unique = PARTITION_UNIQUE[model] + ("created_timestamp",)
+        cursor.execute(
+            f"CREATE UNIQUE INDEX {qn(f'{table}_uniq_part')} ON {qn(table)} "
+            f"({', '.join(qn(column) for column in unique)})"
+        )
+        for name, definition in foreign_keys:
+            cursor.execute(
+                f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}"
+            )
+
+        with connection.schema_editor(atomic=False) as editor:
+            for index in model._meta.indexes:
+                editor.add_index(model, index)
+
+
+def create_future_partitions(months_ahead, shop_buckets=0, today=None):
+    """Create the partitions of the coming months, returns their names"""
+    first = month_start(today or timezone.localdate())
+    created = []
+
+    for model in PARTITIONED_MODELS:
+        table = model._meta.db_table
+
+        if not is_partitioned(table):
+            continue
+
+        for count in range(months_ahead + 1):
+            month = add_months(first, count)
+            if create_partition(table, month, shop_buckets):
+                created.append(partition_name(table, month))
+
+    return created
+
+
+def has_live_orders(model, month):
+    """Whether an ordered item of the month belongs to a transaction still in use"""
+    start, end = month_range(month)
+
+    return model.objects.filter(
+        created_timestamp__gte=start, created_timestamp__lt=end, order__isnull=False
+    ).exists()
+
+
+def roll_up(model, month):
+    """Sum the bills of the ordered items of a month into the daily rollups"""
+    start, end = month_range(month)
+    sums = (
+        model.objects.filter(created_timestamp__gte=start, created_timestamp__lt=end)
+        .annotate(day=TruncDate("created_timestamp"))
+        .order_by()
+        .values_list("shop_id", "day")
+        .annotate(bill=Sum("bill"))
+    )
+
+    for shop_id, day, bill in sums:
+        updated = models.DailyBillRollup.objects.filter(
+            shop_id=shop_id, kind=ROLLUP_KINDS[model], date=day
+        ).update(bill=F("bill") + bill)
+
+        if not updated:
+            models.DailyBillRollup.objects.create(
+                shop_id=shop_id, kind=ROLLUP_KINDS[model], date=day, bill=bill
+            )
+
+
+def detach_old_partitions(keep_months, today=None):
+    """
+    Detach the archived partitions older than keep_months into the archive schema.
+
+    Their rows are no longer visible to the app, but stay in the database
+    until the archived tables are dropped. A partition is only detached once
+    shop.archive moved all of its transactions, with their items, to the
+    archived transactions: detaching items of transactions still in use
+    would leave them without lines. The items left, those without an order,
+    are summed in the daily rollups first, in the same transaction, so the
+    reports keep them.
+    """
+    oldest = add_months(month_start(today or timezone.localdate()), -keep_months)
+    qn = connection.ops.quote_name
+    detached = []
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {qn(ARCHIVE_SCHEMA)}")
+
+        for model in PARTITIONED_MODELS:
+            table = model._meta.db_table
+
+            if not is_partitioned(table):
+                continue
+
+            for name in partitions(table):
+                month = partition_month(table, name)
+
+                if month is None or month >= oldest:
+                    continue
+
+                with transaction.atomic():
+                    # locks the partition, no item can be added after the check
+                    cursor.execute(f"LOCK TABLE {qn(name)} IN EXCLUSIVE MODE")
+
+                    if has_live_orders(model, month):
+                        continue
+
+                    roll_up(model, month)
+
+                    cursor.execute(
+                        f"ALTER TABLE {qn(table)} DETACH PARTITION {qn(name)}"
+                    )
+                    cursor.execute(
+                        f"ALTER TABLE {qn(name)} SET SCHEMA {qn(ARCHIVE_SCHEMA)}"
+                    )
+                detached.append(name)
+
+    return detached
@@ -0,0 +1,83 @@
+"""
+JSON renderer and parser on orjson, enabled with API_ORJSON=1.
+
+orjson serializes dicts, lists, datetimes and UUIDs natively, including
+the ReturnDict and ReturnList of the serializers. The output matches the
+one of the rest framework JSONRenderer: UTC datetimes end with Z, Decimals
+are numbers and lazy strings are plain strings.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models.query import QuerySet
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+
+try:
+    import orjson
+except ImportError:  # optional, only needed with API_ORJSON=1
+    orjson = None
+
+
+class ORJSONMixin:
+    def __init__(self, *args, **kwargs):
+        if orjson is None:
+            raise ImproperlyConfigured("API_ORJSON needs the orjson package")
+        super().__init__(*args, **kwargs)
+
+
+def default(obj):
+    """Types orjson leaves to the caller, encoded like the JSONEncoder does"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, Promise):
+        return force_str(obj)
+    if isinstance(obj, timedelta):
+        return str(obj.total_seconds())
+    if isinstance(obj, QuerySet):
+        return tuple(obj)
+    if isinstance(obj, bytes):
+        return obj.decode()
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    if hasattr(obj, "__iter__"):
+        return tuple(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class ORJSONRenderer(ORJSONMixin, BaseRenderer):
+    """Renders JSON with orjson"""
+
+    media_type = "application/json"
+    format = "json"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        option = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        # the browsable api and ?indent= clients ask for indented output
+        if (renderer_context or {}).get("indent") or "indent=" in str(
+            accepted_media_type
+        ):
+            option |= orjson.OPT_INDENT_2
+
+        return orjson.dumps(data, default=default, option=option)
+
+
+class ORJSONParser(ORJSONMixin, BaseParser):
+    """Parses JSON request bodies with orjson"""
+
+    media_type = "application/json"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
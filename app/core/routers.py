@@ -0,0 +1,52 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# database the reads of a request or a job go to, set by replica_reads()
+replica_database = ContextVar("replica_database", default=None)
+
+
+@contextmanager
+def replica_reads():
+    """
+    Send the reads of the block to a replica, if there is one.
+
+    The replica is picked once for the whole block, so the list, count and
+    related rows of a request are read from one snapshot. Nested blocks
+    keep the replica of the outer one.
+    """
+    database = replica_database.get()
+
+    if database is None:
+        replicas = settings.DATABASE_REPLICAS
+        database = random.choice(replicas) if replicas else "default"
+
+    token = replica_database.set(database)
+    try:
+        yield
+    finally:
+        replica_database.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Route reads to the replica picked by replica_reads(), anything else to
+    the default database.
+
+    Writes always go to the default database, replicas are read only copies
+    of it so relations between their objects are allowed.
+    """
+
+    def db_for_read(self, model, **hints):
+        return replica_database.get() or "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
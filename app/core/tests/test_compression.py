@@ -0,0 +1,56 @@
+import gzip
+import json
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from core.middleware import CompressionMiddleware, accepted_encodings
+
+ROWS = json.dumps([{"name": f"Product {i}", "stock": i} for i in range(200)])
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def get(self, response, path="/api/shop/product/", encoding="gzip"):
+        request = self.factory.get(path, HTTP_ACCEPT_ENCODING=encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_gzips_big_json_responses(self):
+        """Test that json lists are gzipped for clients accepting it"""
+        response = self.get(HttpResponse(ROWS, content_type="application/json"))
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content).decode(), ROWS)
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    def test_small_and_binary_responses_are_left(self):
+        """Test that small bodies and images are sent as they are"""
+        small = self.get(HttpResponse("[]", content_type="application/json"))
+        image = self.get(
+            HttpResponse(b"\xff" * 4096, content_type="image/jpeg"),
+            path="/media/uploads/transaction/a.jpg",
+        )
+        refused = self.get(
+            HttpResponse(ROWS, content_type="application/json"), encoding="gzip;q=0"
+        )
+
+        for response in (small, image, refused):
+            self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_streaming_responses_are_compressed_incrementally(self):
+        """Test that streamed chunks are gzipped as they are produced"""
+        chunks = (f"{i},Product {i}\n".encode() for i in range(500))
+        response = self.get(StreamingHttpResponse(chunks, content_type="text/csv"))
+
+        body = gzip.decompress(b"".join(response.streaming_content)).decode()
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(body.splitlines()[-1], "499,Product 499")
+
+    def test_accepted_encodings(self):
+        """Test the parsing of Accept-Encoding with qualities"""
+        self.assertEqual(
+            accepted_encodings("br;q=0, gzip;q=0.8, deflate"), {"gzip", "deflate"}
+        )
@@ -0,0 +1,111 @@
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from core import events, models
+
+
+class BillEventsTests(TransactionTestCase):
+    def setUp(self):
+        self.shop = models.Shop.objects.create(name="Test shop")
+        self.customer = models.Customer.objects.create(name="Karim", shop=self.shop)
+        self.order = models.CustomerTrasnscation.objects.create(
+            shop=self.shop, customer=self.customer
+        )
+        self.products = [
+            models.Product.objects.create(name=f"Product {i}", shop=self.shop)
+            for i in range(10)
+        ]
+
+    def bill(self):
+        return models.CustomerTrasnscationBill.objects.get(order=self.order)
+
+    def test_lines_of_a_transaction_update_the_bill_once(self):
+        """Test that ten line inserts produce one bill update on commit"""
+        bill_table = models.CustomerTrasnscationBill._meta.db_table
+
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                for product in self.products:
+                    models.CustomerOrderedItems.objects.create(
+                        order=self.order, shop=self.shop, product=product, bill=10
+                    )
+
+        updates = [
+            query
+            for query in queries.captured_queries
+            if query["sql"].startswith(f'UPDATE "{bill_table}"')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self.bill().bill, 100)
+        self.assertEqual(self.bill().due, 100)
+
+    def test_rolled_back_lines_leave_the_bill(self):
+        """Test that queued bills of a rolled back transaction are dropped"""
+        try:
+            with transaction.atomic():
+                models.CustomerOrderedItems.objects.create(
+                    order=self.order, shop=self.shop, product=self.products[0], bill=10
+                )
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        models.CustomerOrderedItems.objects.create(
+            order=self.order, shop=self.shop, product=self.products[1], bill=30
+        )
+
+        self.assertEqual(self.bill().bill, 30)
+
+
+class BatchedWritesTests(TestCase):
+    def setUp(self):
+        self.shop = models.Shop.objects.create(name="Test shop")
+        self.customer = models.Customer.objects.create(name="Karim", shop=self.shop)
+
+    def test_bulk_created_transactions_get_bills(self):
+        """Test that bulk created transactions get their bills, ids or not"""
+        orders = models.CustomerTrasnscation.objects.bulk_create(
+            [
+                models.CustomerTrasnscation(shop=self.shop, customer=self.customer)
+                for i in range(3)
+            ]
+        )
+
+        self.assertEqual(len(orders), 3)
+        self.assertEqual(
+            models.CustomerTrasnscationBill.objects.filter(
+                order__shop=self.shop
+            ).count(),
+            3,
+        )
+
+    def test_batched_item_writes_update_the_bill(self):
+        """Test that bulk create, update and delete keep the bill in line"""
+        order = models.CustomerTrasnscation.objects.create(
+            shop=self.shop, customer=self.customer
+        )
+        models.CustomerTrasnscationBill.objects.filter(order=order).update(paid=5)
+        products = [
+            models.Product.objects.create(name=f"Product {i}", shop=self.shop)
+            for i in range(3)
+        ]
+        items = models.CustomerOrderedItems.objects.filter(order=order)
+
+        models.CustomerOrderedItems.objects.bulk_create(
+            [
+                models.CustomerOrderedItems(
+                    order=order, shop=self.shop, product=product, bill=10
+                )
+                for product in products
+            ]
+        )
+        events.flush()
+        bill = models.CustomerTrasnscationBill.objects.get(order=order)
+        self.assertEqual((bill.bill, bill.due), (30, 25))
+
+        items.filter(product=products[0]).update(bill=40)
+        items.filter(product=products[1]).delete()
+        events.flush()
+        bill.refresh_from_db()
+        self.assertEqual((bill.bill, bill.due), (50, 45))
@@ -0,0 +1,52 @@
+import os
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from core.models import content_hashed_name
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_SERVING="x-accel-redirect")
+class MediaServingTests(SimpleTestCase):
+    def setUp(self):
+        os.makedirs(os.path.join(MEDIA_ROOT, "uploads"), exist_ok=True)
+        with open(os.path.join(MEDIA_ROOT, "uploads", "photo.jpg"), "wb") as f:
+            f.write(b"\xff\xd8\xff")
+
+    def test_front_server_sends_the_file(self):
+        """Test that the response only names the file, with far cache headers"""
+        res = self.client.get(reverse("media", args=["uploads/photo.jpg"]))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, b"")
+        self.assertEqual(res["X-Accel-Redirect"], "/protected-media/uploads/photo.jpg")
+        self.assertEqual(res["Content-Type"], "image/jpeg")
+        self.assertIn("immutable", res["Cache-Control"])
+
+    def test_missing_and_outside_files_are_not_found(self):
+        """Test that only existing uploads under MEDIA_ROOT are served"""
+        os.makedirs(os.path.join(MEDIA_ROOT, "exports"), exist_ok=True)
+        with open(os.path.join(MEDIA_ROOT, "exports", "products.csv"), "w") as f:
+            f.write("id,name\n")
+
+        for path in (
+            "uploads/missing.jpg",
+            "../etc/passwd",
+            "exports/products.csv",
+            "uploads/../exports/products.csv",
+        ):
+            res = self.client.get(reverse("media", args=[path]))
+
+            self.assertEqual(res.status_code, 404)
+
+    def test_content_hashed_names(self):
+        """Test that names depend on the content only"""
+        first = content_hashed_name(ContentFile(b"rice"), "a.jpg")
+
+        self.assertEqual(first, content_hashed_name(ContentFile(b"rice"), "b.jpg"))
+        self.assertNotEqual(first, content_hashed_name(ContentFile(b"salt"), "a.jpg"))
+        self.assertTrue(first.endswith(".jpg"))
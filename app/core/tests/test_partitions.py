@@ -0,0 +1,118 @@
+from datetime import date, datetime
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from core import models, partitions
+from shop.archive import archive_transactions
+
+
+class PartitionNameTests(SimpleTestCase):
+    def test_add_months_crosses_years(self):
+        """Test that months are added across year boundaries"""
+        self.assertEqual(partitions.add_months(date(2020, 11, 1), 3), date(2021, 2, 1))
+        self.assertEqual(partitions.add_months(date(2020, 1, 1), -1), date(2019, 12, 1))
+
+    def test_partition_month_from_name(self):
+        """Test that the month is read back from partition names only"""
+        table = "core_vendortrasnscationbill"
+        name = partitions.partition_name(table, date(2020, 9, 1))
+
+        self.assertEqual(name, "core_vendortrasnscationbill_p202009")
+        self.assertEqual(partitions.partition_month(table, name), date(2020, 9, 1))
+        self.assertIsNone(partitions.partition_month(table, f"{table}_default"))
+
+
+class DetachGuardTests(TestCase):
+    def setUp(self):
+        self.shop = models.Shop.objects.create(name="Test shop")
+        customer = models.Customer.objects.create(name="Karim", shop=self.shop)
+        self.order = models.CustomerTrasnscation.objects.create(
+            shop=self.shop, customer=customer
+        )
+        self.march = datetime(2020, 3, 10, 12, tzinfo=timezone.utc)
+
+    def test_months_stay_until_archived(self):
+        """Test that a month is kept while its transactions are in use"""
+        items = models.CustomerOrderedItems
+        items.objects.create(
+            order=self.order, shop=self.shop, bill=100, created_timestamp=self.march
+        )
+        models.CustomerTrasnscationBill.objects.filter(order=self.order).update(
+            bill=100, paid=100, due=0
+        )
+
+        self.assertTrue(partitions.has_live_orders(items, date(2020, 3, 1)))
+        self.assertFalse(partitions.has_live_orders(items, date(2020, 4, 1)))
+
+        models.CustomerTrasnscation.objects.filter(pk=self.order.pk).update(
+            created_timestamp=self.march
+        )
+        archive_transactions(models.ArchivedTransaction.CUSTOMER, days=30)
+        self.assertFalse(partitions.has_live_orders(items, date(2020, 3, 1)))
+
+    def test_roll_up_sums_days(self):
+        """Test that the ordered items of a month are added to the rollups"""
+        for bill in (30, 20):
+            models.CustomerOrderedItems.objects.create(
+                order=self.order,
+                shop=self.shop,
+                bill=bill,
+                created_timestamp=self.march,
+            )
+        models.DailyBillRollup.objects.create(
+            shop=self.shop,
+            kind=models.DailyBillRollup.SELL,
+            date=timezone.localdate(self.march),
+            bill=5,
+        )
+
+        partitions.roll_up(models.CustomerOrderedItems, date(2020, 3, 1))
+
+        self.assertEqual(
+            list(models.DailyBillRollup.objects.values_list("kind", "bill")),
+            [(models.DailyBillRollup.SELL, 55)],
+        )
+
+
+@skipUnless(not partitions.supported(), "Runs where partitioning is unsupported")
+class UnsupportedDatabaseTests(SimpleTestCase):
+    def test_command_needs_postgres(self):
+        """Test that the command refuses to run on other databases"""
+        with self.assertRaises(CommandError):
+            call_command("partitions")
+
+
+@skipUnless(partitions.supported(), "Partitioning needs PostgreSQL 12+")
+class PartitionTests(TransactionTestCase):
+    def test_convert_keeps_rows(self):
+        """Test that converting a table keeps its rows and routes new ones"""
+        shop = models.Shop.objects.create(name="Test shop")
+        customer = models.Customer.objects.create(name="Karim", shop=shop)
+        order = models.CustomerTrasnscation.objects.create(shop=shop, customer=customer)
+        rice = models.Product.objects.create(name="Rice", shop=shop)
+        salt = models.Product.objects.create(name="Salt", shop=shop)
+        items = models.CustomerOrderedItems.objects
+        items.create(order=order, shop=shop, product=rice)
+        table = models.CustomerOrderedItems._meta.db_table
+
+        partitions.convert(models.CustomerOrderedItems, shop_buckets=2)
+        added = items.create(order=order, shop=shop, product=salt)
+
+        self.assertTrue(partitions.is_partitioned(table))
+        self.assertEqual(items.filter(order=order).count(), 2)
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {table}_default")
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+        with self.assertRaises(IntegrityError):
+            items.create(
+                order=order,
+                shop=shop,
+                product=salt,
+                created_timestamp=added.created_timestamp,
+            )
@@ -0,0 +1,34 @@
+import io
+from datetime import date, datetime
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from core.renderers import ORJSONParser, ORJSONRenderer, orjson
+
+
+@skipUnless(orjson, "orjson is not installed")
+class ORJSONTests(SimpleTestCase):
+    def test_renders_like_the_json_renderer(self):
+        """Test that orjson output matches the one of the JSONRenderer"""
+        data = {
+            "name": "Rice ধান",
+            "price": Decimal("10.5"),
+            "date": date(2020, 5, 1),
+            "created": datetime(2020, 5, 1, 10, 30, tzinfo=timezone.utc),
+            "items": [{"id": 1, "bill": None}],
+        }
+
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_parses_json(self):
+        """Test that request bodies are parsed, invalid ones refused"""
+        parser = ORJSONParser()
+
+        self.assertEqual(parser.parse(io.BytesIO(b'{"paid": 10}')), {"paid": 10})
+        with self.assertRaises(ParseError):
+            parser.parse(io.BytesIO(b'{"paid": '))
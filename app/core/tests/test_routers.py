@@ -0,0 +1,89 @@
+from types import SimpleNamespace
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core import models
+from core.middleware import REPLICA_PIN_COOKIE, ReplicaMiddleware
+from core.routers import ReplicaRouter, replica_database, replica_reads
+
+
+def sample_view(read_from_replica):
+    def view(request):
+        view.reads_from_replica = replica_database.get() is not None
+        return HttpResponse()
+
+    view.cls = SimpleNamespace(read_from_replica=read_from_replica)
+    return view
+
+
+@override_settings(DATABASE_REPLICAS=["replica_0"])
+class ReplicaRouterTests(SimpleTestCase):
+    def test_reads_go_to_replica_inside_replica_reads(self):
+        """Test that only reads inside replica_reads go to a replica"""
+        router = ReplicaRouter()
+
+        self.assertEqual(router.db_for_read(models.Product), "default")
+        with replica_reads():
+            self.assertEqual(router.db_for_read(models.Product), "replica_0")
+            self.assertEqual(router.db_for_write(models.Product), "default")
+
+    @override_settings(DATABASE_REPLICAS=[f"replica_{index}" for index in range(8)])
+    def test_one_replica_per_block(self):
+        """Test that every read of a block goes to the same replica"""
+        router = ReplicaRouter()
+
+        with replica_reads():
+            database = router.db_for_read(models.Product)
+            with replica_reads():
+                reads = {router.db_for_read(models.Customer) for _ in range(20)}
+
+        self.assertEqual(reads, {database})
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_reads_go_to_default_without_replicas(self):
+        """Test that the default database is used when there is no replica"""
+        with replica_reads():
+            self.assertEqual(ReplicaRouter().db_for_read(models.Product), "default")
+
+
+class ReplicaMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def run_view(self, request, view):
+        middleware = ReplicaMiddleware(
+            lambda request: middleware.process_view(request, view, (), {})
+            or view(request)
+        )
+        return middleware(request)
+
+    def test_marked_views_read_from_replica(self):
+        """Test that safe requests of marked views run in replica_reads"""
+        view = sample_view(read_from_replica=True)
+
+        self.run_view(self.factory.get("/"), view)
+
+        self.assertTrue(view.reads_from_replica)
+        self.assertIsNone(replica_database.get())
+
+    def test_other_views_read_from_default(self):
+        """Test that views which are not marked are left alone"""
+        view = sample_view(read_from_replica=False)
+
+        self.run_view(self.factory.get("/"), view)
+
+        self.assertFalse(view.reads_from_replica)
+
+    def test_writes_pin_the_client_to_the_primary(self):
+        """Test that a write sets the cookie keeping reads on the primary"""
+        view = sample_view(read_from_replica=True)
+
+        response = self.run_view(self.factory.post("/"), view)
+        self.assertIn(REPLICA_PIN_COOKIE, response.cookies)
+
+        request = self.factory.get("/")
+        request.COOKIES[REPLICA_PIN_COOKIE] = "1"
+        self.run_view(request, view)
+
+        self.assertFalse(view.reads_from_replica)
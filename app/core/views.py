@@ -0,0 +1,80 @@
+import mimetypes
+import os
+import posixpath
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import connection
+from django.db.utils import OperationalError
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control
+from django.views import static
+
+# media folders whose files have content hashed names
+PUBLIC_MEDIA = "uploads/"
+
+
+def health(request):
+    """Health check for the load balancer, verifies the database connection"""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+    except OperationalError:
+        return JsonResponse({"database": "unavailable"}, status=503)
+
+    return JsonResponse({"database": "ok"})
+
+
+def send_file(request, root, path, accel_prefix):
+    """
+    Response with a file under root, None if there is no such file.
+
+    With MEDIA_SERVING set to x-accel-redirect or x-sendfile the response
+    only names the file, the front server sends its bytes. The django mode
+    streams them from python and is meant for development.
+    """
+    try:
+        full_path = safe_join(root, path)
+    except SuspiciousFileOperation:
+        return None
+
+    if not os.path.isfile(full_path):
+        return None
+
+    if settings.MEDIA_SERVING == "django":
+        return static.serve(request, path, document_root=root)
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    response = HttpResponse(content_type=content_type or "application/octet-stream")
+
+    if settings.MEDIA_SERVING == "x-accel-redirect":
+        response["X-Accel-Redirect"] = accel_prefix + quote(path)
+    else:
+        response["X-Sendfile"] = full_path
+
+    return response
+
+
+def serve_media(request, path):
+    """
+    Uploaded media, cacheable forever as their names are content hashed.
+
+    Only the uploads are public, the files of the jobs are kept outside
+    MEDIA_ROOT and sent by the job download endpoint.
+    """
+    response = None
+
+    if posixpath.normpath(path).startswith(PUBLIC_MEDIA):
+        response = send_file(
+            request, settings.MEDIA_ROOT, path, settings.MEDIA_ACCEL_PREFIX
+        )
+
+    if response is None:
+        raise Http404("Media file not found")
+
+    patch_cache_control(
+        response, public=True, max_age=settings.MEDIA_CACHE_SECONDS, immutable=True
+    )
+    return response
@@ -0,0 +1,21 @@
+"""gunicorn configuration for the production serving mode"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+
+# the API is mostly waiting on postgres, so every process runs a few threads
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+keepalive = 5
+
+# recycle workers now and then to bound memory growth
+max_requests = 2000
+max_requests_jitter = 200
+
+accesslog = "-"
+errorlog = "-"
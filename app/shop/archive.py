@@ -0,0 +1,147 @@
+import json
+import zlib
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core import models
+
+ARCHIVE_BATCH_SIZE = 500
+
+# what to archive per kind: transaction model, its party, ordered items model
+# and the kind of the daily rollup their bills are summed in
+ARCHIVES = {
+    models.ArchivedTransaction.CUSTOMER: (
+        models.CustomerTrasnscation,
+        "customer",
+        models.CustomerOrderedItems,
+        models.DailyBillRollup.SELL,
+    ),
+    models.ArchivedTransaction.VENDOR: (
+        models.VendorTrasnscation,
+        "vendor",
+        models.VendorOrderedItems,
+        models.DailyBillRollup.PURCHASE,
+    ),
+}
+
+
+def compress(data):
+    return zlib.compress(json.dumps(data, cls=DjangoJSONEncoder).encode(), 6)
+
+
+def decompress(data):
+    return json.loads(zlib.decompress(bytes(data)).decode())
+
+
+def settled_orders(kind, older_than, shop=None):
+    """Ids of the fully paid transactions created before older_than"""
+    model = ARCHIVES[kind][0]
+    queryset = model.objects.filter(
+        created_timestamp__lt=older_than,
+        **{f"{model._meta.model_name}bill__due": 0},
+    )
+
+    if shop is not None:
+        queryset = queryset.for_shop(shop)
+
+    return queryset.order_by("id").values_list("id", flat=True)
+
+
+def add_to_rollups(rollup_kind, items):
+    """Sum the bills of archived items into the daily rollups"""
+    sums = defaultdict(int)
+
+    for item in items:
+        if item["shop_id"] is not None:
+            day = timezone.localdate(item["created_timestamp"])
+            sums[(item["shop_id"], day)] += item["bill"]
+
+    for (shop_id, day), bill in sums.items():
+        updated = models.DailyBillRollup.objects.filter(
+            shop_id=shop_id, kind=rollup_kind, date=day
+        ).update(bill=F("bill") + bill)
+
+        if not updated:
+            models.DailyBillRollup.objects.create(
+                shop_id=shop_id, kind=rollup_kind, date=day, bill=bill
+            )
+
+
+def archive_batch(kind, order_ids):
+    """Move a batch of transactions, their bills and items to the archive"""
+    model, party, items_model, rollup_kind = ARCHIVES[kind]
+    bill_name = f"{model._meta.model_name}bill"
+
+    with transaction.atomic():
+        orders = list(
+            model.objects.select_for_update(of=("self",))
+            .filter(id__in=order_ids, **{f"{bill_name}__due": 0})
+            .select_related(bill_name)
+        )
+        ids = [order.id for order in orders]
+
+        items = defaultdict(list)
+        for item in items_model.objects.filter(order__in=ids).values():
+            items[item["order_id"]].append(item)
+
+        archived = []
+        for order in orders:
+            bill = getattr(order, bill_name)
+            archived.append(
+                models.ArchivedTransaction(
+                    shop_id=order.shop_id,
+                    kind=kind,
+                    order_id=order.id,
+                    party_id=getattr(order, f"{party}_id"),
+                    bill=bill.bill,
+                    paid=bill.paid,
+                    created_timestamp=order.created_timestamp,
+                    data=compress(
+                        {
+                            "transaction": {
+                                "id": order.id,
+                                party: getattr(order, f"{party}_id"),
+                                "created_timestamp": order.created_timestamp,
+                                "modified_timestamp": order.modified_timestamp,
+                            },
+                            "bill": {
+                                "id": bill.id,
+                                "bill": bill.bill,
+                                "paid": bill.paid,
+                                "due": bill.due,
+                                "created_timestamp": bill.created_timestamp,
+                                "modified_timestamp": bill.modified_timestamp,
+                            },
+                            "items": items[order.id],
+                        }
+                    ),
+                )
+            )
+
+        models.ArchivedTransaction.objects.bulk_create(archived)
+        add_to_rollups(
+            rollup_kind,
+            [item for order_items in items.values() for item in order_items],
+        )
+
+        # bills and ordered items are deleted with the transactions
+        model.objects.filter(id__in=ids).delete()
+
+    return len(ids)
+
+
+def archive_transactions(kind, days, shop=None, batch_size=ARCHIVE_BATCH_SIZE):
+    """Archive the settled transactions older than days, returns their count"""
+    older_than = timezone.now() - timedelta(days=days)
+    order_ids = list(settled_orders(kind, older_than, shop))
+    archived = 0
+
+    for start in range(0, len(order_ids), batch_size):
+        archived += archive_batch(kind, order_ids[start : start + batch_size])
+
+    return archived
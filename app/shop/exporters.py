@@ -0,0 +1,46 @@
+import csv
+import io
+import tempfile
+import uuid
+
+from django.core.files import File
+
+from core import models
+
+EXPORTS = {
+    "products": (
+        models.Product,
+        (
+            "id",
+            "name",
+            "buying_price",
+            "avg_buying_price",
+            "selling_price",
+            "stock",
+            "stock_alert_amount",
+        ),
+    ),
+    "customers": (models.Customer, ("id", "name", "contact")),
+    "vendors": (models.Vendor, ("id", "name", "contact")),
+}
+
+
+def export_csv(kind, shop, storage):
+    """Write the objects of a shop into a csv file in storage, returns its name"""
+    model, fields = EXPORTS[kind]
+    rows = (
+        model.objects.for_shop(shop).order_by("id").values_list(*fields).iterator()
+    )
+
+    with tempfile.TemporaryFile() as tmp:
+        text = io.TextIOWrapper(tmp, encoding="utf-8", newline="")
+        writer = csv.writer(text)
+        writer.writerow(fields)
+        writer.writerows(rows)
+        text.flush()
+        tmp.seek(0)
+
+        name = storage.save(f"exports/{kind}-{uuid.uuid4()}.csv", File(tmp))
+        text.detach()
+
+    return name
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest
+from rest_framework import filters
+
+
+class TrigramSearchFilter(filters.SearchFilter):
+    """
+    Ranked prefix and fuzzy search on the search_fields of a view.
+
+    On Postgres names also match by trigram similarity (pg_trgm), prefix
+    matches come first then the most similar ones. Other databases only
+    match prefixes. Results are limited to SEARCH_RESULTS_LIMIT.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        fields = getattr(view, "search_fields", None)
+        term = request.query_params.get(self.search_param, "").strip()
+
+        if not fields or not term or getattr(view, "action", "list") != "list":
+            return queryset
+
+        prefix = Q()
+        for field in fields:
+            prefix |= Q(**{f"{field}__istartswith": term})
+
+        if connection.vendor != "postgresql":
+            queryset = queryset.filter(prefix).order_by(*fields)
+            return queryset[: settings.SEARCH_RESULTS_LIMIT]
+
+        similar = Q()
+        for field in fields:
+            similar |= Q(**{f"{field}__trigram_similar": term})
+
+        similarity = [TrigramSimilarity(field, term) for field in fields]
+        queryset = queryset.filter(prefix | similar).annotate(
+            prefix_match=Case(
+                When(prefix, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            ),
+            similarity=Greatest(*similarity) if len(similarity) > 1 else similarity[0],
+        )
+
+        return queryset.order_by("prefix_match", "-similarity", *fields)[
+            : settings.SEARCH_RESULTS_LIMIT
+        ]
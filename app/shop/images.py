@@ -0,0 +1,51 @@
+import io
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from core.models import content_hashed_name
+
+
+def render(image, size, image_format, **options):
+    """Resize a copy of the image to fit in size and encode it"""
+    variant = image.copy()
+    variant.thumbnail(size, Image.LANCZOS)
+
+    buffer = io.BytesIO()
+    variant.save(buffer, image_format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def process_transaction_image(item):
+    """Create the thumbnail and webp variants of a vendor transaction image"""
+    with item.image.open("rb") as image_file:
+        image = Image.open(image_file)
+        image.load()
+
+    # phone photos are stored sideways with an EXIF orientation tag
+    image = ImageOps.exif_transpose(image)
+
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    thumbnail = render(
+        image,
+        settings.TRANSACTION_THUMBNAIL_SIZE,
+        "JPEG",
+        quality=75,
+        optimize=True,
+        progressive=True,
+    )
+    webp = render(image, settings.TRANSACTION_WEBP_SIZE, "WEBP", quality=80)
+
+    # a retried job replaces the variants it already created
+    for variant in (item.thumbnail, item.image_webp):
+        if variant:
+            variant.delete(save=False)
+
+    item.thumbnail.save(
+        content_hashed_name(thumbnail, "thumbnail.jpg"), thumbnail, save=False
+    )
+    item.image_webp.save(content_hashed_name(webp, "image.webp"), webp, save=False)
+    item.save(update_fields=["thumbnail", "image_webp"])
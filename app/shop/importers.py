@@ -0,0 +1,234 @@
+import csv
+import codecs
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import serializers as drf_serializers
+from rest_framework.settings import api_settings
+
+from core import models
+from shop import serializers
+
+IMPORT_BATCH_SIZE = 1000
+# bulk_update builds one CASE branch per row, keep the statements small
+UPDATE_BATCH_SIZE = 100
+
+
+def decode_upload(upload, encoding="utf-8-sig"):
+    """Lazily decode an uploaded file into text lines for csv"""
+    return codecs.iterdecode(upload, encoding)
+
+
+class CSVImporter:
+    """Validate CSV rows in chunks and upsert them into a shop"""
+
+    model = None
+    serializer_class = None
+
+    def __init__(self, shop, batch_size=IMPORT_BATCH_SIZE):
+        self.shop = shop
+        self.batch_size = batch_size
+        self.validator = self.serializer_class()
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.errors = []
+        # line of the first row of every key, a key may be imported once
+        self.seen = {}
+
+    def key(self, data):
+        """Natural key used to match a row with an existing object"""
+        raise NotImplementedError
+
+    def existing(self, keys):
+        """Return existing objects of the shop for the given keys"""
+        raise NotImplementedError
+
+    def conflicts(self, rows):
+        """Errors of the rows clashing with other objects, by key"""
+        return {}
+
+    def fail(self, line, errors):
+        if not isinstance(errors, dict):
+            errors = {api_settings.NON_FIELD_ERRORS_KEY: errors}
+        self.errors.append({"line": line, "errors": errors})
+
+    def run(self, lines):
+        """Import every row of the csv lines, returns the import report"""
+        reader = csv.DictReader(lines)
+        writable = [
+            name for name, field in self.validator.fields.items() if not field.read_only
+        ]
+        self.update_fields = [
+            name for name in (reader.fieldnames or []) if name in writable
+        ]
+
+        chunk = []
+        # line 1 is the header
+        for line, row in enumerate(reader, start=2):
+            chunk.append((line, row))
+
+            if len(chunk) >= self.batch_size:
+                self.import_chunk(chunk)
+                chunk = []
+
+        if chunk:
+            self.import_chunk(chunk)
+
+        return self.report()
+
+    def validate_chunk(self, chunk):
+        """Validate rows the way ListSerializer does, keeping row errors"""
+        valid = {}
+
+        for line, row in chunk:
+            # empty cells fall back to the model defaults
+            row = {k: v for k, v in row.items() if k is not None and v != ""}
+
+            try:
+                data = self.validator.run_validation(row)
+            except drf_serializers.ValidationError as exc:
+                self.fail(line, exc.detail)
+                continue
+
+            key = self.key(data)
+            if key in self.seen:
+                self.fail(line, [f"Duplicate of line {self.seen[key]}."])
+                continue
+
+            self.seen[key] = line
+            valid[key] = (line, data)
+
+        return valid
+
+    def import_chunk(self, chunk):
+        rows = self.validate_chunk(chunk)
+
+        for key, errors in self.conflicts(rows).items():
+            self.fail(rows.pop(key)[0], errors)
+
+        if not rows:
+            return
+
+        existing = self.existing(rows.keys())
+        to_create = []
+        to_update = []
+        lines = []
+        now = timezone.now()
+
+        for key, (line, data) in rows.items():
+            obj = existing.get(key)
+
+            if obj is None:
+                to_create.append(self.model(shop=self.shop, **data))
+                lines.append(line)
+                continue
+
+            changes = {
+                field: data[field]
+                for field in self.update_fields
+                if field in data and getattr(obj, field) != data[field]
+            }
+
+            # re-importing an unchanged catalog must not rewrite every row
+            if not changes:
+                self.unchanged += 1
+                continue
+
+            for field, value in changes.items():
+                setattr(obj, field, value)
+            obj.modified_timestamp = now
+            to_update.append(obj)
+            lines.append(line)
+
+        # chunks are already bounded, the backend picks its own batch size
+        try:
+            with transaction.atomic():
+                created = self.model.objects.bulk_create(to_create)
+
+                if to_update:
+                    self.model.objects.bulk_update(
+                        to_update,
+                        self.update_fields + ["modified_timestamp"],
+                        batch_size=UPDATE_BATCH_SIZE,
+                    )
+        except IntegrityError:
+            # another write took a key or code of the chunk meanwhile
+            for line in lines:
+                self.fail(line, ["Conflicts with a concurrent change, import again."])
+            return
+
+        self.created += len(created)
+        self.updated += len(to_update)
+
+    def report(self):
+        return {
+            "created": self.created,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "failed": len(self.errors),
+            "errors": sorted(self.errors, key=lambda error: error["line"]),
+        }
+
+
+class ProductImporter(CSVImporter):
+    """Import products matched by name"""
+
+    model = models.Product
+    serializer_class = serializers.ProductSerializer
+
+    def key(self, data):
+        return data["name"]
+
+    def existing(self, keys):
+        queryset = self.model.objects.for_shop(self.shop).filter(name__in=list(keys))
+        return {obj.name: obj for obj in queryset}
+
+    def conflicts(self, rows):
+        """Codes of other products, or of an earlier row of the file"""
+        codes = {data["sku"] for line, data in rows.values() if data.get("sku")}
+
+        if not codes:
+            return {}
+
+        owners = dict(
+            self.model.objects.for_shop(self.shop)
+            .filter(sku__in=codes)
+            .values_list("sku", "name")
+        )
+        claimed = set()
+        conflicts = {}
+
+        for key, (line, data) in rows.items():
+            sku = data.get("sku")
+
+            if not sku:
+                continue
+
+            if sku in claimed or owners.get(sku, key) != key:
+                conflicts[key] = {"sku": ["A product with this code exists."]}
+            else:
+                claimed.add(sku)
+
+        return conflicts
+
+
+class CustomerImporter(CSVImporter):
+    """Import customers matched by name and contact"""
+
+    model = models.Customer
+    serializer_class = serializers.CustomerSerializer
+
+    def key(self, data):
+        return (data["name"], data.get("contact", ""))
+
+    def existing(self, keys):
+        names = [name for name, contact in keys]
+        queryset = self.model.objects.for_shop(self.shop).filter(name__in=names)
+        return {(obj.name, obj.contact): obj for obj in queryset}
+
+
+IMPORTERS = {
+    "products": ProductImporter,
+    "customers": CustomerImporter,
+}
@@ -0,0 +1,236 @@
+import inspect
+import json
+import time
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+
+from core import models
+from core.routers import replica_reads
+from shop import exporters, images, importers
+from shop.reports import daily_bills
+
+REGISTRY = {}
+
+# seconds a running job may take before it is considered abandoned
+STALE_AFTER = 60 * 60
+
+
+def job(kind, public=True, files=()):
+    """
+    Register a job handler, public jobs can be submitted through the API.
+
+    files names the payload keys holding files of job_storage, they are
+    deleted once the job is done or has failed for good.
+    """
+
+    def register(handler):
+        handler.public = public
+        handler.files = files
+        REGISTRY[kind] = handler
+        return handler
+
+    return register
+
+
+def public_kinds():
+    return sorted(kind for kind, handler in REGISTRY.items() if handler.public)
+
+
+def arguments(kind):
+    """Names of the payload keys the handler of a job kind accepts"""
+    parameters = list(inspect.signature(REGISTRY[kind]).parameters.values())[1:]
+
+    return {
+        parameter.name
+        for parameter in parameters
+        if parameter.kind in (parameter.POSITIONAL_OR_KEYWORD, parameter.KEYWORD_ONLY)
+    }
+
+
+def enqueue(kind, shop=None, user=None, payload=None, max_attempts=3):
+    """Add a job to the queue, the payload holds the handler arguments"""
+    if kind not in REGISTRY:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    payload = payload or {}
+    unknown = set(payload) - arguments(kind)
+    if unknown:
+        raise ValueError(f"Unknown arguments of {kind}: {', '.join(sorted(unknown))}")
+
+    return models.Job.objects.create(
+        kind=kind,
+        shop=shop,
+        created_by=user,
+        max_attempts=max_attempts,
+        payload=json.dumps(payload),
+    )
+
+
+def job_storage():
+    """Private storage of the files jobs read and write"""
+    return FileSystemStorage(location=settings.JOB_FILES_ROOT)
+
+
+def save_upload(upload, folder):
+    """Keep an uploaded file for a job under a random name, returns the name"""
+    return job_storage().save(f"{folder}/{uuid.uuid4().hex}.csv", upload)
+
+
+def discard_files(job):
+    """Delete the input files of a job that won't run again"""
+    payload = json.loads(job.payload)
+    storage = job_storage()
+
+    for key in REGISTRY[job.kind].files:
+        if payload.get(key):
+            storage.delete(payload[key])
+
+
+def claim():
+    """Lock the next due job and mark it running, returns None if idle"""
+    now = timezone.now()
+
+    with transaction.atomic():
+        job = (
+            models.Job.objects.select_for_update(skip_locked=True)
+            .filter(status=models.Job.QUEUED, run_after__lte=now)
+            .order_by("run_after", "id")
+            .first()
+        )
+
+        if job is None:
+            return None
+
+        job.status = models.Job.RUNNING
+        job.attempts += 1
+        job.started_timestamp = now
+        job.modified_timestamp = now
+        job.save()
+
+    return job
+
+
+def execute(job):
+    """Run the handler of a claimed job and store its result"""
+    try:
+        result = REGISTRY[job.kind](job, **json.loads(job.payload))
+    except Exception:
+        job.error = traceback.format_exc()
+
+        if job.attempts < job.max_attempts:
+            # exponential backoff: 2, 4, 8... seconds
+            job.status = models.Job.QUEUED
+            job.run_after = timezone.now() + timedelta(seconds=2**job.attempts)
+        else:
+            job.status = models.Job.FAILED
+    else:
+        job.status = models.Job.DONE
+        job.result = json.dumps(result, default=str)
+        job.error = ""
+
+    job.finished_timestamp = timezone.now()
+    job.modified_timestamp = job.finished_timestamp
+    job.save()
+
+    if job.status != models.Job.QUEUED:
+        discard_files(job)
+
+    return job
+
+
+def requeue_stale(stale_after=STALE_AFTER):
+    """
+    Put back jobs whose worker died while running them.
+
+    Jobs out of attempts are failed instead, a job killing its worker every
+    time must not be retried forever. Returns the requeued and failed counts.
+    """
+    limit = timezone.now() - timedelta(seconds=stale_after)
+    stale = models.Job.objects.filter(
+        status=models.Job.RUNNING, started_timestamp__lt=limit
+    )
+    now = timezone.now()
+
+    exhausted = list(stale.filter(attempts__gte=F("max_attempts")))
+    failed = models.Job.objects.filter(
+        pk__in=[job.pk for job in exhausted], status=models.Job.RUNNING
+    ).update(
+        status=models.Job.FAILED,
+        error="The worker stopped while running the job.",
+        finished_timestamp=now,
+        modified_timestamp=now,
+    )
+    requeued = stale.update(status=models.Job.QUEUED, modified_timestamp=now)
+
+    for job in exhausted:
+        discard_files(job)
+
+    return requeued, failed
+
+
+def work(poll_interval=1.0, burst=False):
+    """Process jobs until stopped, or until the queue is empty in burst mode"""
+    while True:
+        try:
+            job = claim()
+        except DatabaseError:
+            # lost connection or lock contention, try again on the next poll
+            close_old_connections()
+            time.sleep(poll_interval)
+            continue
+
+        if job is None:
+            if burst:
+                return
+            time.sleep(poll_interval)
+            continue
+
+        execute(job)
+
+
+@job("sell_report")
+def sell_report(job, date=None):
+    with replica_reads():
+        return daily_bills(models.CustomerOrderedItems, job.shop, date)
+
+
+@job("purchase_report")
+def purchase_report(job, date=None):
+    with replica_reads():
+        return daily_bills(models.VendorOrderedItems, job.shop, date)
+
+
+@job("export")
+def export(job, kind="products"):
+    """Export a csv of the shop, downloaded through the job endpoint"""
+    with replica_reads():
+        name = exporters.export_csv(kind, job.shop, job_storage())
+    return {"file": name, "url": reverse("shop:job-download", args=[job.pk])}
+
+
+@job("import", public=False, files=("file",))
+def import_csv(job, kind, file):
+    """Import an uploaded csv saved by save_upload"""
+    importer = importers.IMPORTERS[kind](job.shop)
+
+    with job_storage().open(file, "rb") as upload:
+        return importer.run(importers.decode_upload(upload))
+
+
+@job("transaction_image", public=False)
+def transaction_image(job, item):
+    """Generate the resized variants of an uploaded transaction image"""
+    item = models.VendorOrderedItems.objects.get(pk=item)
+
+    if item.image:
+        images.process_transaction_image(item)
+
+    return {"thumbnail": item.thumbnail.name, "image_webp": item.image_webp.name}
@@ -0,0 +1,19 @@
+from django.utils.functional import SimpleLazyObject
+
+from shop.tenancy import request_shop
+
+
+class CurrentShopMiddleware:
+    """
+    Set request.shop, the shop of the request user.
+
+    The shop is resolved lazily on first access, token authentication of the
+    api views happens after the middlewares ran.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.shop = SimpleLazyObject(lambda: request_shop(request))
+        return self.get_response(request)
@@ -1,236 +1,260 @@
 from rest_framework import permissions
-from core import models
 
+from shop.tenancy import request_role, request_shop
+
+ANY = "*"
+SAFE = permissions.SAFE_METHODS
+
+# role of a user without shop memberships, from the flags on the user
+ROLES = (
+    ("is_superuser", "admin"),
+    ("is_owner", "owner"),
+    ("is_manager", "manager"),
+    ("is_salesman", "salesman"),
+)
+
+# methods allowed per resource and role, anything missing is denied.
+# Every role except admin also needs a shop.
+PERMISSION_MATRIX = {
+    "shop": {
+        "admin": ANY,
+        "owner": ("GET", "PUT", "PATCH"),
+    },
+    "warehouse": {
+        "owner": ANY,
+        "manager": SAFE,
+        "salesman": SAFE,
+    },
+    "product": {
+        "owner": ANY,
+        "manager": ("POST", "GET", "PUT", "PATCH"),
+        "salesman": ("GET",),
+    },
+    "customer": {
+        "owner": ANY,
+        "manager": SAFE,
+        "salesman": SAFE,
+    },
+    "vendor": {
+        "owner": ANY,
+        "manager": SAFE,
+        "salesman": SAFE,
+    },
+    "transaction": {
+        "owner": ANY,
+        "manager": ("POST", "GET", "PUT", "PATCH"),
+        "salesman": ("POST", "GET", "PUT", "PATCH"),
+    },
+    "bill": {
+        "owner": ("GET", "PUT", "PATCH"),
+        "manager": ("GET", "PUT", "PATCH"),
+        "salesman": ("GET", "PUT", "PATCH"),
+    },
+    "due_list": {
+        "owner": SAFE,
+        "manager": SAFE,
+        "salesman": SAFE,
+    },
+    # PATCH is restricted for the stock calculation purpose
+    "ordered_items": {
+        "owner": ("GET", "HEAD", "OPTIONS", "POST", "PUT", "DELETE"),
+        "manager": ("POST", "GET", "PUT"),
+        "salesman": ("POST", "GET", "PUT"),
+    },
+    "move_product": {
+        "owner": ("GET", "POST"),
+        "manager": ("GET", "POST"),
+        "salesman": ("GET", "POST"),
+    },
+    "expense": {
+        "owner": ANY,
+        "manager": ("GET", "POST"),
+        "salesman": ("GET", "POST"),
+    },
+    "report": {
+        "owner": ("GET", "POST"),
+        "manager": ("GET", "POST"),
+        "salesman": ("GET", "POST"),
+    },
+    "owner_report": {
+        "owner": SAFE,
+    },
+    "job": {
+        "owner": ("GET", "POST"),
+        "manager": ("GET", "POST"),
+        "salesman": ("GET", "POST"),
+    },
+    "checkout": {
+        "owner": ("POST",),
+        "manager": ("POST",),
+        "salesman": ("POST",),
+    },
+    "archive": {
+        "owner": SAFE,
+        "manager": SAFE,
+        "salesman": SAFE,
+    },
+}
+
+
+def compile_matrix(matrix):
+    """Flatten the matrix into a set of (role, resource, method) keys"""
+    table = set()
+
+    for resource, roles in matrix.items():
+        for role, methods in roles.items():
+            for method in (ANY,) if methods == ANY else methods:
+                table.add((role, resource, method))
+
+    return frozenset(table)
+
+
+PERMISSION_TABLE = compile_matrix(PERMISSION_MATRIX)
+
+
+def user_roles(user):
+    return [role for attr, role in ROLES if getattr(user, attr, False)]
+
+
+def is_allowed(role, resource, method):
+    table = PERMISSION_TABLE
+    return (role, resource, method) in table or (role, resource, ANY) in table
+
+
+def request_roles(request):
+    """Roles of the request user, the membership decides the role in a shop"""
+    roles = user_roles(request.user)
+    role = request_role(request)
+
+    if role is not None:
+        return [name for name in roles if name == "admin"] + [role]
+
+    return roles
+
+
+def has_access(request, resource):
+    """Check the matrix for the roles of the request user"""
+    for role in request_roles(request):
+        if not is_allowed(role, resource, request.method):
+            continue
+
+        if role == "admin" or request_shop(request) is not None:
+            return True
+
+    return False
+
+
+class MatrixPermission(permissions.BasePermission):
+    """Allowing/Restricting user by the permission matrix of a resource"""
+
+    resource = None
+    message = "You must have a shop to access this."
 
-def getShop(user):
-    if user.is_owner:
-        return models.Shop.objects.get(owner=user)
-
-    if user.is_manager or user.is_salesman:
-        created_by = user.created_by
-        return models.Shop.objects.get(owner=created_by)
+    def has_permission(self, request, view):
+        return has_access(request, self.resource)
 
 
-class ShopAccessPermission(permissions.BasePermission):
+class ShopAccessPermission(MatrixPermission):
     """Allowing/Restricting user to update their profile"""
 
-    message = "You must have a shop to access this."
-
-    def has_permission(self, request, obj):
-        try:
-            if request.user.is_superuser:
-                return True
-
-            if (
-                request.user.is_owner
-                and getShop(request.user)
-                and request.method
-                in [
-                    "GET",
-                    "PUT",
-                    "PATCH",
-                ]
-            ):
-                return True
-        except:
-            return False
-
-
-class WarehouseAccessPermission(permissions.BasePermission):
-    """Allowing/Restricting user to access warehouse"""
-
-    message = "You must have a shop to access this."
+    resource = "shop"
 
-    def has_permission(self, request, obj):
-        try:
-            if getShop(request.user):
-                if request.user.is_owner:
-                    return True
 
-                if (
-                    request.user.is_salesman or request.user.is_manager
-                ) and request.method in permissions.SAFE_METHODS:
-                    return True
+class WarehouseAccessPermission(MatrixPermission):
+    """Allowing/Restricting user to access warehouse"""
 
-        except:
-            return False
+    resource = "warehouse"
 
 
-class ProductAccessPermission(permissions.BasePermission):
+class ProductAccessPermission(MatrixPermission):
     """Allowing/Restricting user to access Product"""
 
-    message = "You must have a shop to access this."
-
-    def has_permission(self, request, obj):
-        try:
-            if getShop(request.user):
-                if request.user.is_owner:
-                    return True
+    resource = "product"
 
-                if request.user.is_manager and request.method in [
-                    "POST",
-                    "GET",
-                    "PUT",
-                    "PATCH",
-                ]:
-                    return True
 
-                if request.user.is_salesman and request.method == "GET":
-                    return True
-
-        except:
-            return False
-
-
-class CustomerAccessPermission(permissions.BasePermission):
+class CustomerAccessPermission(MatrixPermission):
     """Allowing/Restricting user to access Customer"""
 
-    message = "You must have a shop to access this."
-
-    def has_permission(self, request, obj):
-        try:
-            if getShop(request.user):
-                if request.user.is_owner:
-                    return True
+    resource = "customer"
 
-                if (
-                    request.user.is_salesman or request.user.is_manager
-                ) and request.method in permissions.SAFE_METHODS:
-                    return True
 
-        except:
-            return False
-
-
-class VendorAccessPermission(permissions.BasePermission):
+class VendorAccessPermission(MatrixPermission):
     """Allowing/Restricting user to access Customer"""
 
-    message = "You must have a shop to access this."
-
-    def has_permission(self, request, obj):
-        try:
-            if getShop(request.user):
-                if request.user.is_owner:
-                    return True
+    resource = "vendor"
 
-                if (
-                    request.user.is_salesman or request.user.is_manager
-                ) and request.method in permissions.SAFE_METHODS:
-                    return True
 
-        except:
-            return False
-
-
-class CustomerTransactionPermission(permissions.BasePermission):
+class CustomerTransactionPermission(MatrixPermission):
     """Allowing/Restricting user to access the transactions"""
 
-    message = "You must have a shop to access this."
-
-    def has_permission(self, request, obj):
-        try:
-            if getShop(request.user):
-                if request.user.is_owner:
-                    return True
-
-                if (
-                    request.user.is_manager or request.user.is_salesman
-                ) and request.method in ["POST", "GET", "PUT", "PATCH"]:
-                    return True
-        except:
-            pass
+    resource = "transaction"
 
 
-class CustomerTrasnscationBillPermission(permissions.BasePermission):
+class CustomerTrasnscationBillPermission(MatrixPermission):
     """Allowing/Restricting user to access the transactions"""
 
+    resource = "bill"
     message = "Mehtod allowed: GET | You must have a shop to access this."
 
-    def has_permission(self, request, obj):
-        try:
-            if getShop(request.user) and request.method in [
-                "GET",
-                "PUT",
-                "PATCH",
-            ]:
-                return True
-        except:
-            pass
 
-
-class CustomerTrasnscationDueListPermission(permissions.BasePermission):
+class CustomerTrasnscationDueListPermission(MatrixPermission):
     """Allowing/Restricting user to access the transactions"""
 
+    resource = "due_list"
     message = "Mehtod allowed: GET | You must have a shop to access this."
 
-    def has_permission(self, request, obj):
-        try:
-            if getShop(request.user) and request.method in permissions.SAFE_METHODS:
-                return True
-        except:
-            pass
-
 
-class CustomerOrderedItemsPermission(permissions.BasePermission):
+class CustomerOrderedItemsPermission(MatrixPermission):
     """Allowing/Restricting user to access the transactions"""
 
+    resource = "ordered_items"
     message = "PATCH method not allowed | You must have a shop to access this."
 
-    def has_permission(self, request, obj):
-        try:
-            if request.method == "PATCH":
-                """ we are restricting PATCH method to stock calculation purpose"""
-                return False
 
-            if getShop(request.user):
-                if request.user.is_owner:
-                    return True
+class MoveProductPermission(MatrixPermission):
+    """Allowing/Restricting user to access the transactions"""
 
-                if (
-                    request.user.is_manager or request.user.is_salesman
-                ) and request.method in ["POST", "GET", "PUT"]:
-                    return True
-        except:
-            pass
+    resource = "move_product"
+    message = "Mehtod allowed: GET | You must have a shop to access this."
 
 
-class MoveProductPermission(permissions.BasePermission):
-    """Allowing/Restricting user to access the transactions"""
+class ExpensePermission(MatrixPermission):
+    """Allowing/Restricting user to access the expense"""
 
+    resource = "expense"
     message = "Mehtod allowed: GET | You must have a shop to access this."
 
-    def has_permission(self, request, obj):
-        try:
-            if getShop(request.user) and request.method in ["GET", "POST"]:
-                return True
-        except:
-            pass
-
 
-class ExpensePermission(permissions.BasePermission):
+class ReportViewPermission(MatrixPermission):
     """Allowing/Restricting user to access the expense"""
 
+    resource = "report"
     message = "Mehtod allowed: GET | You must have a shop to access this."
 
-    def has_permission(self, request, obj):
-        try:
-            if getShop(request.user) and request.user.is_owner:
-                return True
 
-            if getShop(request.user) and request.method in ["GET", "POST"]:
-                return True
-        except:
-            pass
+class OwnerReportPermission(MatrixPermission):
+    """Allowing/Restricting owners to read the report of all their shops"""
 
+    resource = "owner_report"
+    message = "Mehtod allowed: GET | You must own a shop to access this."
 
-class ReportViewPermission(permissions.BasePermission):
-    """Allowing/Restricting user to access the expense"""
 
+class JobPermission(MatrixPermission):
+    """Allowing/Restricting user to access the background jobs"""
+
+    resource = "job"
+    message = "Mehtod allowed: GET, POST | You must have a shop to access this."
+
+
+class ArchivePermission(MatrixPermission):
+    """Allowing/Restricting user to read the archived transactions"""
+
+    resource = "archive"
     message = "Mehtod allowed: GET | You must have a shop to access this."
 
-    def has_permission(self, request, obj):
-        try:
-            if getShop(request.user) and request.method in ["GET", "POST"]:
-                return True
-        except:
-            pass
\ No newline at end of file
+
+class CheckoutPermission(MatrixPermission):
+    """Allowing/Restricting user to sell with a checkout"""
+
+    resource = "checkout"
+    message = "Mehtod allowed: POST | You must have a shop to access this."
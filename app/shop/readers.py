@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+
+def identity(value):
+    return value
+
+
+def iso_datetime(value):
+    """DateTimeField.to_representation of aware datetimes in ISO 8601"""
+    value = value.astimezone(timezone.get_current_timezone()).isoformat()
+    return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+
+class ValuesReader:
+    """
+    Rows of a queryset shaped like a model serializer renders them.
+
+    The fields of the serializer are turned once into (name, column,
+    mapper) triples. Rows are then read with values() and mapped without
+    building model instances or bound serializer fields. Only plain model
+    fields and primary key relations are supported, a serializer with its
+    own to_representation can't be read this way.
+    """
+
+    # database values of these fields already are what to_representation
+    # returns, other fields go through their to_representation
+    PLAIN_FIELDS = (
+        serializers.IntegerField,
+        serializers.CharField,
+        serializers.BooleanField,
+        serializers.PrimaryKeyRelatedField,
+    )
+
+    def __init__(self, serializer_class):
+        if (
+            serializer_class.to_representation
+            is not serializers.ModelSerializer.to_representation
+        ):
+            raise ImproperlyConfigured(
+                f"{serializer_class.__name__} renders its own representation"
+            )
+
+        self.mappers = []
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+
+            if isinstance(field, serializers.PrimaryKeyRelatedField):
+                column = f"{field.source}_id"
+            elif (
+                isinstance(field, (serializers.ModelField, serializers.FileField))
+                or "." in field.source
+            ):
+                raise ImproperlyConfigured(f"Field {name} can't be read from values")
+            else:
+                column = field.source
+
+            if isinstance(field, self.PLAIN_FIELDS):
+                mapper = identity
+            elif self.is_iso_datetime(field):
+                mapper = iso_datetime
+            else:
+                mapper = field.to_representation
+
+            self.mappers.append((name, column, mapper))
+
+        self.columns = [column for name, column, mapper in self.mappers]
+
+    @staticmethod
+    def is_iso_datetime(field):
+        output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+
+        return (
+            isinstance(field, serializers.DateTimeField)
+            and settings.USE_TZ
+            and not hasattr(field, "timezone")
+            and output_format is not None
+            and output_format.lower() == ISO_8601
+        )
+
+    def rows(self, queryset):
+        """Represented rows of the queryset, as the serializer would list them"""
+        mappers = self.mappers
+
+        return [
+            {
+                name: None if row[column] is None else mapper(row[column])
+                for name, column, mapper in mappers
+            }
+            for row in queryset.values(*self.columns)
+        ]
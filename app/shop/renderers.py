@@ -0,0 +1,91 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import msgpack
+except ImportError:  # optional, the msgpack format is left out without it
+    msgpack = None
+
+EPOCH = date(1970, 1, 1)
+
+
+def encode_value(value):
+    """Dates as days and datetimes as seconds since the epoch"""
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, date):
+        return (value - EPOCH).days
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def columns(rows, names):
+    """
+    Parallel arrays of a list of rows, one per key of the rows.
+
+    names maps the keys of the rows to the names of their arrays, keys
+    missing from it keep their own name.
+    """
+    if not rows:
+        return {name: [] for name in names.values()}
+
+    return {
+        names.get(key, key): [encode_value(row[key]) for row in rows] for key in rows[0]
+    }
+
+
+class ColumnarMixin:
+    """Renders the rows of a successful list response as parallel arrays"""
+
+    def columnar(self, data, renderer_context):
+        response = (renderer_context or {}).get("response")
+
+        if not isinstance(data, list) or (response and response.exception):
+            return data
+
+        view = (renderer_context or {}).get("view")
+        return columns(data, getattr(view, "columnar_fields", {}))
+
+
+class ColumnarJSONRenderer(ColumnarMixin, JSONRenderer):
+    """JSON of parallel arrays, picked with ?format=columnar"""
+
+    format = "columnar"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(
+            self.columnar(data, renderer_context),
+            accepted_media_type,
+            renderer_context,
+        )
+
+
+class MessagePackRenderer(ColumnarMixin, BaseRenderer):
+    """Binary MessagePack of parallel arrays, picked with ?format=msgpack"""
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        return msgpack.packb(
+            self.columnar(data, renderer_context),
+            default=str,
+            use_bin_type=True,
+        )
+
+
+# renderers of the report like endpoints, MessagePack when it is installed
+REPORT_RENDERERS = (
+    tuple(api_settings.DEFAULT_RENDERER_CLASSES)
+    + (ColumnarJSONRenderer,)
+    + ((MessagePackRenderer,) if msgpack is not None else ())
+)
@@ -0,0 +1,221 @@
+import hashlib
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, Count, DateField, F, IntegerField, Min, Sum, When
+from django.db.models.functions import Trunc
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from core import models
+
+# upper bounds in days of the due aging buckets, the last one is open ended
+AGING_BUCKETS = (("due_0_30", 30), ("due_31_60", 60), ("due_60_plus", None))
+
+# daily rollups of the archived ordered items, per ordered items model
+ROLLUP_KINDS = {
+    models.CustomerOrderedItems: models.DailyBillRollup.SELL,
+    models.VendorOrderedItems: models.DailyBillRollup.PURCHASE,
+}
+
+# figures of the owner report: the model and the summed column of each
+OWNER_FIGURES = {
+    "sales": (models.CustomerOrderedItems, "bill"),
+    "purchases": (models.VendorOrderedItems, "bill"),
+    "expenses": (models.Expense, "amount"),
+    "customer_due": (models.CustomerTrasnscationBill, "due"),
+    "vendor_due": (models.VendorTrasnscationBill, "due"),
+}
+
+# owner report figures of the daily rollup kinds
+ROLLUP_FIGURES = {
+    models.DailyBillRollup.SELL: "sales",
+    models.DailyBillRollup.PURCHASE: "purchases",
+}
+
+# periods of the owner report, as Trunc kinds
+PERIODS = ("day", "month")
+
+
+def to_date(value):
+    day = parse_date(value) if isinstance(value, str) else value
+
+    if day is None:
+        raise ValueError(f"Invalid date: {value}")
+
+    return day
+
+
+def day_range(day):
+    """
+    Start and end of a local day, as bounds on created_timestamp.
+
+    Unlike a __date lookup the bounds let Postgres skip the partitions
+    and index ranges of the other days.
+    """
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return (start, start + timedelta(days=1) - timedelta(microseconds=1))
+
+
+def daily_bills(model, shop, date=None):
+    """
+    Sum of bills of a shop grouped by day, optionally for a single day.
+
+    Days of archived transactions come from the daily rollups.
+    """
+
+    # Ref of Group by SUM
+    # https://stackoverflow.com/questions/18144907/how-to-rename-fields-of-an-annotated-query/38104242
+
+    queryset = (
+        model.objects.for_shop(shop)
+        .values("created_timestamp__date")
+        .annotate(bill=Sum("bill"))
+    )
+
+    rollups = models.DailyBillRollup.objects.for_shop(shop).filter(
+        kind=ROLLUP_KINDS.get(model)
+    )
+
+    if date:
+        day = to_date(date)
+        queryset = queryset.filter(created_timestamp__range=day_range(day))
+        rollups = rollups.filter(date=day)
+
+    bills = defaultdict(int)
+    for x in queryset:
+        bills[x["created_timestamp__date"]] += x["bill"]
+    for day, bill in rollups.values_list("date", "bill"):
+        bills[day] += bill
+
+    return [{"date": day, "bill": bill} for day, bill in sorted(bills.items())]
+
+
+def aging_buckets(now):
+    """Conditional sums of due, one per aging bucket"""
+    buckets = {}
+    newer_than = now
+
+    for name, days in AGING_BUCKETS:
+        condition = {"created_timestamp__lte": newer_than}
+
+        if days is not None:
+            newer_than = now - timedelta(days=days)
+            condition["created_timestamp__gt"] = newer_than
+
+        buckets[name] = Sum(
+            Case(
+                When(then=F("due"), **condition),
+                default=0,
+                output_field=IntegerField(),
+            )
+        )
+
+    return buckets
+
+
+def due_ledger(model, party, shop):
+    """Open dues of a shop aggregated per customer or vendor"""
+    queryset = (
+        model.objects.for_shop(shop)
+        .filter(due__gt=0)
+        .values(f"order__{party}", f"order__{party}__name")
+        .annotate(
+            total_due=Sum("due"),
+            oldest_due=Min("created_timestamp"),
+            transactions=Count("id"),
+            **aging_buckets(timezone.now()),
+        )
+        .order_by("-total_due")
+    )
+
+    return [
+        {
+            party: x[f"order__{party}"],
+            "name": x[f"order__{party}__name"],
+            "total_due": x["total_due"],
+            "oldest_due": x["oldest_due"],
+            "transactions": x["transactions"],
+            **{name: x[name] for name, days in AGING_BUCKETS},
+        }
+        for x in queryset
+    ]
+
+
+def owner_summary(shop_ids, period="month", start=None, end=None):
+    """
+    Sales, purchases, expenses and dues of several shops per shop and period.
+
+    Every figure is one query grouped by shop and period over all the
+    shops, the archived sales and purchases come from the daily rollups.
+    Dues are the ones left on the bills of the period.
+    """
+    since = day_range(start)[0] if start else None
+    until = day_range(end)[1] if end else None
+    rows = defaultdict(lambda: dict.fromkeys(OWNER_FIGURES, 0))
+
+    def grouped(queryset, column, *fields):
+        return (
+            queryset.filter(shop_id__in=shop_ids)
+            .annotate(period=Trunc(column, period, output_field=DateField()))
+            .order_by()
+            .values_list("shop", "period", *fields)
+        )
+
+    for name, (model, field) in OWNER_FIGURES.items():
+        queryset = model.objects.all()
+        if since:
+            queryset = queryset.filter(created_timestamp__gte=since)
+        if until:
+            queryset = queryset.filter(created_timestamp__lte=until)
+
+        for shop_id, day, total in grouped(queryset, "created_timestamp").annotate(
+            total=Sum(field)
+        ):
+            rows[shop_id, day][name] += total or 0
+
+    rollups = models.DailyBillRollup.objects.all()
+    if start:
+        rollups = rollups.filter(date__gte=start)
+    if end:
+        rollups = rollups.filter(date__lte=end)
+
+    for shop_id, day, kind, total in grouped(rollups, "date", "kind").annotate(
+        total=Sum("bill")
+    ):
+        rows[shop_id, day][ROLLUP_FIGURES[kind]] += total
+
+    totals = defaultdict(lambda: dict.fromkeys(OWNER_FIGURES, 0))
+    for (shop_id, day), figures in rows.items():
+        for name, value in figures.items():
+            totals[day][name] += value
+
+    return {
+        "period": period,
+        "shops": [
+            {"shop": shop_id, "period": day, **figures}
+            for (shop_id, day), figures in sorted(
+                rows.items(), key=lambda x: (x[0][1], x[0][0])
+            )
+        ],
+        "totals": [
+            {"period": day, **figures} for day, figures in sorted(totals.items())
+        ],
+    }
+
+
+def owner_report(user_id, shop_ids, period="month", start=None, end=None):
+    """owner_summary of the shops of an owner, cached per owner and period"""
+    shops = hashlib.sha1(
+        ",".join(str(shop_id) for shop_id in sorted(shop_ids)).encode()
+    ).hexdigest()
+    key = f"owner-report:{user_id}:{period}:{start}:{end}:{shops}"
+    report = cache.get(key)
+
+    if report is None:
+        report = owner_summary(shop_ids, period, start, end)
+        cache.set(key, report, settings.OWNER_REPORT_TIMEOUT)
+
+    return report
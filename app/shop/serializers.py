@@ -1,14 +1,43 @@
+import json
+
+from django.conf import settings
 from rest_framework import serializers
-from core import models
+from core import codes, models
+from shop import archive, services
+
+
+class ShopRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Related field accepting the objects of the request shop only.
+
+    The queryset is filtered when input is validated, serializing
+    objects doesn't need the shop of the request.
+    """
+
+    def get_queryset(self):
+        request = self.context.get("request")
+
+        if request is None:
+            return self.queryset.none()
+
+        return self.queryset.for_shop(request.shop)
+
+
+def product_from_code(serializer, data):
+    """Product of an order line, from its product id or its scanned code"""
+    code = data.pop("code", None)
 
+    if code is None:
+        return data.get("product")
 
-def getShop(user):
-    if user.is_owner:
-        return models.Shop.objects.get(owner=user)
+    shop = serializer.context["request"].shop
+    product = codes.find_products(shop, [code]).get(code)
 
-    if user.is_manager or user.is_salesman:
-        created_by = user.created_by
-        return models.Shop.objects.get(owner=created_by)
+    if product is None:
+        raise serializers.ValidationError({"code": ["Unknown product code."]})
+
+    data["product"] = product
+    return product
 
 
 class ShopSerializer(serializers.ModelSerializer):
@@ -111,11 +140,29 @@ class SalesmanSerializer(serializers.Serializer):
 class ProductSerializer(serializers.ModelSerializer):
     """Serializer for product"""
 
+    def validate_sku(self, sku):
+        """Restricting codes to one product per shop"""
+        sku = sku or None
+        request = self.context.get("request")
+
+        if sku is None or request is None:
+            return sku
+
+        products = models.Product.objects.for_shop(request.shop).filter(sku=sku)
+        if self.instance is not None:
+            products = products.exclude(pk=self.instance.pk)
+
+        if products.exists():
+            raise serializers.ValidationError("A product with this code exists.")
+
+        return sku
+
     class Meta:
         model = models.Product
         fields = (
             "id",
             "name",
+            "sku",
             "buying_price",
             "avg_buying_price",
             "selling_price",
@@ -132,6 +179,8 @@ class ProductSerializer(serializers.ModelSerializer):
             "created_timestamp",
             "modified_timestamp",
         )
+        # products without a code are allowed, see validate_sku
+        extra_kwargs = {"sku": {"required": False}}
 
 
 class CustomerSerializer(serializers.ModelSerializer):
@@ -169,13 +218,7 @@ class VendorSerializer(serializers.ModelSerializer):
 class CustomerTrasnscationSerializer(serializers.ModelSerializer):
     """Serializer for customer product transaction"""
 
-    def __init__(self, *args, **kwargs):
-        """Filter customers by shop"""
-
-        super(CustomerTrasnscationSerializer, self).__init__(*args, **kwargs)
-
-        own_shop = getShop(user=self.context["request"].user)
-        self.fields["customer"].queryset = models.Customer.objects.filter(shop=own_shop)
+    serializer_related_field = ShopRelatedField
 
     class Meta:
         model = models.CustomerTrasnscation
@@ -192,9 +235,13 @@ class CustomerTrasnscationSerializer(serializers.ModelSerializer):
 class CustomerOrderedItemsSerializer(serializers.ModelSerializer):
     """Serializer for ordered products"""
 
+    serializer_related_field = ShopRelatedField
+
+    code = serializers.CharField(write_only=True, required=False)
+
     def validate(self, data):
-        product = data["product"]
-        data["product_detail"] = data["product"]
+        product = product_from_code(self, data)
+        data["product_detail"] = product
         # data["selling_price"] = product.selling_price
         quantity = data["quantity"]
         order = data["order"]
@@ -204,6 +251,7 @@ class CustomerOrderedItemsSerializer(serializers.ModelSerializer):
         if order is None:
             raise serializers.ValidationError("No order has been selected.")
 
+        services.lock_order(order)
         exists = models.CustomerOrderedItems.objects.filter(
             product=product, order=order
         )
@@ -213,27 +261,11 @@ class CustomerOrderedItemsSerializer(serializers.ModelSerializer):
         if exists:
             raise serializers.ValidationError("Duplicate entires not allowed.")
 
-        stock = product.stock - quantity
-
-        if stock < 0:
+        if not services.take_stock(product, quantity):
             raise serializers.ValidationError("Insufficient stock.")
 
-        product.stock = stock
-        product.save()
-
         return data
 
-    def __init__(self, *args, **kwargs):
-        """Filter customers by shop"""
-
-        super(CustomerOrderedItemsSerializer, self).__init__(*args, **kwargs)
-
-        own_shop = getShop(user=self.context["request"].user)
-        self.fields["product"].queryset = models.Product.objects.filter(shop=own_shop)
-        self.fields["order"].queryset = models.CustomerTrasnscation.objects.filter(
-            shop=own_shop
-        )
-
     class Meta:
         model = models.CustomerOrderedItems
         fields = (
@@ -241,6 +273,7 @@ class CustomerOrderedItemsSerializer(serializers.ModelSerializer):
             "order",
             "shop",
             "product",
+            "code",
             "product_detail",
             "custom_selling_price",
             "quantity",
@@ -256,6 +289,8 @@ class CustomerOrderedItemsSerializer(serializers.ModelSerializer):
             "created_timestamp",
             "modified_timestamp",
         )
+        # lines name their product by id or by scanned code
+        extra_kwargs = {"product": {"required": False}}
 
     def to_representation(self, instance):
         """For the nested represtation"""
@@ -271,53 +306,96 @@ class CustomerOrderedItemsUpdateSerializer(CustomerOrderedItemsSerializer):
     """Update Serializer for ordered products"""
 
     def validate(self, data):
-        product = data["product"]
+        product = product_from_code(self, data)
         quantity = data["quantity"]
-        order = data["order"]
+        order = data.get("order")
 
         if product is None:
             raise serializers.ValidationError("No product has been selected.")
         if order is None:
             raise serializers.ValidationError("No order has been selected.")
 
-        exists = models.CustomerOrderedItems.objects.filter(
-            product=product, order=order
-        )[0]
+        services.lock_order(order)
+        previous = models.CustomerOrderedItems.objects.select_for_update().get(
+            pk=self.instance.pk
+        )
 
-        stock = product.stock + exists.quantity
-        stock -= quantity
+        if (
+            models.CustomerOrderedItems.objects.filter(product=product, order=order)
+            .exclude(pk=previous.pk)
+            .exists()
+        ):
+            raise serializers.ValidationError("Duplicate entires not allowed.")
 
+        data["product_detail"] = product
         data["bill"] = product.selling_price * quantity
 
-        if stock < 0:
+        # the previous quantity goes back to the product it was taken from
+        if previous.product_id is not None:
+            services.take_stock(previous.product, -previous.quantity)
+        if not services.take_stock(product, quantity):
             raise serializers.ValidationError("Insufficient stock.")
 
-        product.stock = stock
-        product.save()
+        return data
+
+
+class CheckoutLineSerializer(serializers.Serializer):
+    """Serializer for a line of a checkout"""
+
+    # products of all lines are fetched by the checkout with one query,
+    # scanned codes are resolved from the code maps of core.codes
+    product = serializers.IntegerField(required=False)
+    code = serializers.CharField(required=False)
+    quantity = serializers.IntegerField(min_value=1)
+    custom_selling_price = serializers.IntegerField(min_value=0, required=False)
+
+    def validate(self, data):
+        if ("product" in data) == ("code" in data):
+            raise serializers.ValidationError("Either a product or a code is needed.")
 
         return data
 
 
-class CustomerTrasnscationBillSerializer(serializers.ModelSerializer):
-    """Serializer for Customer transaction bill"""
+class CheckoutSerializer(serializers.Serializer):
+    """Serializer for selling products to a customer in one request"""
 
-    def __init__(self, *args, **kwargs):
-        """Filter customers by shop"""
+    customer = ShopRelatedField(queryset=models.Customer.objects.all())
+    items = CheckoutLineSerializer(many=True, allow_empty=False)
+    paid = serializers.IntegerField(min_value=0, default=0)
 
-        super(CustomerTrasnscationBillSerializer, self).__init__(*args, **kwargs)
+    def to_representation(self, instance):
+        return {
+            "id": instance.id,
+            "customer": instance.customer_id,
+            "created_timestamp": instance.created_timestamp,
+            "bill": CustomerTrasnscationBillSerializer(
+                instance.customertrasnscationbill
+            ).data,
+            "items": [
+                {
+                    "product": item.product_id,
+                    "quantity": item.quantity,
+                    "custom_selling_price": item.custom_selling_price,
+                    "bill": item.bill,
+                }
+                for item in instance.items
+            ],
+        }
 
-        own_shop = getShop(self.context["request"].user)
-        self.fields["order"].queryset = models.CustomerTrasnscation.objects.filter(
-            shop=own_shop
-        )
+
+class CustomerTrasnscationBillSerializer(serializers.ModelSerializer):
+    """Serializer for Customer transaction bill"""
 
     def validate(self, data):
         order = self.instance.order
         total_bill = 0
 
-        previous_paid = models.CustomerTrasnscationBill.objects.get(
-            id=self.instance.id
-        ).paid
+        # locked until the payment is saved, concurrent payments queue
+        previous_paid = (
+            models.CustomerTrasnscationBill.objects.select_for_update()
+            .get(id=self.instance.id)
+            .paid
+        )
         new_paid = data["paid"]
 
         shop = self.instance.shop
@@ -334,8 +412,7 @@ class CustomerTrasnscationBillSerializer(serializers.ModelSerializer):
         if data["paid"] > total_bill:
             raise serializers.ValidationError("Over paid")
 
-        shop.money += new_paid
-        shop.save()
+        services.add_money(shop, new_paid)
 
         return data
 
@@ -365,13 +442,7 @@ class CustomerTrasnscationBillSerializer(serializers.ModelSerializer):
 class VendorTrasnscationSerializer(serializers.ModelSerializer):
     """Serializer for vendor product transaction"""
 
-    def __init__(self, *args, **kwargs):
-        """Filter vendors by shop"""
-
-        super(VendorTrasnscationSerializer, self).__init__(*args, **kwargs)
-
-        own_shop = getShop(self.context["request"].user)
-        self.fields["vendor"].queryset = models.Vendor.objects.filter(shop=own_shop)
+    serializer_related_field = ShopRelatedField
 
     class Meta:
         model = models.VendorTrasnscation
@@ -382,21 +453,44 @@ class VendorTrasnscationSerializer(serializers.ModelSerializer):
 class VendorTrasnscationImageSerializer(serializers.ModelSerializer):
     """Serializer for vendor product transaction"""
 
+    def validate_image(self, image):
+        """Reject images too big to be processed"""
+
+        if image.size > settings.TRANSACTION_IMAGE_MAX_BYTES:
+            raise serializers.ValidationError(
+                f"Image must be at most {settings.TRANSACTION_IMAGE_MAX_BYTES} bytes."
+            )
+
+        # the header was already parsed by Pillow when validating the image
+        if max(image.image.size) > settings.TRANSACTION_IMAGE_MAX_DIMENSION:
+            raise serializers.ValidationError(
+                "Image must be at most "
+                f"{settings.TRANSACTION_IMAGE_MAX_DIMENSION} pixels wide and high."
+            )
+
+        return image
+
     class Meta:
         model = models.VendorOrderedItems
         fields = (
             "id",
             "image",
+            "thumbnail",
+            "image_webp",
         )
-        read_only_fields = ("id",)
+        read_only_fields = ("id", "thumbnail", "image_webp")
 
 
 class VendorOrderedItemsSerializer(serializers.ModelSerializer):
     """Serializer for ordered products"""
 
+    serializer_related_field = ShopRelatedField
+
+    code = serializers.CharField(write_only=True, required=False)
+
     def validate(self, data):
-        product = data["product"]
-        data["product_detail"] = data["product"]
+        product = product_from_code(self, data)
+        data["product_detail"] = product
         # data["buying_price"] = product.buying_price
         quantity = data["quantity"]
         order = data["order"]
@@ -409,37 +503,19 @@ class VendorOrderedItemsSerializer(serializers.ModelSerializer):
         if warehouse is None:
             raise serializers.ValidationError("No warehouse has been selected.")
 
-        data["bill"] = data["custom_buying_price"] * quantity
-
-        stock = product.stock + quantity
+        services.lock_order(order)
+        if models.VendorOrderedItems.objects.filter(
+            product=product, order=order, delivery_warehouse=warehouse
+        ).exists():
+            raise serializers.ValidationError("Duplicate entires not allowed.")
 
-        """Changing Product avg_buying_price"""
-        if product.avg_buying_price == 0:
-            product.avg_buying_price = data["custom_buying_price"]
-        else:
-            product.avg_buying_price = (
-                data["custom_buying_price"] + product.avg_buying_price
-            ) / 2
+        data["bill"] = data["custom_buying_price"] * quantity
 
-        product.stock = stock
-        product.save()
+        # Changing Product stock and avg_buying_price
+        services.receive_stock(product, quantity, data["custom_buying_price"])
 
         return data
 
-    def __init__(self, *args, **kwargs):
-        """Filter vendors by shop"""
-
-        super(VendorOrderedItemsSerializer, self).__init__(*args, **kwargs)
-
-        own_shop = getShop(self.context["request"].user)
-        self.fields["product"].queryset = models.Product.objects.filter(shop=own_shop)
-        self.fields["order"].queryset = models.VendorTrasnscation.objects.filter(
-            shop=own_shop
-        )
-        self.fields["delivery_warehouse"].queryset = models.Warehouse.objects.filter(
-            shop=own_shop
-        )
-
     class Meta:
         model = models.VendorOrderedItems
         fields = (
@@ -447,6 +523,7 @@ class VendorOrderedItemsSerializer(serializers.ModelSerializer):
             "order",
             "shop",
             "product",
+            "code",
             "buying_price",
             "custom_buying_price",
             "product_detail",
@@ -454,6 +531,8 @@ class VendorOrderedItemsSerializer(serializers.ModelSerializer):
             "quantity",
             "bill",
             "image",
+            "thumbnail",
+            "image_webp",
             "created_timestamp",
             "modified_timestamp",
         )
@@ -464,9 +543,13 @@ class VendorOrderedItemsSerializer(serializers.ModelSerializer):
             "product_detail",
             "buying_price",
             "image",
+            "thumbnail",
+            "image_webp",
             "created_timestamp",
             "modified_timestamp",
         )
+        # lines name their product by id or by scanned code
+        extra_kwargs = {"product": {"required": False}}
 
     def to_representation(self, instance):
         """For the nested represtation"""
@@ -481,22 +564,15 @@ class VendorOrderedItemsSerializer(serializers.ModelSerializer):
 class VendorTrasnscationBillSerializer(serializers.ModelSerializer):
     """Serializer for vendor transaction bill"""
 
-    def __init__(self, *args, **kwargs):
-        """Filter vendors by shop"""
-
-        super(VendorTrasnscationBillSerializer, self).__init__(*args, **kwargs)
-
-        own_shop = getShop(self.context["request"].user)
-        self.fields["order"].queryset = models.VendorTrasnscation.objects.filter(
-            shop=own_shop
-        )
-
     def validate(self, data):
         order = self.instance.order
 
-        previous_paid = models.VendorTrasnscationBill.objects.get(
-            id=self.instance.id
-        ).paid
+        # locked until the payment is saved, concurrent payments queue
+        previous_paid = (
+            models.VendorTrasnscationBill.objects.select_for_update()
+            .get(id=self.instance.id)
+            .paid
+        )
         new_paid = data["paid"]
 
         shop = self.instance.shop
@@ -507,9 +583,6 @@ class VendorTrasnscationBillSerializer(serializers.ModelSerializer):
         for i in orders:
             total_bill += i.bill
 
-        if new_paid > shop.money:
-            raise serializers.ValidationError("Not enough money.")
-
         data["bill"] = total_bill
         data["due"] = total_bill - previous_paid - new_paid
         data["paid"] = previous_paid + new_paid
@@ -517,8 +590,8 @@ class VendorTrasnscationBillSerializer(serializers.ModelSerializer):
         if data["paid"] > total_bill:
             raise serializers.ValidationError("Over paid")
 
-        shop.money -= new_paid
-        shop.save()
+        if not services.add_money(shop, -new_paid):
+            raise serializers.ValidationError("Not enough money.")
 
         return data
 
@@ -548,8 +621,7 @@ class VendorTrasnscationBillSerializer(serializers.ModelSerializer):
 class MoveProductSerializer(serializers.ModelSerializer):
     """Serializer for moving product shop to warehouse"""
 
-    def __init__(self, *args, **kwargs):
-        super(MoveProductSerializer, self).__init__(*args, **kwargs)
+    serializer_related_field = ShopRelatedField
 
     def validate(self, data):
         try:
@@ -563,73 +635,21 @@ class MoveProductSerializer(serializers.ModelSerializer):
         except:
             raise serializers.ValidationError("Please fulfill all fields.")
 
-        warehouse_stock = models.WareHouseProducts.objects.filter(
-            warehouse=warehouse, product=product
-        )
-
-        shop_product = models.Product.objects.get(id=product.pk)
+        if move not in ("S2W", "W2S"):
+            raise serializers.ValidationError("Please fulfill all fields.")
 
-        if move == "S2W":
-            if shop_product.stock < quantity:
+        own_shop = self.context["request"].shop
+        if not services.move_stock(own_shop, product, warehouse, quantity, move):
+            if move == "S2W":
                 raise serializers.ValidationError(
                     "Shop does not have this amount of product."
                 )
-
-            if warehouse_stock:
-                warehouse_stock = warehouse_stock[0]
-
-                warehouse_stock.quantity += quantity
-                shop_product.stock -= quantity
-
-                warehouse_stock.save()
-                shop_product.save()
-            else:
-                own_shop = getShop(self.context["request"].user)
-                models.WareHouseProducts.objects.create(
-                    warehouse=warehouse,
-                    product=product,
-                    quantity=quantity,
-                    shop=own_shop,
-                )
-
-                shop_product.stock -= quantity
-                shop_product.save()
-        elif move == "W2S":
-
-            if warehouse_stock:
-                warehouse_stock = warehouse_stock[0]
-
-                if warehouse_stock.quantity < quantity:
-                    raise serializers.ValidationError(
-                        "Warehouse does not have this amount of product."
-                    )
-
-                warehouse_stock.quantity -= quantity
-                shop_product.stock += quantity
-
-                warehouse_stock.save()
-                shop_product.save()
-            else:
-                models.WareHouseProducts.objects.create(
-                    warehouse=warehouse, product=product, quantity=0
-                )
-                raise serializers.ValidationError(
-                    "Warehouse does not have this amount of product."
-                )
+            raise serializers.ValidationError(
+                "Warehouse does not have this amount of product."
+            )
 
         return data
 
-    def __init__(self, *args, **kwargs):
-        """Filter by shop"""
-
-        super(MoveProductSerializer, self).__init__(*args, **kwargs)
-
-        own_shop = getShop(self.context["request"].user)
-        self.fields["warehouse"].queryset = models.Warehouse.objects.filter(
-            shop=own_shop
-        )
-        self.fields["product"].queryset = models.Product.objects.filter(shop=own_shop)
-
     class Meta:
         model = models.MoveProduct
         fields = (
@@ -664,3 +684,110 @@ class ExpenseSerializer(serializers.ModelSerializer):
             "created_timestamp",
             "modified_timestamp",
         )
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Serializer for background jobs"""
+
+    payload = serializers.JSONField(required=False, default=dict)
+
+    class Meta:
+        model = models.Job
+        fields = (
+            "id",
+            "shop",
+            "kind",
+            "payload",
+            "status",
+            "attempts",
+            "max_attempts",
+            "result",
+            "error",
+            "run_after",
+            "started_timestamp",
+            "finished_timestamp",
+            "created_timestamp",
+            "modified_timestamp",
+        )
+        read_only_fields = (
+            "id",
+            "shop",
+            "status",
+            "attempts",
+            "max_attempts",
+            "result",
+            "error",
+            "run_after",
+            "started_timestamp",
+            "finished_timestamp",
+            "created_timestamp",
+            "modified_timestamp",
+        )
+
+    def validate_kind(self, kind):
+        # the job handlers import the importers, which import this module
+        from shop import jobs
+
+        if kind not in jobs.public_kinds():
+            raise serializers.ValidationError(f"Unknown job kind: {kind}")
+
+        return kind
+
+    def validate_payload(self, payload):
+        if not isinstance(payload, dict):
+            raise serializers.ValidationError("Payload must be an object.")
+
+        return payload
+
+    def validate(self, data):
+        """Restricting the payload to the arguments of the job"""
+        from shop import jobs
+
+        unknown = set(data.get("payload", {})) - jobs.arguments(data["kind"])
+
+        if unknown:
+            raise serializers.ValidationError(
+                {"payload": [f"Unknown arguments: {', '.join(sorted(unknown))}"]}
+            )
+
+        return data
+
+    def to_representation(self, instance):
+        """Payload and result are stored as json text"""
+
+        response = super().to_representation(instance)
+        response["payload"] = json.loads(instance.payload)
+        response["result"] = json.loads(instance.result) if instance.result else None
+        return response
+
+
+class ArchivedTransactionSerializer(serializers.ModelSerializer):
+    """Serializer for archived transactions"""
+
+    class Meta:
+        model = models.ArchivedTransaction
+        fields = (
+            "id",
+            "shop",
+            "kind",
+            "order_id",
+            "party_id",
+            "bill",
+            "paid",
+            "created_timestamp",
+            "archived_timestamp",
+        )
+        read_only_fields = fields
+
+
+class ArchivedTransactionDetailSerializer(ArchivedTransactionSerializer):
+    """Serializer for an archived transaction with its bill and items"""
+
+    data = serializers.SerializerMethodField()
+
+    class Meta(ArchivedTransactionSerializer.Meta):
+        fields = ArchivedTransactionSerializer.Meta.fields + ("data",)
+        read_only_fields = fields
+
+    def get_data(self, instance):
+        return archive.decompress(instance.data)
@@ -0,0 +1,203 @@
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from core import codes, events, models
+
+
+def per_product(quantities):
+    """Case expression picking the quantity of the product of each row"""
+    return Case(
+        *[
+            When(pk=product_id, then=Value(quantity))
+            for product_id, quantity in quantities.items()
+        ],
+        output_field=IntegerField(),
+    )
+
+
+def take_stock(product, quantity):
+    """
+    Take quantity out of the stock of a product, False if it is short.
+
+    A single conditional update, concurrent writers can't oversell. A
+    negative quantity puts it back.
+    """
+    updated = models.Product.objects.filter(pk=product.pk, stock__gte=quantity).update(
+        stock=F("stock") - quantity, modified_timestamp=timezone.now()
+    )
+    return updated == 1
+
+
+def receive_stock(product, quantity, buying_price):
+    """Add purchased stock and average its buying price, in one update"""
+    models.Product.objects.filter(pk=product.pk).update(
+        stock=F("stock") + quantity,
+        avg_buying_price=Case(
+            When(avg_buying_price=0, then=Value(buying_price)),
+            default=(F("avg_buying_price") + buying_price) / 2,
+            output_field=IntegerField(),
+        ),
+        modified_timestamp=timezone.now(),
+    )
+
+
+def move_stock(shop, product, warehouse, quantity, move):
+    """
+    Move quantity of a product between the shop and a warehouse.
+
+    Returns False when the source is short. Must run in a transaction, the
+    two sides are updated separately.
+    """
+    stock, created = models.WareHouseProducts.objects.get_or_create(
+        warehouse=warehouse, product=product, defaults={"shop": shop}
+    )
+    in_warehouse = models.WareHouseProducts.objects.filter(pk=stock.pk)
+    now = timezone.now()
+
+    if move == "S2W":
+        if not take_stock(product, quantity):
+            return False
+        in_warehouse.update(quantity=F("quantity") + quantity, modified_timestamp=now)
+        return True
+
+    if not in_warehouse.filter(quantity__gte=quantity).update(
+        quantity=F("quantity") - quantity, modified_timestamp=now
+    ):
+        return False
+    take_stock(product, -quantity)
+    return True
+
+
+def lock_order(order):
+    """
+    Lock a transaction until the end of the database transaction.
+
+    Writers of the items of one order queue on it, so a duplicate check
+    made after the lock can't race with another insert.
+    """
+    type(order).objects.select_for_update().values_list("pk").get(pk=order.pk)
+
+
+def add_money(shop, amount):
+    """Add amount to the cash of a shop, False if it would go below zero"""
+    updated = models.Shop.objects.filter(pk=shop.pk, money__gte=-amount).update(
+        money=F("money") + amount, modified_timestamp=timezone.now()
+    )
+    return updated == 1
+
+
+def resolve_lines(shop, items):
+    """Lines with the product ids of their scanned codes, and the quantities"""
+    scanned = [line["code"] for line in items if "code" in line]
+    product_ids = codes.product_ids(shop.pk, scanned) if scanned else {}
+    unknown = [code for code in scanned if code not in product_ids]
+
+    if unknown:
+        raise ValidationError({"items": [f"Unknown product codes: {unknown}"]})
+
+    lines = [
+        dict(line, product=product_ids[line["code"]]) if "code" in line else line
+        for line in items
+    ]
+    quantities = {}
+
+    for line in lines:
+        if line["product"] in quantities:
+            raise ValidationError({"items": ["Duplicate entires not allowed."]})
+        quantities[line["product"]] = line["quantity"]
+
+    return lines, quantities
+
+
+def checkout(shop, customer, items, paid=0):
+    """
+    Sell the items to the customer in a single transaction.
+
+    Items are dicts of product id or scanned code, quantity and optional
+    custom selling price. The stock of every product is decremented by one
+    conditional update, if any product is short nothing is written. The
+    number of queries does not depend on the number of items.
+    """
+    now = timezone.now()
+
+    with transaction.atomic():
+        for _ in range(2):
+            lines, quantities = resolve_lines(shop, items)
+            products = models.Product.objects.for_shop(shop).in_bulk(list(quantities))
+
+            if not any(
+                line["product"] not in products
+                or products[line["product"]].sku != line["code"]
+                for line in lines
+                if "code" in line
+            ):
+                break
+
+            # a product changed its code since the code map was built
+            codes.invalidate([shop.pk])
+        else:
+            raise ValidationError({"items": ["Product codes changed, scan again."]})
+
+        missing = [
+            product_id for product_id in quantities if product_id not in products
+        ]
+
+        if missing:
+            raise ValidationError({"items": [f"Invalid products: {missing}"]})
+
+        ordered = []
+        for line in lines:
+            product = products[line["product"]]
+            price = line.get("custom_selling_price")
+            price = product.selling_price if price is None else price
+
+            ordered.append(
+                models.CustomerOrderedItems(
+                    shop=shop,
+                    product=product,
+                    product_detail=product,
+                    selling_price=product.selling_price,
+                    custom_selling_price=price,
+                    quantity=line["quantity"],
+                    bill=price * line["quantity"],
+                    created_timestamp=now,
+                    modified_timestamp=now,
+                )
+            )
+
+        total = sum(item.bill for item in ordered)
+
+        if paid > total:
+            raise ValidationError({"paid": ["Over paid"]})
+
+        updated = (
+            models.Product.objects.for_shop(shop)
+            .filter(pk__in=list(quantities), stock__gte=per_product(quantities))
+            .update(stock=F("stock") - per_product(quantities), modified_timestamp=now)
+        )
+
+        if updated != len(quantities):
+            # a product is short, concurrent sales included: write nothing
+            raise ValidationError({"items": ["Insufficient stock."]})
+
+        order = models.CustomerTrasnscation.objects.create(
+            shop=shop, customer=customer, created_timestamp=now, modified_timestamp=now
+        )
+        for item in ordered:
+            item.order = order
+        models.CustomerOrderedItems.objects.bulk_create(ordered)
+
+        if paid:
+            models.CustomerTrasnscationBill.objects.filter(order=order).update(
+                paid=paid
+            )
+            models.Shop.objects.filter(pk=shop.pk).update(money=F("money") + paid)
+
+        # bill and due from the queued item changes, to answer with them
+        events.flush()
+        order.customertrasnscationbill.refresh_from_db()
+
+    order.items = ordered
+    return order
@@ -0,0 +1,333 @@
+"""
+Concurrency stress run of the stock and money writes of the api.
+
+Threads fire sales, purchases, moves and payments through the api, every
+thread on its own database connection, then the invariants of stock and
+cash are checked against the recorded transactions. Meant for Postgres,
+SQLite serializes the writers and should be run with a single thread.
+The shop and its owner are deleted after the run.
+"""
+
+import random
+import statistics
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.db.models import Sum
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import models
+
+OPERATIONS = ("sale", "purchase", "move", "customer_payment", "vendor_payment")
+
+
+class LockSampler(threading.Thread):
+    """Counts the backends waiting on a lock, from pg_stat_activity"""
+
+    def __init__(self, interval=0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            with connection.cursor() as cursor:
+                while not self.stopped.wait(self.interval):
+                    cursor.execute(
+                        "SELECT count(*) FROM pg_stat_activity "
+                        "WHERE datname = current_database() "
+                        "AND wait_event_type = 'Lock'"
+                    )
+                    self.samples.append(cursor.fetchone()[0])
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def deadlocks():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT deadlocks FROM pg_stat_database WHERE datname = current_database()"
+        )
+        return cursor.fetchone()[0]
+
+
+class StressRun:
+    def __init__(self, threads=8, operations=500, products=5, seed=None):
+        self.threads = threads
+        self.operations = operations
+        self.product_count = products
+        self.seed = seed if seed is not None else random.randrange(1 << 30)
+        self.results = []
+
+    @staticmethod
+    def host():
+        """A host the requests are allowed for"""
+        hosts = [host for host in settings.ALLOWED_HOSTS if "*" not in host]
+        return hosts[0].lstrip(".") if hosts else "localhost"
+
+    def setup(self):
+        """A fresh shop with stock, a warehouse, a customer and a vendor"""
+        name = f"stress-{uuid.uuid4().hex[:8]}"
+        self.owner = get_user_model().objects.create_user(
+            username=name, password=uuid.uuid4().hex, is_owner=True
+        )
+        self.shop = models.Shop.objects.create(name=name, owner=self.owner, money=10**6)
+        self.products = [
+            models.Product.objects.create(
+                name=f"Product {i}",
+                shop=self.shop,
+                selling_price=12,
+                buying_price=10,
+                stock=20,
+            )
+            for i in range(self.product_count)
+        ]
+        self.warehouse = models.Warehouse.objects.create(name="Main", shop=self.shop)
+        self.customer = models.Customer.objects.create(name="Customer", shop=self.shop)
+        self.vendor = models.Vendor.objects.create(name="Vendor", shop=self.shop)
+
+        self.initial_stock = {product.pk: product.stock for product in self.products}
+        self.initial_money = self.shop.money
+
+    def sale(self, client, rng):
+        order = models.CustomerTrasnscation.objects.create(
+            shop=self.shop, customer=self.customer
+        )
+        return client.post(
+            reverse("shop:customerordereditems-list"),
+            {
+                "order": order.pk,
+                "product": rng.choice(self.products).pk,
+                "quantity": rng.randint(1, 5),
+                "custom_selling_price": 12,
+            },
+        )
+
+    def purchase(self, client, rng):
+        order = models.VendorTrasnscation.objects.create(
+            shop=self.shop, vendor=self.vendor
+        )
+        return client.post(
+            reverse("shop:vendorordereditems-list"),
+            {
+                "order": order.pk,
+                "product": rng.choice(self.products).pk,
+                "delivery_warehouse": self.warehouse.pk,
+                "quantity": rng.randint(1, 5),
+                "custom_buying_price": 10,
+            },
+        )
+
+    def move(self, client, rng):
+        return client.post(
+            reverse("shop:moveproduct-list"),
+            {
+                "warehouse": self.warehouse.pk,
+                "product": rng.choice(self.products).pk,
+                "quantity": rng.randint(1, 5),
+                "move": rng.choice(("S2W", "W2S")),
+            },
+        )
+
+    def payment(self, client, rng, model, url_name):
+        bill = (
+            model.objects.for_shop(self.shop)
+            .filter(due__gt=0)
+            .order_by("?")
+            .values_list("pk", flat=True)
+            .first()
+        )
+
+        if bill is None:
+            return None
+
+        return client.patch(
+            reverse(url_name, args=[bill]), {"paid": rng.randint(1, 30)}
+        )
+
+    def customer_payment(self, client, rng):
+        return self.payment(
+            client,
+            rng,
+            models.CustomerTrasnscationBill,
+            "shop:customertrasnscationbill-detail",
+        )
+
+    def vendor_payment(self, client, rng):
+        return self.payment(
+            client,
+            rng,
+            models.VendorTrasnscationBill,
+            "shop:vendortrasnscationbill-detail",
+        )
+
+    def worker(self, index):
+        rng = random.Random(self.seed + index)
+        client = APIClient(SERVER_NAME=self.host())
+        client.force_authenticate(user=self.owner)
+        results = []
+
+        try:
+            for _ in range(self.operations // self.threads):
+                operation = rng.choice(OPERATIONS)
+                started = time.perf_counter()
+
+                try:
+                    response = getattr(self, operation)(client, rng)
+                except Exception as exc:
+                    outcome = f"error: {exc!r}"
+                else:
+                    if response is None:
+                        continue
+                    if response.status_code < 300:
+                        outcome = "ok"
+                    elif response.status_code == 400:
+                        outcome = "rejected"
+                    else:
+                        outcome = f"error: {response.status_code}"
+
+                results.append((operation, outcome, time.perf_counter() - started))
+        finally:
+            connections.close_all()
+
+        return results
+
+    def teardown(self):
+        """Delete the shop, its records and its owner created by setup"""
+        # these foreign keys don't cascade, their rows go first
+        models.MoveProduct.objects.for_shop(self.shop).delete()
+        models.VendorTrasnscation.objects.for_shop(self.shop).delete()
+        models.CustomerTrasnscation.objects.for_shop(self.shop).delete()
+        self.shop.delete()
+        self.owner.delete()
+
+    def run(self):
+        """Fire the operations from the thread pool, returns the report"""
+        self.setup()
+
+        try:
+            return self.fire()
+        finally:
+            self.teardown()
+
+    def fire(self):
+        sampler = LockSampler() if connection.vendor == "postgresql" else None
+        deadlocks_before = deadlocks() if sampler else None
+
+        if sampler:
+            sampler.start()
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(self.threads) as pool:
+            for results in pool.map(self.worker, range(self.threads)):
+                self.results.extend(results)
+
+        elapsed = time.perf_counter() - started
+        if sampler:
+            sampler.stop()
+
+        return self.report(elapsed, sampler, deadlocks_before)
+
+    def violations(self):
+        """Broken invariants of stock and cash, as messages"""
+        shop = self.shop
+        found = []
+
+        def quantities(model, **filters):
+            return dict(
+                model.objects.for_shop(shop)
+                .filter(**filters)
+                .values_list("product")
+                .annotate(total=Sum("quantity"))
+            )
+
+        sold = quantities(models.CustomerOrderedItems)
+        bought = quantities(models.VendorOrderedItems)
+        to_warehouse = quantities(models.MoveProduct, move="S2W")
+        to_shop = quantities(models.MoveProduct, move="W2S")
+        in_warehouse = dict(
+            models.WareHouseProducts.objects.filter(warehouse=self.warehouse)
+            .values_list("product")
+            .annotate(total=Sum("quantity"))
+        )
+
+        for product in models.Product.objects.for_shop(shop):
+            expected = (
+                self.initial_stock[product.pk]
+                + bought.get(product.pk, 0)
+                - sold.get(product.pk, 0)
+                - to_warehouse.get(product.pk, 0)
+                + to_shop.get(product.pk, 0)
+            )
+            if product.stock < 0 or product.stock != expected:
+                found.append(f"{product}: stock {product.stock}, movements {expected}")
+
+            moved = to_warehouse.get(product.pk, 0) - to_shop.get(product.pk, 0)
+            if in_warehouse.get(product.pk, 0) != moved:
+                found.append(
+                    f"{product}: warehouse {in_warehouse.get(product.pk, 0)}, "
+                    f"moves {moved}"
+                )
+
+        received = models.CustomerTrasnscationBill.objects.for_shop(shop).aggregate(
+            total=Sum("paid")
+        )["total"]
+        paid_out = models.VendorTrasnscationBill.objects.for_shop(shop).aggregate(
+            total=Sum("paid")
+        )["total"]
+        expected = self.initial_money + (received or 0) - (paid_out or 0)
+        money = models.Shop.objects.get(pk=shop.pk).money
+
+        if money != expected:
+            found.append(f"cash {money}, payments {expected}")
+
+        return found
+
+    def report(self, elapsed, sampler=None, deadlocks_before=None):
+        outcomes = defaultdict(lambda: defaultdict(int))
+        for operation, outcome, latency in self.results:
+            outcomes[operation][outcome] += 1
+
+        latencies = sorted(latency for operation, outcome, latency in self.results)
+        report = {
+            "seed": self.seed,
+            "threads": self.threads,
+            "requests": len(self.results),
+            "seconds": round(elapsed, 3),
+            "throughput": round(len(self.results) / elapsed, 1) if elapsed else 0,
+            "latency_p50_ms": (
+                round(statistics.median(latencies) * 1000, 1) if latencies else None
+            ),
+            "latency_p95_ms": (
+                round(latencies[int(len(latencies) * 0.95)] * 1000, 1)
+                if latencies
+                else None
+            ),
+            "outcomes": {name: dict(counts) for name, counts in outcomes.items()},
+            "violations": self.violations(),
+        }
+
+        if sampler is not None:
+            samples = sampler.samples or [0]
+            report["lock_waits"] = {
+                "max_waiting": max(samples),
+                "mean_waiting": round(statistics.mean(samples), 2),
+                "samples_waiting": round(
+                    sum(1 for count in samples if count) / len(samples), 3
+                ),
+                "deadlocks": deadlocks() - deadlocks_before,
+            }
+
+        return report
@@ -0,0 +1,84 @@
+from core import memberships, models
+
+# header selecting the active shop of users working for several shops
+SHOP_HEADER = "HTTP_X_SHOP_ID"
+
+
+def legacy_shop(user):
+    """Shop of users without memberships, staff via the owner who created them"""
+    if user.is_owner:
+        return models.Shop.objects.get(owner=user)
+
+    if (user.is_manager or user.is_salesman) and user.created_by_id is not None:
+        return models.Shop.objects.get(owner_id=user.created_by_id)
+
+
+def getMembership(user, shop_id=None):
+    """Membership of the user in the asked shop, or in its default one"""
+    if not user.is_authenticated:
+        return None
+
+    # shop id is a claim of signed access tokens, the default shop
+    return memberships.active_membership(
+        user.pk, shop_id, getattr(user, "token_shop_id", None)
+    )
+
+
+def getShop(user, shop_id=None):
+    membership = getMembership(user, shop_id)
+
+    if membership is not None:
+        return membership.shop
+
+    if shop_id is None:
+        return legacy_shop(user)
+
+
+def requested_shop_id(request):
+    """Id of the shop asked for with the X-Shop-Id header, 0 if it isn't one"""
+    value = request.META.get(SHOP_HEADER)
+
+    if value is None:
+        return None
+
+    try:
+        return int(value)
+    except ValueError:
+        return 0
+
+
+def request_shop(request):
+    """Shop of the request user, resolved once per request, None if it has none"""
+    # rest framework requests share the cache of the django request they wrap
+    request = getattr(request, "_request", request)
+
+    try:
+        return request._resolved_shop
+    except AttributeError:
+        pass
+
+    shop = role = None
+    try:
+        shop_id = requested_shop_id(request)
+        membership = getMembership(request.user, shop_id)
+
+        if membership is not None:
+            shop, role = membership.shop, membership.role
+        elif shop_id is None:
+            shop = legacy_shop(request.user)
+    except (
+        AttributeError,
+        models.Shop.DoesNotExist,
+        models.Shop.MultipleObjectsReturned,
+    ):
+        # anonymous users or users without a shop
+        shop = None
+
+    request._resolved_shop, request._resolved_role = shop, role
+    return shop
+
+
+def request_role(request):
+    """Role of the request user in its shop, None without a membership"""
+    request_shop(request)
+    return getattr(getattr(request, "_request", request), "_resolved_role", None)
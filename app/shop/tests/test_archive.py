@@ -0,0 +1,109 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core import events, models
+from shop.reports import daily_bills
+
+ARCHIVE_URL = reverse("shop:archivedtransaction-list")
+
+
+def archive_detail_url(archive_id):
+    return reverse("shop:archivedtransaction-detail", args=[archive_id])
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        owner = get_user_model().objects.create_user(
+            username="owner", password="testpass", is_owner=True
+        )
+        self.shop = models.Shop.objects.create(name="Test shop", owner=owner)
+        self.customer = models.Customer.objects.create(name="Karim", shop=self.shop)
+        self.product = models.Product.objects.create(
+            name="Rice", shop=self.shop, selling_price=50, stock=10
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=owner)
+
+    def sample_order(self, bill, paid, age):
+        order = models.CustomerTrasnscation.objects.create(
+            shop=self.shop, customer=self.customer
+        )
+        models.CustomerOrderedItems.objects.create(
+            order=order, shop=self.shop, product=self.product, quantity=1, bill=bill
+        )
+        # bills are recomputed on commit, test cases never commit
+        events.flush()
+        created = timezone.now() - timedelta(days=age)
+        models.CustomerTrasnscation.objects.filter(pk=order.pk).update(
+            created_timestamp=created
+        )
+        models.CustomerOrderedItems.objects.filter(order=order).update(
+            created_timestamp=created
+        )
+        models.CustomerTrasnscationBill.objects.filter(order=order).update(
+            paid=paid, due=bill - paid
+        )
+        return order
+
+    def test_archive_settled_transactions(self):
+        """Test that only old fully paid transactions are archived"""
+        settled = self.sample_order(50, 50, 400)
+        unpaid = self.sample_order(50, 20, 400)
+        recent = self.sample_order(50, 50, 10)
+
+        call_command(
+            "archive_transactions",
+            "--kind",
+            "customer",
+            "--days",
+            "365",
+            stdout=StringIO(),
+        )
+
+        remaining = models.CustomerTrasnscation.objects.for_shop(self.shop)
+        self.assertEqual(set(remaining), {unpaid, recent})
+        self.assertFalse(
+            models.CustomerOrderedItems.objects.filter(order_id=settled.id).exists()
+        )
+        archived = models.ArchivedTransaction.objects.get(order_id=settled.id)
+        self.assertEqual(archived.kind, "customer")
+        self.assertEqual(archived.party_id, self.customer.id)
+        self.assertEqual(archived.bill, 50)
+
+    def test_reports_cover_archived_period(self):
+        """Test that the day report still includes archived bills"""
+        order = self.sample_order(50, 50, 400)
+        day = timezone.localdate(order.created_timestamp - timedelta(days=400))
+        before = daily_bills(models.CustomerOrderedItems, self.shop, day)
+
+        call_command("archive_transactions", "--days", "365", stdout=StringIO())
+
+        after = daily_bills(models.CustomerOrderedItems, self.shop, day)
+        self.assertEqual(after, before)
+        self.assertEqual(after[0]["bill"], 50)
+
+    def test_retrieve_archived_transaction(self):
+        """Test that the archive endpoint serves the archived details"""
+        order = self.sample_order(50, 50, 400)
+        call_command("archive_transactions", "--days", "365", stdout=StringIO())
+
+        res = self.client.get(ARCHIVE_URL, {"order_id": order.id})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+        self.assertNotIn("data", res.data[0])
+
+        res = self.client.get(archive_detail_url(res.data[0]["id"]))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["data"]["bill"]["paid"], 50)
+        self.assertEqual(res.data["data"]["items"][0]["product_id"], self.product.id)
@@ -0,0 +1,135 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core import models
+
+CHECKOUT_URL = reverse("shop:checkout")
+VENDOR_ITEMS_URL = reverse("shop:vendorordereditems-list")
+
+
+class CheckoutTests(TestCase):
+    def setUp(self):
+        owner = get_user_model().objects.create_user(
+            username="owner", password="testpass", is_owner=True
+        )
+        self.shop = models.Shop.objects.create(name="Test shop", owner=owner)
+        self.customer = models.Customer.objects.create(name="Karim", shop=self.shop)
+        self.client = APIClient()
+        self.client.force_authenticate(user=owner)
+
+    def sample_products(self, count, stock=10):
+        return [
+            models.Product.objects.create(
+                name=f"Product {i}", shop=self.shop, selling_price=10, stock=stock
+            )
+            for i in range(count)
+        ]
+
+    def checkout(self, products, quantity=2, paid=0):
+        payload = {
+            "customer": self.customer.id,
+            "paid": paid,
+            "items": [
+                {"product": product.id, "quantity": quantity} for product in products
+            ],
+        }
+        return self.client.post(CHECKOUT_URL, payload, format="json")
+
+    def test_checkout_writes_order_stock_and_bill(self):
+        """Test that a checkout sells every line and records the payment"""
+        products = self.sample_products(2)
+
+        res = self.checkout(products, quantity=3, paid=50)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["bill"]["bill"], 60)
+        self.assertEqual(res.data["bill"]["due"], 10)
+        order = models.CustomerTrasnscation.objects.get(pk=res.data["id"])
+        self.assertEqual(order.customerordereditems_set.count(), 2)
+        for product in products:
+            product.refresh_from_db()
+            self.assertEqual(product.stock, 7)
+        self.shop.refresh_from_db()
+        self.assertEqual(self.shop.money, 50)
+
+    def test_insufficient_stock_writes_nothing(self):
+        """Test that a short product rolls back the whole checkout"""
+        products = self.sample_products(2)
+        short = models.Product.objects.create(
+            name="Salt", shop=self.shop, selling_price=10, stock=1
+        )
+
+        res = self.checkout(products + [short], quantity=2)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(models.CustomerTrasnscation.objects.exists())
+        self.assertEqual(
+            sorted(models.Product.objects.values_list("stock", flat=True)),
+            [1, 10, 10],
+        )
+
+    def test_query_count_does_not_grow_with_lines(self):
+        """Test that a checkout of ten lines takes as many queries as one"""
+        one, ten = self.sample_products(1), self.sample_products(10)
+        self.checkout(one)
+
+        # shop, customer, products, stock, order, bill, lines, bill totals, the
+        # bill read back and the savepoint with its release
+        with self.assertNumQueries(11):
+            res = self.checkout(one)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        with self.assertNumQueries(11):
+            res = self.checkout(ten)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_duplicate_vendor_lines_are_refused(self):
+        """Test that an order can't receive the same product twice"""
+        product = self.sample_products(1)[0]
+        vendor = models.Vendor.objects.create(name="Vendor", shop=self.shop)
+        order = models.VendorTrasnscation.objects.create(shop=self.shop, vendor=vendor)
+        warehouse = models.Warehouse.objects.create(name="W", shop=self.shop)
+        payload = {
+            "order": order.id,
+            "product": product.id,
+            "delivery_warehouse": warehouse.id,
+            "custom_buying_price": 5,
+            "quantity": 4,
+        }
+
+        res = self.client.post(VENDOR_ITEMS_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        res = self.client.post(VENDOR_ITEMS_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 14)
+        self.assertEqual(order.vendorordereditems_set.count(), 1)
+
+    def test_updating_the_product_of_a_line_moves_its_stock(self):
+        """Test that a line changed to another product returns the old stock"""
+        rice, salt = self.sample_products(2)
+        res = self.checkout([rice], quantity=3)
+        item = models.CustomerOrderedItems.objects.get(order_id=res.data["id"])
+        url = reverse("shop:customerordereditems-detail", args=[item.id])
+
+        res = self.client.put(
+            url, {"order": item.order_id, "product": salt.id, "quantity": 2}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        rice.refresh_from_db()
+        salt.refresh_from_db()
+        self.assertEqual((rice.stock, salt.stock), (10, 8))
+
+        res = self.client.put(
+            url, {"order": item.order_id, "product": rice.id, "quantity": 11}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        salt.refresh_from_db()
+        self.assertEqual(salt.stock, 8)
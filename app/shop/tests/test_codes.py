@@ -0,0 +1,119 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core import codes, models
+
+PRODUCT_URL = reverse("shop:product-list")
+CHECKOUT_URL = reverse("shop:checkout")
+
+
+def by_code_url(code):
+    return reverse("shop:product-by-code", args=[code])
+
+
+class ProductCodeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        owner = get_user_model().objects.create_user(
+            username="owner", password="testpass", is_owner=True
+        )
+        self.shop = models.Shop.objects.create(name="Test shop", owner=owner)
+        self.product = models.Product.objects.create(
+            name="Rice", sku="8901", shop=self.shop, selling_price=10, stock=5
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=owner)
+
+    def test_codes_resolve_from_the_cached_map(self):
+        """Test that a warm code map resolves codes without queries"""
+        codes.product_ids(self.shop.pk, ["8901"])
+
+        with self.assertNumQueries(0):
+            ids = codes.product_ids(self.shop.pk, ["8901"])
+
+        self.assertEqual(ids, {"8901": self.product.pk})
+
+    def test_unknown_codes_keep_the_map(self):
+        """Test that an unknown code costs one indexed query, not a rebuild"""
+        codes.product_ids(self.shop.pk, ["8901"])
+
+        with self.assertNumQueries(1):
+            ids = codes.product_ids(self.shop.pk, ["0000"])
+
+        self.assertEqual(ids, {})
+        self.assertIsNotNone(cache.get(codes.cache_key(self.shop.pk)))
+
+    def test_changed_code_invalidates_the_map(self):
+        """Test that saving a new code drops the map of the shop"""
+        codes.product_ids(self.shop.pk, ["8901"])
+        self.product.sku = "8902"
+        self.product.save()
+
+        res = self.client.get(by_code_url("8902"))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["id"], self.product.pk)
+        res = self.client.get(by_code_url("8901"))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_codes_are_unique_per_shop(self):
+        """Test that a code can't be given to two products of a shop"""
+        res = self.client.post(PRODUCT_URL, {"name": "Salt", "sku": "8901"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_checkout_by_code(self):
+        """Test that checkout lines accept scanned codes"""
+        customer = models.Customer.objects.create(name="Karim", shop=self.shop)
+        payload = {
+            "customer": customer.id,
+            "items": [{"code": "8901", "quantity": 2}],
+        }
+
+        res = self.client.post(CHECKOUT_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["items"][0]["product"], self.product.pk)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 3)
+
+    def test_checkout_rebuilds_a_stale_map(self):
+        """Test that a code map left stale elsewhere is rebuilt, not refused"""
+        customer = models.Customer.objects.create(name="Karim", shop=self.shop)
+        other = models.Product.objects.create(
+            name="Salt", sku="8902", shop=self.shop, selling_price=5, stock=5
+        )
+        cache.set(codes.cache_key(self.shop.pk), {"8901": other.pk})
+        payload = {
+            "customer": customer.id,
+            "items": [{"code": "8901", "quantity": 1}],
+        }
+
+        res = self.client.post(CHECKOUT_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["items"][0]["product"], self.product.pk)
+
+    def test_update_ordered_item_by_code(self):
+        """Test that an ordered item is updated with a code or fails cleanly"""
+        customer = models.Customer.objects.create(name="Karim", shop=self.shop)
+        order = models.CustomerTrasnscation.objects.create(
+            shop=self.shop, customer=customer
+        )
+        item = models.CustomerOrderedItems.objects.create(
+            order=order, shop=self.shop, product=self.product, quantity=1
+        )
+        url = reverse("shop:customerordereditems-detail", args=[item.id])
+
+        res = self.client.put(url, {"order": order.id, "code": "8901", "quantity": 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 4)
+
+        res = self.client.put(url, {"order": order.id, "quantity": 2})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
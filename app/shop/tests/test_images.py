@@ -0,0 +1,86 @@
+import io
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from PIL import Image
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core import models
+from shop import images, jobs
+
+
+def upload_image_url(item_id):
+    return reverse("shop:vendorordereditems-upload-image", args=[item_id])
+
+
+def sample_image(size=(1200, 900), orientation=None):
+    buffer = io.BytesIO()
+    image = Image.new("RGB", size, (200, 30, 30))
+    options = {}
+    if orientation:
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        options["exif"] = exif.tobytes()
+    image.save(buffer, "JPEG", **options)
+    return SimpleUploadedFile("photo.jpg", buffer.getvalue(), "image/jpeg")
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class TransactionImageTests(TestCase):
+    def setUp(self):
+        owner = get_user_model().objects.create_user(
+            username="owner", password="testpass", is_owner=True
+        )
+        shop = models.Shop.objects.create(name="Test shop", owner=owner)
+        vendor = models.Vendor.objects.create(name="Vendor", shop=shop)
+        order = models.VendorTrasnscation.objects.create(shop=shop, vendor=vendor)
+        self.item = models.VendorOrderedItems.objects.create(
+            order=order,
+            shop=shop,
+            product=models.Product.objects.create(name="Rice", shop=shop),
+            delivery_warehouse=models.Warehouse.objects.create(name="W", shop=shop),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=owner)
+
+    def test_upload_generates_variants_in_background(self):
+        """Test uploading an image queues the thumbnail and webp variants"""
+        res = self.client.post(
+            upload_image_url(self.item.id), {"image": sample_image()}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data["thumbnail"])
+
+        jobs.work(burst=True)
+
+        self.item.refresh_from_db()
+        with self.item.thumbnail.open("rb") as thumbnail:
+            self.assertEqual(Image.open(thumbnail).size, (320, 240))
+        with self.item.image_webp.open("rb") as webp:
+            self.assertEqual(Image.open(webp).format, "WEBP")
+
+    @override_settings(TRANSACTION_IMAGE_MAX_DIMENSION=1000)
+    def test_upload_rejects_oversized_image(self):
+        """Test that images above the dimension limit are rejected"""
+        res = self.client.post(
+            upload_image_url(self.item.id), {"image": sample_image()}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(models.Job.objects.exists())
+
+    def test_variants_follow_the_exif_orientation(self):
+        """Test that photos taken sideways get upright variants"""
+        self.item.image = sample_image(orientation=6)
+        self.item.save()
+
+        images.process_transaction_image(self.item)
+
+        with self.item.thumbnail.open("rb") as thumbnail:
+            self.assertEqual(Image.open(thumbnail).size, (240, 320))
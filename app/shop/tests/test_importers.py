@@ -0,0 +1,89 @@
+import io
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core import models
+from shop.importers import ProductImporter, CustomerImporter
+
+PRODUCT_IMPORT_URL = reverse("shop:product-import-csv")
+
+
+def sample_shop(username="owner"):
+    owner = get_user_model().objects.create_user(
+        username=username, password="testpass", is_owner=True
+    )
+    return models.Shop.objects.create(name="Test shop", owner=owner)
+
+
+class CSVImporterTests(TestCase):
+    def setUp(self):
+        self.shop = sample_shop()
+
+    def test_import_creates_and_updates_products(self):
+        """Test that existing products are updated and new ones created"""
+        models.Product.objects.create(name="Rice", shop=self.shop, stock=5)
+        lines = io.StringIO(
+            "name,selling_price,stock\nRice,60,10\nSugar,90,\nSalt,25,3\n"
+        )
+
+        report = ProductImporter(self.shop, batch_size=2).run(lines)
+
+        self.assertEqual(report["created"], 2)
+        self.assertEqual(report["updated"], 1)
+        self.assertEqual(report["errors"], [])
+        rice = models.Product.objects.get(shop=self.shop, name="Rice")
+        self.assertEqual(rice.stock, 10)
+        self.assertEqual(rice.selling_price, 60)
+        self.assertEqual(models.Product.objects.get(name="Sugar").stock, 0)
+
+    def test_import_reports_row_errors(self):
+        """Test that invalid rows are reported and valid ones imported"""
+        lines = io.StringIO("name,contact\nKarim,0171\n,0181\n")
+
+        report = CustomerImporter(self.shop).run(lines)
+
+        self.assertEqual(report["created"], 1)
+        self.assertEqual(report["failed"], 1)
+        self.assertEqual(report["errors"][0]["line"], 3)
+        self.assertIn("name", report["errors"][0]["errors"])
+
+    def test_import_reports_code_conflicts_and_duplicates(self):
+        """Test that taken codes and repeated rows are errors, not created"""
+        models.Product.objects.create(name="Rice", sku="111", shop=self.shop)
+        lines = io.StringIO("name,sku\nSalt,111\nSugar,222\nSugar,333\nTea,222\n")
+
+        report = ProductImporter(self.shop).run(lines)
+
+        self.assertEqual(report["created"], 1)
+        self.assertEqual(report["failed"], 3)
+        self.assertEqual([error["line"] for error in report["errors"]], [2, 4, 5])
+        self.assertIn("sku", report["errors"][0]["errors"])
+        self.assertEqual(
+            sorted(models.Product.objects.values_list("name", "sku")),
+            [("Rice", "111"), ("Sugar", "222")],
+        )
+
+
+class CSVImportApiTests(TestCase):
+    def setUp(self):
+        self.shop = sample_shop()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.shop.owner)
+
+    def test_import_endpoint(self):
+        """Test uploading a product csv to the import endpoint"""
+        upload = SimpleUploadedFile("products.csv", b"name,stock\nRice,4\n")
+
+        res = self.client.post(PRODUCT_IMPORT_URL, {"file": upload})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["created"], 1)
+        self.assertTrue(
+            models.Product.objects.filter(shop=self.shop, name="Rice").exists()
+        )
@@ -0,0 +1,181 @@
+import json
+import os
+import tempfile
+from datetime import timedelta
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core import models
+from shop import jobs
+
+JOBS_URL = reverse("shop:job-list")
+PRODUCT_IMPORT_URL = reverse("shop:product-import-csv")
+JOB_FILES_ROOT = tempfile.mkdtemp()
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@jobs.job("test_failing", public=False)
+def failing(job):
+    raise RuntimeError("boom")
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        owner = get_user_model().objects.create_user(
+            username="owner", password="testpass", is_owner=True
+        )
+        self.shop = models.Shop.objects.create(name="Test shop", owner=owner)
+
+    def test_worker_runs_queued_job(self):
+        """Test that a worker executes a job and stores the result"""
+        job = jobs.enqueue("sell_report", shop=self.shop)
+
+        jobs.work(burst=True)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, models.Job.DONE)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(job.result, "[]")
+
+    def test_failing_job_is_retried_then_failed(self):
+        """Test that a failing job is requeued until attempts run out"""
+        job = jobs.enqueue("test_failing", shop=self.shop, max_attempts=2)
+
+        jobs.execute(jobs.claim())
+        job.refresh_from_db()
+        self.assertEqual(job.status, models.Job.QUEUED)
+        self.assertIn("boom", job.error)
+
+        models.Job.objects.filter(pk=job.pk).update(run_after=job.created_timestamp)
+        jobs.execute(jobs.claim())
+        job.refresh_from_db()
+        self.assertEqual(job.status, models.Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_submit_job_api(self):
+        """Test submitting a public job and rejecting private ones"""
+        client = APIClient()
+        client.force_authenticate(user=self.shop.owner)
+
+        res = client.post(JOBS_URL, {"kind": "sell_report"}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["status"], models.Job.QUEUED)
+        self.assertEqual(res.data["shop"], self.shop.id)
+
+        res = client.post(JOBS_URL, {"kind": "test_failing"}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        for payload in ({"shop": 1}, {"max_attempts": 1000}, [1]):
+            res = client.post(
+                JOBS_URL, {"kind": "sell_report", "payload": payload}, format="json"
+            )
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("payload", res.data)
+
+    def test_stale_jobs_out_of_attempts_fail(self):
+        """Test that a job whose worker keeps dying is not requeued forever"""
+        retried = jobs.enqueue("sell_report", shop=self.shop)
+        exhausted = jobs.enqueue("sell_report", shop=self.shop, max_attempts=1)
+        models.Job.objects.update(
+            status=models.Job.RUNNING,
+            attempts=1,
+            started_timestamp=timezone.now() - timedelta(seconds=jobs.STALE_AFTER + 1),
+        )
+
+        self.assertEqual(jobs.requeue_stale(), (1, 1))
+
+        retried.refresh_from_db()
+        exhausted.refresh_from_db()
+        self.assertEqual(retried.status, models.Job.QUEUED)
+        self.assertEqual(exhausted.status, models.Job.FAILED)
+
+
+@override_settings(JOB_FILES_ROOT=JOB_FILES_ROOT, MEDIA_ROOT=MEDIA_ROOT)
+class BackgroundImportTests(TestCase):
+    def setUp(self):
+        owner = get_user_model().objects.create_user(
+            username="owner", password="testpass", is_owner=True
+        )
+        self.shop = models.Shop.objects.create(name="Test shop", owner=owner)
+        self.client = APIClient()
+        self.client.force_authenticate(user=owner)
+
+    def submit(self, content):
+        upload = SimpleUploadedFile("products.csv", content)
+        res = self.client.post(PRODUCT_IMPORT_URL, {"file": upload, "background": "1"})
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+
+        return models.Job.objects.get(pk=res.data["id"])
+
+    def test_upload_is_private_and_removed(self):
+        """Test that uploads are kept outside media under a random name"""
+        job = self.submit(b"name,stock\nRice,4\n")
+        name = json.loads(job.payload)["file"]
+
+        self.assertNotIn("products", name)
+        self.assertTrue(os.path.isfile(os.path.join(JOB_FILES_ROOT, name)))
+        self.assertFalse(os.path.exists(os.path.join(MEDIA_ROOT, "imports")))
+
+        jobs.work(burst=True)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, models.Job.DONE)
+        self.assertFalse(os.path.exists(os.path.join(JOB_FILES_ROOT, name)))
+
+    def test_upload_of_failed_job_is_removed(self):
+        """Test that the upload is kept for retries and removed on the last one"""
+        job = self.submit(b"\xff\xfe\x00broken")
+        models.Job.objects.filter(pk=job.pk).update(max_attempts=2)
+        path = os.path.join(JOB_FILES_ROOT, json.loads(job.payload)["file"])
+
+        jobs.execute(jobs.claim())
+        self.assertTrue(os.path.isfile(path))
+
+        models.Job.objects.filter(pk=job.pk).update(run_after=job.created_timestamp)
+        jobs.execute(jobs.claim())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, models.Job.FAILED)
+        self.assertFalse(os.path.exists(path))
+
+
+@override_settings(JOB_FILES_ROOT=JOB_FILES_ROOT, MEDIA_SERVING="x-accel-redirect")
+class ExportDownloadTests(TestCase):
+    def setUp(self):
+        owner = get_user_model().objects.create_user(
+            username="owner", password="testpass", is_owner=True
+        )
+        self.shop = models.Shop.objects.create(name="Test shop", owner=owner)
+        self.client = APIClient()
+        self.client.force_authenticate(user=owner)
+
+    def test_exports_are_private(self):
+        """Test that exports are only sent to the shop, never cached"""
+        job = jobs.enqueue("export", shop=self.shop, payload={"kind": "products"})
+        jobs.work(burst=True)
+        job.refresh_from_db()
+        url = json.loads(job.result)["url"]
+
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res["X-Accel-Redirect"].startswith("/protected-jobs/exports/"))
+        self.assertIn("no-store", res["Cache-Control"])
+        self.assertIn("private", res["Cache-Control"])
+
+        other = get_user_model().objects.create_user(
+            username="other", password="testpass", is_owner=True
+        )
+        models.Shop.objects.create(name="Other shop", owner=other)
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
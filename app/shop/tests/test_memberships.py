@@ -0,0 +1,148 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core import models
+
+PRODUCT_URL = reverse("shop:product-list")
+CREATE_USER_URL = reverse("user:create")
+SALESMAN_URL = reverse("shop:salesman")
+MANAGER_URL = reverse("shop:manager")
+USER_LIST_URL = reverse("user:user-list")
+
+
+class ShopMembershipTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = get_user_model().objects.create_user(
+            username="owner", password="testpass", is_owner=True
+        )
+        self.shop = models.Shop.objects.create(name="Main branch", owner=self.owner)
+        self.branch = models.Shop.objects.create(name="Branch", owner=self.owner)
+        models.Product.objects.create(name="Rice", shop=self.shop)
+        models.Product.objects.create(name="Salt", shop=self.branch)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.owner)
+
+    def product_names(self, **headers):
+        res = self.client.get(PRODUCT_URL, **headers)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [product["name"] for product in res.data]
+
+    def test_owners_are_members_of_their_shops(self):
+        """Test that creating a shop makes its owner a member"""
+        roles = models.ShopMembership.objects.filter(user=self.owner).values_list(
+            "shop", "role"
+        )
+
+        self.assertEqual(
+            sorted(roles), [(self.shop.id, "owner"), (self.branch.id, "owner")]
+        )
+
+    def test_header_selects_the_shop(self):
+        """Test that the X-Shop-Id header picks one of the shops of the user"""
+        self.assertEqual(self.product_names(), ["Rice"])
+        self.assertEqual(self.product_names(HTTP_X_SHOP_ID=self.branch.id), ["Salt"])
+
+    def test_shop_of_others_is_refused(self):
+        """Test that a shop the user isn't a member of can't be selected"""
+        other = get_user_model().objects.create_user(
+            username="other", password="testpass", is_owner=True
+        )
+        other_shop = models.Shop.objects.create(name="Other", owner=other)
+
+        for shop_id in (other_shop.id, "branch"):
+            res = self.client.get(PRODUCT_URL, HTTP_X_SHOP_ID=shop_id)
+            self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_shop_is_one_query_with_cached_memberships(self):
+        """Test that multi shop owners pay one query for their shop"""
+        self.product_names()
+
+        with self.assertNumQueries(2):
+            # the membership with its shop, then the products
+            self.product_names(HTTP_X_SHOP_ID=self.branch.id)
+
+    def test_membership_role_decides(self):
+        """Test that the role in the active shop is the one checked"""
+        salesman = get_user_model().objects.create_user(
+            username="salesman", password="testpass", is_manager=True
+        )
+        models.ShopMembership.objects.create(
+            user=salesman, shop=self.branch, role=models.ShopMembership.SALESMAN
+        )
+        self.client.force_authenticate(user=salesman)
+
+        self.assertEqual(self.product_names(), ["Salt"])
+        res = self.client.post(PRODUCT_URL, {"name": "Sugar"})
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_staff_join_the_active_shop_of_the_owner(self):
+        """Test that staff created by an owner are members of the owner shop"""
+        res = self.client.post(
+            CREATE_USER_URL,
+            {
+                "username": "manager",
+                "name": "Manager",
+                "password": "testpass",
+                "is_manager": True,
+            },
+            HTTP_X_SHOP_ID=self.branch.id,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        membership = models.ShopMembership.objects.get(user_id=res.data["id"])
+        self.assertEqual(membership.shop, self.branch)
+        self.assertEqual(membership.role, models.ShopMembership.MANAGER)
+
+    def test_staff_lists_follow_the_active_shop(self):
+        """Test that staff are listed for the selected shop by membership"""
+        manager = get_user_model().objects.create_user(
+            username="manager", password="testpass", is_manager=True
+        )
+        salesman = get_user_model().objects.create_user(
+            username="salesman", password="testpass", is_salesman=True
+        )
+        models.ShopMembership.objects.create(
+            user=manager, shop=self.branch, role=models.ShopMembership.MANAGER
+        )
+        models.ShopMembership.objects.create(
+            user=salesman, shop=self.branch, role=models.ShopMembership.SALESMAN
+        )
+
+        def listed(url, **headers):
+            res = self.client.get(url, **headers)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            return sorted(user["id"] for user in res.data)
+
+        branch = {"HTTP_X_SHOP_ID": self.branch.id}
+        self.assertEqual(listed(SALESMAN_URL), [])
+        self.assertEqual(listed(SALESMAN_URL, **branch), [salesman.id])
+        self.assertEqual(listed(MANAGER_URL, **branch), [manager.id])
+        self.assertEqual(listed(USER_LIST_URL), [self.owner.id])
+        self.assertEqual(
+            listed(USER_LIST_URL, **branch),
+            sorted([self.owner.id, manager.id, salesman.id]),
+        )
+
+    def test_new_owner_replaces_the_previous_one(self):
+        """Test that changing the owner of a shop moves the owner membership"""
+        successor = get_user_model().objects.create_user(
+            username="successor", password="testpass", is_owner=True
+        )
+        self.assertEqual(self.product_names(HTTP_X_SHOP_ID=self.branch.id), ["Salt"])
+
+        branch = models.Shop.objects.get(pk=self.branch.pk)
+        branch.owner = successor
+        branch.save()
+
+        res = self.client.get(PRODUCT_URL, HTTP_X_SHOP_ID=self.branch.id)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(
+            models.ShopMembership.objects.get(shop=self.branch).user, successor
+        )
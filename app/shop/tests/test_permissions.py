@@ -0,0 +1,103 @@
+import itertools
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+
+from shop.permissions import PERMISSION_MATRIX, has_access
+
+METHODS = ("GET", "HEAD", "OPTIONS", "POST", "PUT", "PATCH", "DELETE")
+SAFE = ("GET", "HEAD", "OPTIONS")
+
+
+def staff_or_owner(owner_methods, staff_methods):
+    def rule(user, method):
+        if user.is_owner:
+            return owner_methods is None or method in owner_methods
+
+        return (user.is_manager or user.is_salesman) and method in staff_methods
+
+    return rule
+
+
+def any_role(methods):
+    def rule(user, method):
+        has_role = user.is_owner or user.is_manager or user.is_salesman
+        return has_role and method in methods
+
+    return rule
+
+
+def product_rule(user, method):
+    if user.is_owner:
+        return True
+    if user.is_manager and method in ("POST", "GET", "PUT", "PATCH"):
+        return True
+    return user.is_salesman and method == "GET"
+
+
+def ordered_items_rule(user, method):
+    if method == "PATCH":
+        return False
+
+    return staff_or_owner(None, ("POST", "GET", "PUT"))(user, method)
+
+
+# the rules of the permission classes before the matrix and of the resources
+# added since, user with a shop
+LEGACY_RULES = {
+    "warehouse": staff_or_owner(None, SAFE),
+    "product": product_rule,
+    "customer": staff_or_owner(None, SAFE),
+    "vendor": staff_or_owner(None, SAFE),
+    "transaction": staff_or_owner(None, ("POST", "GET", "PUT", "PATCH")),
+    "bill": any_role(("GET", "PUT", "PATCH")),
+    "due_list": any_role(SAFE),
+    "ordered_items": ordered_items_rule,
+    "move_product": any_role(("GET", "POST")),
+    "expense": staff_or_owner(None, ("GET", "POST")),
+    "report": any_role(("GET", "POST")),
+    "owner_report": staff_or_owner(SAFE, ()),
+    "job": any_role(("GET", "POST")),
+    "checkout": any_role(("POST",)),
+    "archive": any_role(SAFE),
+}
+
+
+def sample_request(flags, method, has_shop):
+    user = SimpleNamespace(
+        **dict(zip(("is_superuser", "is_owner", "is_manager", "is_salesman"), flags))
+    )
+    request = SimpleNamespace(user=user, method=method)
+    request._resolved_shop = object() if has_shop else None
+    return request
+
+
+class PermissionMatrixTests(SimpleTestCase):
+    def test_matrix_matches_legacy_rules(self):
+        """Test every role, resource and method against the previous rules"""
+        for flags in itertools.product((False, True), repeat=4):
+            for resource, method, has_shop in itertools.product(
+                LEGACY_RULES, METHODS, (False, True)
+            ):
+                request = sample_request(flags, method, has_shop)
+                expected = has_shop and LEGACY_RULES[resource](request.user, method)
+
+                with self.subTest(flags=flags, resource=resource, method=method):
+                    self.assertEqual(has_access(request, resource), bool(expected))
+
+    def test_shop_resource(self):
+        """Test that superusers manage shops and owners edit their own"""
+        for flags in itertools.product((False, True), repeat=4):
+            for method, has_shop in itertools.product(METHODS, (False, True)):
+                request = sample_request(flags, method, has_shop)
+                user = request.user
+                expected = user.is_superuser or (
+                    user.is_owner and has_shop and method in ("GET", "PUT", "PATCH")
+                )
+
+                with self.subTest(flags=flags, method=method, has_shop=has_shop):
+                    self.assertEqual(has_access(request, "shop"), expected)
+
+    def test_every_resource_is_covered(self):
+        """Test that the matrix has no resource without legacy rules"""
+        self.assertEqual(set(PERMISSION_MATRIX), set(LEGACY_RULES) | {"shop"})
@@ -0,0 +1,60 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import models
+from shop import serializers
+from shop.readers import ValuesReader
+
+PRODUCT_URL = reverse("shop:product-list")
+
+
+class ValuesReaderTests(TestCase):
+    def setUp(self):
+        owner = get_user_model().objects.create_user(
+            username="owner", password="testpass", is_owner=True
+        )
+        self.shop = models.Shop.objects.create(name="Test shop", owner=owner)
+        models.Product.objects.create(name="Rice", sku="8901", shop=self.shop)
+        models.Product.objects.create(name="Salt", shop=self.shop, stock=4)
+        customer = models.Customer.objects.create(
+            name="Karim", contact="0171", shop=self.shop
+        )
+        vendor = models.Vendor.objects.create(name="Rahim", shop=self.shop)
+        models.CustomerTrasnscation.objects.create(shop=self.shop, customer=customer)
+        models.VendorTrasnscation.objects.create(shop=self.shop, vendor=vendor)
+        self.client = APIClient()
+        self.client.force_authenticate(user=owner)
+
+    def assertSameRows(self, serializer_class, queryset):
+        serialized = serializer_class(queryset, many=True).data
+
+        self.assertEqual(
+            ValuesReader(serializer_class).rows(queryset),
+            [dict(row) for row in serialized],
+        )
+
+    def test_rows_match_the_serializers(self):
+        """Test that read rows are identical to the serializer output"""
+        self.assertSameRows(serializers.ProductSerializer, models.Product.objects.all())
+        self.assertSameRows(
+            serializers.CustomerSerializer, models.Customer.objects.all()
+        )
+        self.assertSameRows(
+            serializers.CustomerTrasnscationBillSerializer,
+            models.CustomerTrasnscationBill.objects.all(),
+        )
+        self.assertSameRows(
+            serializers.VendorTrasnscationBillSerializer,
+            models.VendorTrasnscationBill.objects.all(),
+        )
+
+    def test_list_endpoint_renders_the_serializer_output(self):
+        """Test that the product list body is the one of the serializer"""
+        res = self.client.get(PRODUCT_URL)
+
+        products = models.Product.objects.for_shop(self.shop)
+        expected = serializers.ProductSerializer(products, many=True).data
+        self.assertEqual(res.json(), [dict(row) for row in expected])
@@ -0,0 +1,200 @@
+from datetime import date, datetime, timedelta
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core import models
+from shop.reports import daily_bills
+from shop.renderers import msgpack
+
+
+CUSTOMER_DUE_LEDGER_URL = reverse("shop:customer_due_ledger-list")
+SELL_REPORT_URL = reverse("shop:sell_report-list")
+OWNER_REPORT_URL = reverse("shop:owner_report-list")
+
+
+class DueLedgerTests(TestCase):
+    def setUp(self):
+        owner = get_user_model().objects.create_user(
+            username="owner", password="testpass", is_owner=True
+        )
+        self.shop = models.Shop.objects.create(name="Test shop", owner=owner)
+        self.client = APIClient()
+        self.client.force_authenticate(user=owner)
+
+    def sample_bill(self, customer, due, age):
+        order = models.CustomerTrasnscation.objects.create(
+            shop=self.shop, customer=customer
+        )
+        models.CustomerTrasnscationBill.objects.filter(order=order).update(
+            bill=due, due=due, created_timestamp=timezone.now() - timedelta(days=age)
+        )
+
+    def test_due_ledger_groups_by_customer(self):
+        """Test that dues are summed per customer with aging buckets"""
+        karim = models.Customer.objects.create(name="Karim", shop=self.shop)
+        rahim = models.Customer.objects.create(name="Rahim", shop=self.shop)
+        self.sample_bill(karim, 100, 2)
+        self.sample_bill(karim, 50, 45)
+        self.sample_bill(karim, 0, 90)
+        self.sample_bill(rahim, 20, 75)
+
+        res = self.client.get(CUSTOMER_DUE_LEDGER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 2)
+        self.assertEqual(res.data[0]["customer"], karim.id)
+        self.assertEqual(res.data[0]["total_due"], 150)
+        self.assertEqual(res.data[0]["transactions"], 2)
+        self.assertEqual(res.data[0]["due_0_30"], 100)
+        self.assertEqual(res.data[0]["due_31_60"], 50)
+        self.assertEqual(res.data[0]["due_60_plus"], 0)
+        self.assertEqual(res.data[1]["due_60_plus"], 20)
+
+    def test_daily_bills_of_a_single_day(self):
+        """Test that the bills of other days are left out of a day report"""
+        customer = models.Customer.objects.create(name="Karim", shop=self.shop)
+        order = models.CustomerTrasnscation.objects.create(
+            shop=self.shop, customer=customer
+        )
+        now = timezone.now()
+        for age, bill in ((0, 30), (0, 20), (1, 100)):
+            models.CustomerOrderedItems.objects.create(
+                order=order,
+                shop=self.shop,
+                bill=bill,
+                created_timestamp=now - timedelta(days=age),
+            )
+
+        report = daily_bills(
+            models.CustomerOrderedItems, self.shop, str(timezone.localdate(now))
+        )
+
+        self.assertEqual(len(report), 1)
+        self.assertEqual(report[0]["bill"], 50)
+
+    def test_columnar_sell_report(self):
+        """Test that format=columnar returns parallel arrays of epoch days"""
+        customer = models.Customer.objects.create(name="Karim", shop=self.shop)
+        order = models.CustomerTrasnscation.objects.create(
+            shop=self.shop, customer=customer
+        )
+        now = timezone.now()
+        for age, bill in ((0, 30), (1, 100)):
+            models.CustomerOrderedItems.objects.create(
+                order=order,
+                shop=self.shop,
+                bill=bill,
+                created_timestamp=now - timedelta(days=age),
+            )
+
+        res = self.client.get(SELL_REPORT_URL, {"format": "columnar"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        today = (timezone.localdate(now) - date(1970, 1, 1)).days
+        self.assertEqual(res.json(), {"dates": [today - 1, today], "bills": [100, 30]})
+
+    @skipUnless(msgpack, "msgpack is not installed")
+    def test_msgpack_sell_report(self):
+        """Test that format=msgpack returns the columnar arrays in MessagePack"""
+        res = self.client.get(SELL_REPORT_URL, {"format": "msgpack"})
+
+        self.assertEqual(res["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(res.content), {"dates": [], "bills": []})
+
+
+class OwnerReportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = get_user_model().objects.create_user(
+            username="owner", password="testpass", is_owner=True
+        )
+        self.shop = models.Shop.objects.create(name="Main branch", owner=self.owner)
+        self.branch = models.Shop.objects.create(name="Branch", owner=self.owner)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.owner)
+        self.march = timezone.make_aware(datetime(2026, 3, 10, 12))
+
+    def sample_sale(self, shop, bill):
+        customer = models.Customer.objects.create(name="Karim", shop=shop)
+        order = models.CustomerTrasnscation.objects.create(shop=shop, customer=customer)
+        models.CustomerOrderedItems.objects.create(
+            order=order, shop=shop, bill=bill, created_timestamp=self.march
+        )
+
+    def report(self, **params):
+        params = {"start": "2026-02-01", "end": "2026-03-31", **params}
+        return self.client.get(OWNER_REPORT_URL, params)
+
+    def test_report_groups_by_shop_and_month(self):
+        """Test that every shop of the owner is summed per month"""
+        self.sample_sale(self.shop, 100)
+        self.sample_sale(self.shop, 20)
+        self.sample_sale(self.branch, 50)
+        models.Expense.objects.create(
+            shop=self.branch, amount=7, created_timestamp=self.march
+        )
+        models.DailyBillRollup.objects.create(
+            shop=self.branch,
+            kind=models.DailyBillRollup.SELL,
+            date=date(2026, 2, 5),
+            bill=300,
+        )
+
+        res = self.report()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        rows = [
+            (row["shop"], row["period"], row["sales"], row["expenses"])
+            for row in res.data["shops"]
+        ]
+        self.assertEqual(
+            rows,
+            [
+                (self.branch.id, date(2026, 2, 1), 300, 0),
+                (self.shop.id, date(2026, 3, 1), 120, 0),
+                (self.branch.id, date(2026, 3, 1), 50, 7),
+            ],
+        )
+        self.assertEqual(
+            [(row["period"], row["sales"]) for row in res.data["totals"]],
+            [(date(2026, 2, 1), 300), (date(2026, 3, 1), 170)],
+        )
+
+    def test_report_is_cached_per_period(self):
+        """Test that a repeated report is served from the cache"""
+        self.sample_sale(self.shop, 100)
+        self.report()
+        self.sample_sale(self.shop, 20)
+
+        with self.assertNumQueries(1):
+            # the membership of the active shop only
+            res = self.report()
+        self.assertEqual(res.data["totals"][0]["sales"], 100)
+
+        res = self.report(period="day")
+        self.assertEqual(res.data["totals"][0]["period"], date(2026, 3, 10))
+        self.assertEqual(res.data["totals"][0]["sales"], 120)
+
+    def test_report_is_for_owners(self):
+        """Test that staff and unknown periods are refused"""
+        self.assertEqual(
+            self.report(period="year").status_code, status.HTTP_400_BAD_REQUEST
+        )
+
+        manager = get_user_model().objects.create_user(
+            username="manager", password="testpass", is_manager=True
+        )
+        models.ShopMembership.objects.create(
+            user=manager, shop=self.shop, role=models.ShopMembership.MANAGER
+        )
+        self.client.force_authenticate(user=manager)
+
+        self.assertEqual(self.report().status_code, status.HTTP_403_FORBIDDEN)
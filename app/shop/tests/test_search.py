@@ -0,0 +1,60 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core import models
+
+PRODUCT_URL = reverse("shop:product-list")
+CUSTOMER_URL = reverse("shop:customer-list")
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.owner = get_user_model().objects.create_user(
+            username="owner", password="testpass", is_owner=True
+        )
+        self.shop = models.Shop.objects.create(name="Test shop", owner=self.owner)
+
+        other = get_user_model().objects.create_user(
+            username="other", password="testpass", is_owner=True
+        )
+        self.other_shop = models.Shop.objects.create(name="Other shop", owner=other)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.owner)
+
+    def test_search_products_by_prefix(self):
+        """Test that products are searched by name prefix in the user shop"""
+        models.Product.objects.create(name="Rice", shop=self.shop)
+        models.Product.objects.create(name="rice flour", shop=self.shop)
+        models.Product.objects.create(name="Salt", shop=self.shop)
+        models.Product.objects.create(name="Rice", shop=self.other_shop)
+
+        res = self.client.get(PRODUCT_URL, {"search": "ric"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [product["name"] for product in res.data], ["Rice", "rice flour"]
+        )
+
+    def test_search_customers_by_contact(self):
+        """Test that customers are searched by contact too"""
+        models.Customer.objects.create(name="Karim", contact="0171", shop=self.shop)
+        models.Customer.objects.create(name="Rahim", contact="0181", shop=self.shop)
+
+        res = self.client.get(CUSTOMER_URL, {"search": "017"})
+
+        self.assertEqual([customer["name"] for customer in res.data], ["Karim"])
+
+    @override_settings(SEARCH_RESULTS_LIMIT=2)
+    def test_search_results_are_limited(self):
+        """Test that no more than SEARCH_RESULTS_LIMIT results are returned"""
+        for name in ("Rice 1", "Rice 2", "Rice 3"):
+            models.Product.objects.create(name=name, shop=self.shop)
+
+        res = self.client.get(PRODUCT_URL, {"search": "rice"})
+
+        self.assertEqual(len(res.data), 2)
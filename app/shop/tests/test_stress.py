@@ -0,0 +1,32 @@
+import logging
+
+from django.db import connection
+from django.test import TransactionTestCase
+
+from core import models
+from shop.stress import StressRun
+
+
+class StressTests(TransactionTestCase):
+    def setUp(self):
+        # rejected writes are expected, keep their warnings out of the output
+        logging.disable(logging.WARNING)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def test_invariants_hold_under_concurrent_writes(self):
+        """Test that stock and cash match the recorded movements and payments"""
+        threads = 4 if connection.vendor == "postgresql" else 1
+
+        report = StressRun(threads=threads, operations=120, seed=1).run()
+
+        self.assertEqual(report["violations"], [])
+        self.assertFalse(
+            [
+                outcome
+                for counts in report["outcomes"].values()
+                for outcome in counts
+                if outcome.startswith("error")
+            ]
+        )
+        self.assertFalse(models.Shop.objects.exists())
+        self.assertFalse(models.User.objects.exists())
@@ -0,0 +1,85 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core import models
+from shop import serializers
+
+PRODUCT_URL = reverse("shop:product-list")
+CUSTOMER_TRANSACTION_URL = reverse("shop:customertrasnscation-list")
+
+
+class TenancyTests(TestCase):
+    def setUp(self):
+        self.owner = get_user_model().objects.create_user(
+            username="owner", password="testpass", is_owner=True
+        )
+        self.shop = models.Shop.objects.create(name="Test shop", owner=self.owner)
+
+        other = get_user_model().objects.create_user(
+            username="other", password="testpass", is_owner=True
+        )
+        self.other_shop = models.Shop.objects.create(name="Other shop", owner=other)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.owner)
+
+    def test_for_shop_filters_by_shop(self):
+        """Test that for_shop only returns the objects of the shop"""
+        models.Product.objects.create(name="Rice", shop=self.shop)
+        models.Product.objects.create(name="Salt", shop=self.other_shop)
+
+        products = models.Product.objects.for_shop(self.shop)
+
+        self.assertEqual([product.name for product in products], ["Rice"])
+
+    def test_products_of_other_shops_are_hidden(self):
+        """Test that the api lists and creates objects in the user shop only"""
+        models.Product.objects.create(name="Salt", shop=self.other_shop)
+
+        res = self.client.post(PRODUCT_URL, {"name": "Rice"})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res = self.client.get(PRODUCT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([product["name"] for product in res.data], ["Rice"])
+        self.assertEqual(res.data[0]["shop"], self.shop.id)
+
+    def test_shop_is_resolved_once_per_request(self):
+        """Test that the middleware and the permissions share the shop lookup"""
+        with self.assertNumQueries(2):
+            # the user shop, then the products
+            res = self.client.get(PRODUCT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_serializing_does_not_resolve_the_shop(self):
+        """Test that related field querysets are only used when validating"""
+        customer = models.Customer.objects.create(name="Karim", shop=self.shop)
+        orders = [
+            models.CustomerTrasnscation.objects.create(
+                shop=self.shop, customer=customer
+            )
+            for i in range(3)
+        ]
+
+        with self.assertNumQueries(0):
+            # the request has no shop, any lookup would raise
+            data = serializers.CustomerTrasnscationSerializer(
+                orders, many=True, context={"request": object()}
+            ).data
+
+        self.assertEqual(len(data), 3)
+
+    def test_related_objects_of_other_shops_are_rejected(self):
+        """Test that a customer of another shop can't be used"""
+        customer = models.Customer.objects.create(name="Salt", shop=self.other_shop)
+
+        res = self.client.post(CUSTOMER_TRANSACTION_URL, {"customer": customer.id})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("customer", res.data)
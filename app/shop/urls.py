@@ -13,14 +13,19 @@ router.register("customer_transactions", views.CustomerTrasnscationViewSet)
 router.register("customer_transactions_detail", views.CustomerOrderedItemsViewSet)
 router.register("customer_bill", views.CustomerTrasnscationBillViewSet)
 router.register("customer_bill_due", views.CustomerDueListViewSet, basename="customer_bill_due")
+router.register("customer_due_ledger", views.CustomerDueLedgerViewSet, basename="customer_due_ledger")
 router.register("vendor_transactions", views.VendorTrasnscationViewSet)
 router.register("vendor_transactions_detail", views.VendorOrderedItemsViewSet)
 router.register("vendor_bill", views.VendorTrasnscationBillViewSet)
 router.register("vendor_bill_due", views.VendorDueListViewSet, basename="vendor_bill_due")
+router.register("vendor_due_ledger", views.VendorDueLedgerViewSet, basename="vendor_due_ledger")
 router.register("move_product", views.MoveProductViewSet)
 router.register("expense", views.ExpenseViewSet)
 router.register("purchase_report", views.PurchaseReportViewSet, basename='purchase_report')
 router.register("sell_report", views.SellReportViewSet, basename='sell_report')
+router.register("owner_report", views.OwnerReportViewSet, basename='owner_report')
+router.register("jobs", views.JobViewSet)
+router.register("archive", views.ArchiveViewSet)
 
 
 
@@ -30,6 +35,7 @@ urlpatterns = [
     path("", include(router.urls)),
     path("salesman/", views.SalesmanViewSet.as_view(), name="salesman"),
     path("manager/", views.ManagerViewSet.as_view(), name="manager"),
+    path("checkout/", views.CheckoutView.as_view(), name="checkout"),
     path("purchase_report/<str:date>/", views.PurchaseReportViewSet.as_view({'get': 'list'})),
     path("sell_report/<str:date>/", views.SellReportViewSet.as_view({'get': 'list'})),
 ]
@@ -1,14 +1,26 @@
-from core import models
-from shop import serializers
+import json
+import os
+
+from core import codes, memberships, models
+from core.views import send_file
+from shop import serializers, jobs, services
+from shop.importers import ProductImporter, CustomerImporter, decode_upload
+from shop.reports import PERIODS, daily_bills, due_ledger, owner_report, to_date
+from shop.filters import TrigramSearchFilter
+from shop.renderers import REPORT_RENDERERS
+from shop.readers import ValuesReader
 
 from rest_framework import viewsets, status, filters, generics, mixins
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.views import APIView
 from rest_framework.decorators import api_view
+from rest_framework.exceptions import NotFound, ValidationError
 
-from rest_framework.authentication import TokenAuthentication
-from django.db.models import Avg, Sum
+from user.authentication import SignedTokenAuthentication
+from django.conf import settings
+from django.db import transaction
+from django.utils.cache import patch_cache_control
 
 from shop.permissions import (
     ShopAccessPermission,
@@ -23,30 +35,24 @@ from shop.permissions import (
     MoveProductPermission,
     ExpensePermission,
     ReportViewPermission,
+    OwnerReportPermission,
+    JobPermission,
+    ArchivePermission,
+    CheckoutPermission,
 )
 
 
-def getShop(user):
-    if user.is_owner:
-        return models.Shop.objects.get(owner=user)
-
-    if user.is_manager or user.is_salesman:
-        created_by = user.created_by
-        return models.Shop.objects.get(owner=created_by)
-
-
 class ShopViewSet(viewsets.ModelViewSet):
     """Manage shops"""
 
     queryset = models.Shop.objects.all()
     serializer_class = serializers.ShopSerializer
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (SignedTokenAuthentication,)
     permission_classes = (ShopAccessPermission,)
 
     def get_queryset(self):
         if not self.request.user.is_superuser:
-            own_shop = getShop(self.request.user)
-            return self.queryset.filter(pk=own_shop.id)
+            return self.queryset.filter(pk=self.request.shop.id)
 
         return self.queryset
 
@@ -60,21 +66,90 @@ class ShopViewSet(viewsets.ModelViewSet):
 class BaseShopAttr(viewsets.ModelViewSet):
     """Base class for WarehouseViewSet and ProductViewSet"""
 
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (SignedTokenAuthentication,)
 
     def perform_create(self, serializer):
-        own_shop = getShop(self.request.user)
-        print(own_shop)
-        serializer.save(shop=own_shop)
+        serializer.save(shop=self.request.shop)
 
     def get_queryset(self):
         if not self.request.user.is_superuser:
-            own_shop = getShop(self.request.user)
-            return self.queryset.filter(shop=own_shop)
+            return self.queryset.for_shop(self.request.shop)
 
         return self.queryset
 
 
+class AtomicWritesMixin:
+    """
+    Validate and save writes in one transaction.
+
+    The validation of these serializers updates stock and money, a failing
+    save must roll those updates back, and rows locked while validating
+    stay locked until the write is saved.
+    """
+
+    def create(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().create(request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().update(request, *args, **kwargs)
+
+
+class ValuesListMixin:
+    """Lists with a ValuesReader, no model instances nor serializers per row"""
+
+    _readers = {}
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        reader = self._readers.get(serializer_class)
+
+        if reader is None:
+            reader = self._readers[serializer_class] = ValuesReader(serializer_class)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(reader.rows(queryset))
+
+
+class CSVImportMixin:
+    """Adds a bulk csv import endpoint to a shop viewset"""
+
+    importer_class = None
+    import_kind = None
+
+    @action(methods=["POST"], detail=False, url_path="import")
+    def import_csv(self, request):
+        """upsert objects of the shop from an uploaded csv file"""
+        upload = request.FILES.get("file")
+
+        if upload is None:
+            return Response(
+                {"file": ["No file was submitted."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        own_shop = request.shop
+
+        if request.data.get("background") in ("1", "true", "True"):
+            # big files are imported by the workers
+            name = jobs.save_upload(upload, "imports")
+            job = jobs.enqueue(
+                "import",
+                shop=own_shop,
+                user=request.user,
+                payload={"kind": self.import_kind, "file": name},
+            )
+            return Response(
+                serializers.JobSerializer(job).data, status=status.HTTP_202_ACCEPTED
+            )
+
+        importer = self.importer_class(own_shop)
+        report = importer.run(decode_upload(upload))
+
+        return Response(report, status=status.HTTP_200_OK)
+
+
 class WarehouseViewSet(BaseShopAttr):
     """Manage warehouses"""
 
@@ -91,51 +166,78 @@ class WarehouseProductsView(BaseShopAttr):
     permission_classes = (WarehouseAccessPermission,)
 
 
-class ProductViewSet(BaseShopAttr):
+class ProductViewSet(ValuesListMixin, CSVImportMixin, BaseShopAttr):
     """Manage products"""
 
+    importer_class = ProductImporter
+    import_kind = "products"
     queryset = models.Product.objects.all()
     serializer_class = serializers.ProductSerializer
     permission_classes = (ProductAccessPermission,)
 
+    filter_backends = (TrigramSearchFilter,)
+    search_fields = ("name",)
+
+    @action(methods=["GET"], detail=False, url_path="by-code/(?P<code>[^/]+)")
+    def by_code(self, request, code=None):
+        """product of a scanned barcode or sku"""
+        product = codes.find_products(request.shop, [code]).get(code)
+
+        if product is None:
+            raise NotFound("Unknown product code.")
+
+        return Response(self.get_serializer(product).data)
+
+
+def shop_staff(shop, role):
+    """Users holding the role in the shop, nobody without a shop"""
+    if not shop:
+        return models.User.objects.none()
+
+    return models.User.objects.filter(
+        shopmembership__shop=shop, shopmembership__role=role
+    )
+
 
 class SalesmanViewSet(APIView):
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (SignedTokenAuthentication,)
 
     def get(self, request, format=None):
-        queryset = models.User.objects.all()
-        queryset = queryset.filter(
-            created_by=getShop(self.request.user).owner, is_salesman=True
-        )
+        queryset = shop_staff(self.request.shop, models.ShopMembership.SALESMAN)
         return Response(serializers.SalesmanSerializer(queryset, many=True).data)
 
 
 class ManagerViewSet(APIView):
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (SignedTokenAuthentication,)
 
     def get(self, request, format=None):
-        queryset = models.User.objects.all()
-        queryset = queryset.filter(
-            created_by=getShop(self.request.user).owner, is_manager=True
-        )
+        queryset = shop_staff(self.request.shop, models.ShopMembership.MANAGER)
         return Response(serializers.SalesmanSerializer(queryset, many=True).data)
 
 
-class CustomerViewSet(BaseShopAttr):
+class CustomerViewSet(ValuesListMixin, CSVImportMixin, BaseShopAttr):
     """Manage customer"""
 
+    importer_class = CustomerImporter
+    import_kind = "customers"
     queryset = models.Customer.objects.all()
     serializer_class = serializers.CustomerSerializer
     permission_classes = (CustomerAccessPermission,)
 
+    filter_backends = (TrigramSearchFilter,)
+    search_fields = ("name", "contact")
+
 
-class VendorViewSet(BaseShopAttr):
+class VendorViewSet(ValuesListMixin, BaseShopAttr):
     """Manage vendor"""
 
     queryset = models.Vendor.objects.all()
     serializer_class = serializers.VendorSerializer
     permission_classes = (VendorAccessPermission,)
 
+    filter_backends = (TrigramSearchFilter,)
+    search_fields = ("name", "contact")
+
 
 class CustomerTrasnscationViewSet(BaseShopAttr):
     """Manage transaction of customer"""
@@ -145,10 +247,10 @@ class CustomerTrasnscationViewSet(BaseShopAttr):
     permission_classes = (CustomerTransactionPermission,)
 
 
-class CustomerOrderedItemsViewSet(viewsets.ModelViewSet):
+class CustomerOrderedItemsViewSet(AtomicWritesMixin, viewsets.ModelViewSet):
     """Manage customer ordered items of a single order"""
 
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (SignedTokenAuthentication,)
     queryset = models.CustomerOrderedItems.objects.all()
     serializer_class = serializers.CustomerOrderedItemsSerializer
     permission_classes = (CustomerOrderedItemsPermission,)
@@ -163,12 +265,10 @@ class CustomerOrderedItemsViewSet(viewsets.ModelViewSet):
     """
 
     def perform_create(self, serializer):
-        own_shop = getShop(self.request.user)
-        serializer.save(shop=own_shop)
+        serializer.save(shop=self.request.shop)
 
     def get_queryset(self):
-        own_shop = getShop(self.request.user)
-        return self.queryset.filter(shop=own_shop)
+        return self.queryset.for_shop(self.request.shop)
 
     def get_serializer_class(self):
         if self.request.method in ["PUT", "PATCH"]:
@@ -202,7 +302,26 @@ class CustomerOrderedItemsViewSet(viewsets.ModelViewSet):
     #         return Response(status=status.HTTP_404_NOT_FOUND)
 
 
-class CustomerTrasnscationBillViewSet(BaseShopAttr):
+class CheckoutView(APIView):
+    """Sell products to a customer: transaction, lines, stock and bill at once"""
+
+    authentication_classes = (SignedTokenAuthentication,)
+    permission_classes = (CheckoutPermission,)
+
+    def post(self, request, format=None):
+        serializer = serializers.CheckoutSerializer(
+            data=request.data, context={"request": request}
+        )
+        serializer.is_valid(raise_exception=True)
+
+        order = services.checkout(request.shop, **serializer.validated_data)
+
+        return Response(
+            serializers.CheckoutSerializer(order).data, status=status.HTTP_201_CREATED
+        )
+
+
+class CustomerTrasnscationBillViewSet(AtomicWritesMixin, ValuesListMixin, BaseShopAttr):
     """Manage bill of a transaction"""
 
     queryset = models.CustomerTrasnscationBill.objects.all()
@@ -219,15 +338,37 @@ class CustomerTrasnscationBillViewSet(BaseShopAttr):
     """
 
 
-class CustomerDueListViewSet(BaseShopAttr):
+class CustomerDueListViewSet(ValuesListMixin, BaseShopAttr):
     """Show customer transactions who has due"""
 
+    read_from_replica = True
     serializer_class = serializers.CustomerTrasnscationBillSerializer
     permission_classes = (CustomerTrasnscationDueListPermission,)
 
     def get_queryset(self):
-        own_shop = getShop(self.request.user)
-        return models.CustomerTrasnscationBill.objects.filter(shop=own_shop, due__gt=0)
+        return models.CustomerTrasnscationBill.objects.for_shop(
+            self.request.shop
+        ).filter(due__gt=0)
+
+
+class DueLedgerViewSet(viewsets.ViewSet):
+    """Shows total due per customer or vendor with aging buckets"""
+
+    read_from_replica = True
+    authentication_classes = (SignedTokenAuthentication,)
+    permission_classes = (CustomerTrasnscationDueListPermission,)
+    renderer_classes = REPORT_RENDERERS
+
+    bill_model = None
+    party = None
+
+    def list(self, request):
+        return Response(due_ledger(self.bill_model, self.party, request.shop))
+
+
+class CustomerDueLedgerViewSet(DueLedgerViewSet):
+    bill_model = models.CustomerTrasnscationBill
+    party = "customer"
 
 
 class VendorTrasnscationViewSet(BaseShopAttr):
@@ -238,10 +379,10 @@ class VendorTrasnscationViewSet(BaseShopAttr):
     permission_classes = (CustomerTransactionPermission,)
 
 
-class VendorOrderedItemsViewSet(viewsets.ModelViewSet):
+class VendorOrderedItemsViewSet(AtomicWritesMixin, viewsets.ModelViewSet):
     """Manage Vendor ordered items of a single order"""
 
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (SignedTokenAuthentication,)
     queryset = models.VendorOrderedItems.objects.all()
     serializer_class = serializers.VendorOrderedItemsSerializer
     permission_classes = (CustomerOrderedItemsPermission,)
@@ -265,21 +406,29 @@ class VendorOrderedItemsViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(transaction, data=request.data)
 
         if serializer.is_valid():
+            # variants of the previous image are regenerated by the workers
+            for variant in (transaction.thumbnail, transaction.image_webp):
+                if variant:
+                    variant.delete(save=False)
+
             serializer.save()
+            jobs.enqueue(
+                "transaction_image",
+                shop=transaction.shop,
+                payload={"item": transaction.pk},
+            )
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def perform_create(self, serializer):
-        own_shop = getShop(self.request.user)
-        serializer.save(shop=own_shop)
+        serializer.save(shop=self.request.shop)
 
     def get_queryset(self):
-        own_shop = getShop(self.request.user)
-        return self.queryset.filter(shop=own_shop)
+        return self.queryset.for_shop(self.request.shop)
 
 
-class VendorTrasnscationBillViewSet(BaseShopAttr):
+class VendorTrasnscationBillViewSet(AtomicWritesMixin, ValuesListMixin, BaseShopAttr):
     """Manage bill of a transaction"""
 
     queryset = models.VendorTrasnscationBill.objects.all()
@@ -296,18 +445,25 @@ class VendorTrasnscationBillViewSet(BaseShopAttr):
     """
 
 
-class VendorDueListViewSet(BaseShopAttr):
+class VendorDueListViewSet(ValuesListMixin, BaseShopAttr):
     """Show Vendor transactions who has due"""
 
+    read_from_replica = True
     serializer_class = serializers.VendorTrasnscationBillSerializer
     permission_classes = (CustomerTrasnscationDueListPermission,)
 
     def get_queryset(self):
-        own_shop = getShop(self.request.user)
-        return models.VendorTrasnscationBill.objects.filter(shop=own_shop, due__gt=0)
+        return models.VendorTrasnscationBill.objects.for_shop(
+            self.request.shop
+        ).filter(due__gt=0)
+
 
+class VendorDueLedgerViewSet(DueLedgerViewSet):
+    bill_model = models.VendorTrasnscationBill
+    party = "vendor"
 
-class MoveProductViewSet(BaseShopAttr):
+
+class MoveProductViewSet(AtomicWritesMixin, BaseShopAttr):
     """Moving products shop to warehouse"""
 
     queryset = models.MoveProduct.objects.all()
@@ -326,51 +482,23 @@ class ExpenseViewSet(BaseShopAttr):
 class ReportViewSet(viewsets.ViewSet):
     """Shows purchase report group by day"""
 
-    authentication_classes = (TokenAuthentication,)
+    read_from_replica = True
+    authentication_classes = (SignedTokenAuthentication,)
     permission_classes = (ReportViewPermission,)
+    renderer_classes = REPORT_RENDERERS
+    # array names of ?format=columnar, dates are days since 1970-01-01
+    columnar_fields = {"date": "dates", "bill": "bills"}
 
     def getModel(self):
         pass
 
-    # Ref of Group by SUM
-    # https://stackoverflow.com/questions/18144907/how-to-rename-fields-of-an-annotated-query/38104242
-
     def list(self, request, **kwargs):
 
-        user = models.User.objects.get(id=request.user.id)
-        own_shop = getShop(user)
-
-        if kwargs:
-            # if user want to get report of a specific date
-            date = kwargs["date"]
-
-            queryset = (
-                self.getModel()
-                .objects.filter(shop=own_shop)
-                .values("created_timestamp__date")
-                .annotate(bill=Sum("bill"))
-                .filter(created_timestamp__date=date)
-            )
-
-            queryset = [
-                {"date": x["created_timestamp__date"], "bill": x["bill"]}
-                for x in queryset
-            ]
-            return Response(queryset)
-
-        # if user want to see all report
-        queryset = (
-            self.getModel()
-            .objects.filter(shop=own_shop)
-            .values("created_timestamp__date")
-            .annotate(bill=Sum("bill"))
+        # date is in kwargs, if user want to get report of a specific date
+        return Response(
+            daily_bills(self.getModel(), request.shop, kwargs.get("date"))
         )
 
-        queryset = [
-            {"date": x["created_timestamp__date"], "bill": x["bill"]} for x in queryset
-        ]
-        return Response(queryset)
-
 
 class PurchaseReportViewSet(ReportViewSet):
     def getModel(self):
@@ -379,4 +507,123 @@ class PurchaseReportViewSet(ReportViewSet):
 
 class SellReportViewSet(ReportViewSet):
     def getModel(self):
-        return models.CustomerOrderedItems
\ No newline at end of file
+        return models.CustomerOrderedItems
+
+
+class OwnerReportViewSet(viewsets.ViewSet):
+    """Shows sales, purchases, expenses and dues of every shop of the owner"""
+
+    read_from_replica = True
+    authentication_classes = (SignedTokenAuthentication,)
+    permission_classes = (OwnerReportPermission,)
+
+    def list(self, request):
+        params = request.query_params
+        period = params.get("period", "month")
+
+        if period not in PERIODS:
+            raise ValidationError(
+                {"period": [f"Expected one of {', '.join(PERIODS)}."]}
+            )
+
+        bounds = {}
+        for name in ("start", "end"):
+            try:
+                bounds[name] = to_date(params[name]) if name in params else None
+            except ValueError as exc:
+                raise ValidationError({name: [str(exc)]})
+
+        shop_ids = [
+            shop_id
+            for shop_id, role in memberships.shop_roles(request.user.pk).items()
+            if role == models.ShopMembership.OWNER
+        ]
+        if not shop_ids:
+            # owners without memberships have a single shop
+            shop_ids = [request.shop.pk]
+
+        return Response(owner_report(request.user.pk, shop_ids, period, **bounds))
+
+
+class JobViewSet(
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.ListModelMixin,
+    viewsets.GenericViewSet,
+):
+    """Submit background jobs and follow their status"""
+
+    authentication_classes = (SignedTokenAuthentication,)
+    queryset = models.Job.objects.all()
+    serializer_class = serializers.JobSerializer
+    permission_classes = (JobPermission,)
+
+    def get_queryset(self):
+        return self.queryset.for_shop(self.request.shop).order_by("-id")
+
+    @action(methods=["GET"], detail=True)
+    def download(self, request, pk=None):
+        """file written by a finished job, for members of its shop only"""
+        job = self.get_object()
+        result = json.loads(job.result) if job.status == models.Job.DONE else None
+        response = None
+
+        if isinstance(result, dict) and result.get("file"):
+            response = send_file(
+                request,
+                settings.JOB_FILES_ROOT,
+                result["file"],
+                settings.JOB_FILES_ACCEL_PREFIX,
+            )
+
+        if response is None:
+            raise NotFound("The job has no file.")
+
+        patch_cache_control(response, private=True, no_store=True)
+        response["Content-Disposition"] = (
+            f'attachment; filename="{os.path.basename(result["file"])}"'
+        )
+        return response
+
+    def perform_create(self, serializer):
+        serializer.instance = jobs.enqueue(
+            serializer.validated_data["kind"],
+            shop=self.request.shop,
+            user=self.request.user,
+            payload=serializer.validated_data["payload"],
+        )
+
+
+class ArchiveViewSet(viewsets.ReadOnlyModelViewSet):
+    """Look up archived transactions, filtered by kind, order or party"""
+
+    read_from_replica = True
+    authentication_classes = (SignedTokenAuthentication,)
+    queryset = models.ArchivedTransaction.objects.all()
+    serializer_class = serializers.ArchivedTransactionSerializer
+    permission_classes = (ArchivePermission,)
+
+    def get_queryset(self):
+        queryset = self.queryset.for_shop(self.request.shop)
+
+        for param in ("kind", "order_id", "party_id"):
+            value = self.request.query_params.get(param)
+
+            if value is None:
+                continue
+            if param != "kind" and not value.isdigit():
+                return queryset.none()
+
+            queryset = queryset.filter(**{param: value})
+
+        if self.action == "list":
+            # the compressed details are only read one at a time
+            queryset = queryset.defer("data")
+
+        return queryset.order_by("-created_timestamp", "-id")
+
+    def get_serializer_class(self):
+        if self.action == "retrieve":
+            return serializers.ArchivedTransactionDetailSerializer
+
+        return self.serializer_class
@@ -0,0 +1,130 @@
+import hashlib
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from core import memberships, models
+from shop.tenancy import legacy_shop
+
+ACCESS_TOKEN_SALT = "user.authentication.access"
+
+# role flags packed in the "r" claim of an access token
+ROLE_FLAGS = (
+    ("is_owner", 1),
+    ("is_manager", 2),
+    ("is_salesman", 4),
+    ("is_superuser", 8),
+    ("is_staff", 16),
+)
+
+
+def hash_key(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def token_shop_id(user):
+    """Id of the default shop of the user, the first one it is a member of"""
+    shop_ids = memberships.shop_roles(user.pk)
+    if shop_ids:
+        return min(shop_ids)
+
+    # users without memberships: owners own it, staff via created_by
+    try:
+        shop = legacy_shop(user)
+    except (models.Shop.DoesNotExist, models.Shop.MultipleObjectsReturned):
+        return None
+
+    return shop.pk if shop is not None else None
+
+
+def issue_access_token(user):
+    """Signed, timestamped token carrying everything needed per request"""
+    payload = {
+        "u": user.pk,
+        "s": token_shop_id(user),
+        "c": user.created_by_id,
+        "r": sum(flag for attr, flag in ROLE_FLAGS if getattr(user, attr)),
+    }
+    return signing.dumps(payload, salt=ACCESS_TOKEN_SALT, compress=True)
+
+
+def issue_tokens(user):
+    """Issue an access token and a new refresh token for the user"""
+    refresh = secrets.token_urlsafe(32)
+    models.RefreshToken.objects.create(
+        user=user,
+        key_hash=hash_key(refresh),
+        expires=timezone.now() + timedelta(seconds=settings.REFRESH_TOKEN_LIFETIME),
+    )
+
+    return {
+        "token": issue_access_token(user),
+        "refresh": refresh,
+        "expires_in": settings.ACCESS_TOKEN_LIFETIME,
+    }
+
+
+def revoke_refresh_token(key):
+    """Revoke a usable refresh token and return it, raises if there is none"""
+    msg = _("Invalid or expired refresh token.")
+
+    try:
+        token = models.RefreshToken.objects.select_related("user").get(
+            key_hash=hash_key(key), revoked=False, expires__gt=timezone.now()
+        )
+    except models.RefreshToken.DoesNotExist:
+        raise exceptions.AuthenticationFailed(msg)
+
+    # conditional update, so concurrent requests can't use a token twice
+    revoked = models.RefreshToken.objects.filter(pk=token.pk, revoked=False).update(
+        revoked=True, modified_timestamp=timezone.now()
+    )
+
+    if not revoked:
+        raise exceptions.AuthenticationFailed(msg)
+
+    if not token.user.is_active:
+        raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+
+    return token
+
+
+def token_user(payload):
+    """Build the request user from the token claims, without a query"""
+    user = models.User(
+        id=payload["u"],
+        created_by_id=payload["c"],
+        **{attr: bool(payload["r"] & flag) for attr, flag in ROLE_FLAGS},
+    )
+    user._state.adding = False
+    user._state.db = "default"
+    user.token_shop_id = payload["s"]
+    return user
+
+
+class SignedTokenAuthentication(TokenAuthentication):
+    """
+    Authenticate with signed access tokens, verified in memory.
+
+    The request user only has the fields carried by the token, views that
+    need the full profile must load it. Permanent tokens issued before are
+    still accepted, at the cost of a query.
+    """
+
+    def authenticate_credentials(self, key):
+        try:
+            payload = signing.loads(
+                key, salt=ACCESS_TOKEN_SALT, max_age=settings.ACCESS_TOKEN_LIFETIME
+            )
+        except signing.SignatureExpired:
+            raise exceptions.AuthenticationFailed(_("Token expired."))
+        except signing.BadSignature:
+            return super().authenticate_credentials(key)
+
+        return (token_user(payload), payload)
@@ -1,7 +1,10 @@
-from rest_framework import serializers
+from rest_framework import serializers, exceptions
 from django.contrib.auth import get_user_model, authenticate
 from django.utils.translation import ugettext_lazy as _
 
+from core.models import ShopMembership
+from user.throttling import login_limiters
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for the User object"""
@@ -34,7 +37,15 @@ class UserSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         """creates user with encrypted password and retruns the user"""
-        return get_user_model().objects.create_user(**validated_data)
+        user = get_user_model().objects.create_user(**validated_data)
+
+        # staff work for the active shop of the owner creating them
+        shop = getattr(self.context["request"], "shop", None)
+        role = "manager" if user.is_manager else "salesman" if user.is_salesman else None
+        if shop and role:
+            ShopMembership.objects.create(user=user, shop=shop, role=role)
+
+        return user
 
     def update(self, instance, validated_data):
         """Update a user, setting the password correctly and return it"""
@@ -63,14 +74,29 @@ class AuthtokenSerializer(serializers.Serializer):
         """validate and authticate the user"""
         username = data.get("username")
         password = data.get("password")
+        request = self.context.get("request")
 
-        user = authenticate(
-            request=self.context.get("request"), username=username, password=password
-        )
+        # refuse floods before spending CPU on password hashing
+        username_limiter, ip_limiter = login_limiters()
+        ip = request.META.get("REMOTE_ADDR") if request else None
+
+        if not ip_limiter.allow(ip) or not username_limiter.allow(username.lower()):
+            msg = _("Too many login attempts, try again later.")
+            raise exceptions.Throttled(detail=msg)
+
+        user = authenticate(request=request, username=username, password=password)
 
         if not user:
             msg = _("Unable to authenticate with provided credentials")
             raise serializers.ValidationError(msg, code="authentication")
 
+        username_limiter.reset(username.lower())
+
         data["user"] = user
         return data
+
+
+class RefreshTokenSerializer(serializers.Serializer):
+    """Serializer for refreshing or revoking tokens"""
+
+    refresh = serializers.CharField(trim_whitespace=False)
@@ -0,0 +1,94 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+
+from core import models
+from user.authentication import SignedTokenAuthentication, token_shop_id
+
+TOKEN_URL = reverse("user:token")
+REFRESH_URL = reverse("user:token-refresh")
+REVOKE_URL = reverse("user:token-revoke")
+ME_URL = reverse("user:me")
+
+
+class SignedTokenTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="owner", password="testpass", name="Owner", is_owner=True
+        )
+        self.shop = models.Shop.objects.create(name="Test shop", owner=self.user)
+        self.client = APIClient()
+
+    def obtain_tokens(self):
+        res = self.client.post(TOKEN_URL, {"username": "owner", "password": "testpass"})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_access_token_is_verified_without_queries(self):
+        """Test that the access token carries user, shop and roles"""
+        tokens = self.obtain_tokens()
+
+        with self.assertNumQueries(0):
+            user, payload = SignedTokenAuthentication().authenticate_credentials(
+                tokens["token"]
+            )
+
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertTrue(user.is_owner)
+        self.assertFalse(user.is_salesman)
+        self.assertEqual(user.token_shop_id, self.shop.pk)
+
+    def test_users_without_a_shop_get_no_shop_claim(self):
+        """Test that the token shop is not guessed for users without a shop"""
+        models.Shop.objects.create(name="Ownerless shop")
+        staff = get_user_model().objects.create_user(
+            username="staff", password="testpass", is_salesman=True
+        )
+        plain = get_user_model().objects.create_user(
+            username="plain", password="testpass"
+        )
+
+        self.assertIsNone(token_shop_id(staff))
+        self.assertIsNone(token_shop_id(plain))
+
+    def test_authenticated_requests(self):
+        """Test that profile and shop endpoints work with an access token"""
+        tokens = self.obtain_tokens()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {tokens['token']}")
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["name"], "Owner")
+
+        res = self.client.get(reverse("shop:product-list"))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(ACCESS_TOKEN_LIFETIME=-1)
+    def test_expired_access_token_rejected(self):
+        """Test that access tokens expire"""
+        tokens = self.obtain_tokens()
+
+        with self.assertRaises(AuthenticationFailed):
+            SignedTokenAuthentication().authenticate_credentials(tokens["token"])
+
+    def test_refresh_token_rotates_and_revokes(self):
+        """Test that a refresh token can be used once and revoked"""
+        tokens = self.obtain_tokens()
+
+        res = self.client.post(REFRESH_URL, {"refresh": tokens["refresh"]})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        rotated = res.data["refresh"]
+        self.assertNotEqual(rotated, tokens["refresh"])
+
+        res = self.client.post(REFRESH_URL, {"refresh": tokens["refresh"]})
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        res = self.client.post(REVOKE_URL, {"refresh": rotated})
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+        res = self.client.post(REFRESH_URL, {"refresh": rotated})
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
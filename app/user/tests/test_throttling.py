@@ -0,0 +1,66 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from user.throttling import SlidingWindowLimiter
+
+TOKEN_URL = reverse("user:token")
+
+
+class SlidingWindowLimiterTests(TestCase):
+    def setUp(self):
+        caches["ratelimit"].clear()
+
+    def test_limit_within_window(self):
+        """Test that attempts above the limit are refused"""
+        limiter = SlidingWindowLimiter("test", 3, 60)
+
+        allowed = [limiter.allow("key", now=600 + i) for i in range(4)]
+
+        self.assertEqual(allowed, [True, True, True, False])
+
+    def test_previous_window_is_weighted(self):
+        """Test that the previous window counts less as time passes"""
+        limiter = SlidingWindowLimiter("test", 3, 60)
+        for i in range(3):
+            limiter.allow("key", now=630 + i)
+
+        self.assertFalse(limiter.allow("key", now=660))
+        self.assertTrue(limiter.allow("key", now=705))
+
+
+@override_settings(LOGIN_RATE_PER_USERNAME=(3, 60))
+class LoginThrottlingTests(TestCase):
+    def setUp(self):
+        caches["ratelimit"].clear()
+        get_user_model().objects.create_user(username="salesman", password="testpass")
+        self.client = APIClient()
+
+    def test_login_throttled_after_failures(self):
+        """Test that repeated failed logins are throttled per username"""
+        for i in range(3):
+            res = self.client.post(
+                TOKEN_URL, {"username": "salesman", "password": "wrong"}
+            )
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(
+            TOKEN_URL, {"username": "salesman", "password": "testpass"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_successful_login_resets_username_window(self):
+        """Test that a successful login clears the failures of the username"""
+        payload = {"username": "salesman", "password": "wrong"}
+        self.client.post(TOKEN_URL, payload)
+        self.client.post(TOKEN_URL, payload)
+        self.client.post(TOKEN_URL, {"username": "salesman", "password": "testpass"})
+
+        res = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,64 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class SlidingWindowLimiter:
+    """
+    Approximate sliding window counter kept in the local cache.
+
+    The window is split in two fixed buckets, the previous one is weighted
+    by how much of it still overlaps the sliding window.
+    """
+
+    def __init__(self, scope, limit, window, cache_alias="ratelimit"):
+        self.scope = scope
+        self.limit = limit
+        self.window = window
+        self.cache = caches[cache_alias]
+
+    def cache_key(self, key, bucket):
+        return f"{self.scope}:{key}:{bucket}"
+
+    def count(self, key, now=None):
+        now = time.time() if now is None else now
+        bucket, elapsed = divmod(now, self.window)
+        counts = self.cache.get_many(
+            [self.cache_key(key, bucket), self.cache_key(key, bucket - 1)]
+        )
+        current = counts.get(self.cache_key(key, bucket), 0)
+        previous = counts.get(self.cache_key(key, bucket - 1), 0)
+
+        return current + previous * (1 - elapsed / self.window)
+
+    def allow(self, key, now=None):
+        """Record an attempt, returns False if the key is over the limit"""
+        now = time.time() if now is None else now
+
+        if self.count(key, now) >= self.limit:
+            return False
+
+        cache_key = self.cache_key(key, now // self.window)
+        # buckets live for two windows, then they can't overlap anymore
+        if not self.cache.add(cache_key, 1, timeout=2 * self.window):
+            try:
+                self.cache.incr(cache_key)
+            except ValueError:
+                # expired between add and incr
+                self.cache.set(cache_key, 1, timeout=2 * self.window)
+        return True
+
+    def reset(self, key):
+        now = time.time()
+        bucket = now // self.window
+        self.cache.delete_many(
+            [self.cache_key(key, bucket), self.cache_key(key, bucket - 1)]
+        )
+
+
+def login_limiters():
+    return (
+        SlidingWindowLimiter("login-username", *settings.LOGIN_RATE_PER_USERNAME),
+        SlidingWindowLimiter("login-ip", *settings.LOGIN_RATE_PER_IP),
+    )
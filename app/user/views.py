@@ -2,12 +2,18 @@ from rest_framework import generics, authentication, permissions, mixins
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 from rest_framework import status, viewsets, filters
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.authentication import TokenAuthentication
 from django.db.models import Q
 
 from user.permissions import ProfileAccessPermission
+from user.authentication import (
+    SignedTokenAuthentication,
+    issue_tokens,
+    revoke_refresh_token,
+)
 from user import serializers
 from core import models
 
@@ -16,14 +22,14 @@ class CreateUserAPIView(generics.CreateAPIView):
     """Creates a new user in the system"""
 
     serializer_class = serializers.UserSerializer
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (SignedTokenAuthentication,)
     permission_classes = (ProfileAccessPermission,)
 
 
 class UserListView(viewsets.ModelViewSet):
     queryset = models.User.objects.all()
     serializer_class = serializers.UserSerializer
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (SignedTokenAuthentication,)
     permission_classes = (ProfileAccessPermission,)
 
     def get_queryset(self):
@@ -33,13 +39,18 @@ class UserListView(viewsets.ModelViewSet):
             return queryset
 
         if self.request.user.is_owner:
-            """if user is owner, then return self and manangers, salesmans created by him"""
-
-            queryset = queryset.filter(
-                Q(created_by=self.request.user) | Q(pk=self.request.user.id)
+            # if user is owner, then return self and the staff of the active shop
+            if not self.request.shop:
+                return queryset.filter(pk=self.request.user.id)
+
+            staff = Q(
+                shopmembership__shop=self.request.shop,
+                shopmembership__role__in=(
+                    models.ShopMembership.MANAGER,
+                    models.ShopMembership.SALESMAN,
+                ),
             )
-
-            return queryset
+            return queryset.filter(staff | Q(pk=self.request.user.id)).distinct()
 
 
 class CreateTokenView(ObtainAuthToken):
@@ -48,14 +59,56 @@ class CreateTokenView(ObtainAuthToken):
     serializer_class = serializers.AuthtokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(
+            data=request.data, context={"request": request}
+        )
+        serializer.is_valid(raise_exception=True)
+
+        return Response(issue_tokens(serializer.validated_data["user"]))
+
+
+class RefreshTokenView(APIView):
+    """Exchange a refresh token for a new access and refresh token"""
+
+    authentication_classes = ()
+    permission_classes = ()
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+
+    def post(self, request, format=None):
+        serializer = serializers.RefreshTokenSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # refresh tokens are single use
+        token = revoke_refresh_token(serializer.validated_data["refresh"])
+
+        return Response(issue_tokens(token.user))
+
+
+class RevokeTokenView(APIView):
+    """Revoke a refresh token, e.g. on logout"""
+
+    authentication_classes = ()
+    permission_classes = ()
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+
+    def post(self, request, format=None):
+        serializer = serializers.RefreshTokenSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        revoke_refresh_token(serializer.validated_data["refresh"])
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
 
     serializer_class = serializers.UserSerializer
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (SignedTokenAuthentication,)
     permission_classes = (IsAuthenticated, ProfileAccessPermission)
 
     def get_object(self):
         """Retrive and return authenticated user"""
-        return self.request.user
+        # the token user only carries the claims of the token
+        return models.User.objects.get(pk=self.request.user.pk)
@@ -0,0 +1,127 @@
+"""
+Compare the stdlib JSON renderer with the orjson one on big list responses.
+
+    python scripts/bench_json.py --rows 5000 --repeat 20
+
+The rows are built in memory like the ordered items and warehouse products
+lists render them, serializers included, so no database is needed. Prints
+the render time and the size of the body of each endpoint and renderer.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+
+def sample_data(rows):
+    from django.utils import timezone
+
+    from core import models
+    from shop import serializers
+
+    now = timezone.now()
+    shop = models.Shop(id=1, name="Shop")
+    warehouse = models.Warehouse(id=1, name="Main", shop=shop)
+    products = [
+        models.Product(
+            id=i,
+            name=f"Product {i}",
+            sku=f"890{i:06}",
+            shop=shop,
+            selling_price=120,
+            buying_price=100,
+            stock=50,
+            created_timestamp=now,
+            modified_timestamp=now,
+        )
+        for i in range(rows)
+    ]
+    ordered_items = [
+        models.CustomerOrderedItems(
+            id=i,
+            order_id=i // 10,
+            shop=shop,
+            product=product,
+            product_detail=product,
+            custom_selling_price=110,
+            quantity=2,
+            bill=220,
+            created_timestamp=now,
+            modified_timestamp=now,
+        )
+        for i, product in enumerate(products)
+    ]
+    warehouse_products = [
+        models.WareHouseProducts(
+            id=i,
+            shop=shop,
+            warehouse=warehouse,
+            product=product,
+            quantity=50,
+            created_timestamp=now,
+            modified_timestamp=now,
+        )
+        for i, product in enumerate(products)
+    ]
+
+    return {
+        "customer_ordered_items": serializers.CustomerOrderedItemsSerializer(
+            ordered_items, many=True
+        ).data,
+        "warehouse_products": serializers.WarehouseProductsSerializer(
+            warehouse_products, many=True
+        ).data,
+    }
+
+
+def bench(renderer, data, repeat):
+    started = time.perf_counter()
+
+    for _ in range(repeat):
+        body = renderer.render(data)
+
+    return (time.perf_counter() - started) / repeat, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    settings.configure(
+        INSTALLED_APPS=[
+            "django.contrib.auth",
+            "django.contrib.contenttypes",
+            "rest_framework",
+            "core",
+        ],
+        AUTH_USER_MODEL="core.User",
+        USE_TZ=True,
+    )
+    django.setup()
+
+    from rest_framework.renderers import JSONRenderer
+
+    from core.renderers import ORJSONRenderer, orjson
+
+    renderers = [("json", JSONRenderer())]
+    if orjson is not None:
+        renderers.append(("orjson", ORJSONRenderer()))
+    else:
+        print("orjson is not installed, only the stdlib renderer is measured")
+
+    for endpoint, data in sample_data(args.rows).items():
+        for name, renderer in renderers:
+            seconds, size = bench(renderer, data, args.repeat)
+            print(f"{endpoint:24} {name:7} {seconds * 1000:8.1f} ms {size:10} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Measure password verifications per second on one core for each hasher.
+
+    python scripts/bench_login.py --seconds 3
+
+Every login runs one verification, so the numbers are the login capacity of
+a single core. Hashers whose library is not installed are skipped.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+
+def bench(hasher_path, seconds):
+    from django.contrib.auth.hashers import get_hasher
+    from django.utils.module_loading import import_string
+
+    hasher = get_hasher(import_string(hasher_path).algorithm)
+    encoded = hasher.encode("correct horse", hasher.salt())
+    count = 0
+    started = time.perf_counter()
+
+    while time.perf_counter() - started < seconds:
+        hasher.verify("correct horse", encoded)
+        count += 1
+
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--pbkdf2-iterations", type=int, default=150000)
+    parser.add_argument("--argon2-time-cost", type=int, default=2)
+    parser.add_argument("--argon2-memory-cost", type=int, default=512)
+    parser.add_argument("--bcrypt-rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    hashers = [
+        "core.hashers.TunedPBKDF2PasswordHasher",
+        "core.hashers.TunedArgon2PasswordHasher",
+        "core.hashers.TunedBCryptSHA256PasswordHasher",
+    ]
+    settings.configure(
+        PASSWORD_HASHERS=hashers,
+        PASSWORD_PBKDF2_ITERATIONS=args.pbkdf2_iterations,
+        PASSWORD_ARGON2_TIME_COST=args.argon2_time_cost,
+        PASSWORD_ARGON2_MEMORY_COST=args.argon2_memory_cost,
+        PASSWORD_ARGON2_PARALLELISM=1,
+        PASSWORD_BCRYPT_ROUNDS=args.bcrypt_rounds,
+    )
+    django.setup()
+
+    for hasher_path in hashers:
+        name = hasher_path.rsplit(".", 1)[-1]
+
+        try:
+            rate = bench(hasher_path, args.seconds)
+        except ValueError as exc:
+            print(f"{name:34} skipped: {exc}")
+            continue
+
+        print(f"{name:34} {rate:8.1f} logins/s per core")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Compare listing with the model serializers and with the values() readers.
+
+    python scripts/bench_reads.py --rows 5000 --repeat 5
+
+Runs on an in-memory SQLite database filled with products, customers and
+transaction bills, and prints the time to build each list both ways. The
+database reads are included in both timings.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+
+def fill(rows):
+    from core import models
+
+    shop = models.Shop.objects.create(name="Shop")
+    models.Product.objects.bulk_create(
+        models.Product(name=f"Product {i}", shop=shop, stock=i) for i in range(rows)
+    )
+    models.Customer.objects.bulk_create(
+        models.Customer(name=f"Customer {i}", contact=f"{i:011}", shop=shop)
+        for i in range(rows)
+    )
+    customer = models.Customer.objects.first()
+    for _ in range(rows):
+        models.CustomerTrasnscation.objects.create(shop=shop, customer=customer)
+
+
+def bench(build, repeat):
+    started = time.perf_counter()
+
+    for _ in range(repeat):
+        build()
+
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    settings.configure(
+        INSTALLED_APPS=[
+            "django.contrib.auth",
+            "django.contrib.contenttypes",
+            "rest_framework",
+            "core",
+        ],
+        DATABASES={
+            "default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}
+        },
+        AUTH_USER_MODEL="core.User",
+        TIME_ZONE="UTC",
+        USE_TZ=True,
+    )
+    django.setup()
+
+    from django.apps import apps
+    from django.db import connection
+
+    from core import models
+    from shop import serializers
+    from shop.readers import ValuesReader
+
+    # tables straight from the models, the migrations need the app settings
+    with connection.schema_editor() as editor:
+        for model in apps.get_models():
+            editor.create_model(model)
+    fill(args.rows)
+
+    lists = (
+        ("product", serializers.ProductSerializer, models.Product),
+        ("customer", serializers.CustomerSerializer, models.Customer),
+        (
+            "customer bill",
+            serializers.CustomerTrasnscationBillSerializer,
+            models.CustomerTrasnscationBill,
+        ),
+    )
+
+    for name, serializer_class, model in lists:
+        reader = ValuesReader(serializer_class)
+        serialized = bench(
+            lambda: serializer_class(model.objects.all(), many=True).data,
+            args.repeat,
+        )
+        read = bench(lambda: reader.rows(model.objects.all()), args.repeat)
+        print(
+            f"{name:14} serializer {serialized * 1000:8.1f} ms "
+            f"values {read * 1000:8.1f} ms  x{serialized / read:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
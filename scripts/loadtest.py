@@ -0,0 +1,88 @@
+"""
+Small HTTP load generator to compare serving setups.
+
+    python scripts/loadtest.py http://localhost:8000/api/shop/product/ \
+        --token <token> --concurrency 32 --duration 30
+
+Run it once against `docker-compose up` (runserver) and once against
+`docker-compose -f docker-compose.prod.yml up` (gunicorn) with the same
+arguments and compare the requests per second and latencies.
+"""
+
+import argparse
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+def worker(url, headers, deadline, latencies, errors, lock):
+    # one keep-alive-less request per iteration, like many mobile clients
+    while time.monotonic() < deadline:
+        request = urllib.request.Request(url, headers=headers)
+        start = time.monotonic()
+
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+            failed = False
+        except (urllib.error.URLError, OSError):
+            failed = True
+
+        elapsed = time.monotonic() - start
+
+        with lock:
+            if failed:
+                errors.append(elapsed)
+            else:
+                latencies.append(elapsed)
+
+
+def percentile(values, pct):
+    index = min(len(values) - 1, int(len(values) * pct / 100))
+    return values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("url")
+    parser.add_argument("--token", help="API token sent in the Authorization header")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0)
+    args = parser.parse_args()
+
+    headers = {"Accept": "application/json"}
+    if args.token:
+        headers["Authorization"] = f"Token {args.token}"
+
+    latencies, errors = [], []
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.duration
+    threads = [
+        threading.Thread(
+            target=worker, args=(args.url, headers, deadline, latencies, errors, lock)
+        )
+        for _ in range(args.concurrency)
+    ]
+
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    print(f"requests:    {len(latencies)} ok, {len(errors)} failed")
+    print(f"throughput:  {len(latencies) / elapsed:.1f} req/s")
+
+    if latencies:
+        print(f"latency p50: {percentile(latencies, 50) * 1000:.1f} ms")
+        print(f"latency p95: {percentile(latencies, 95) * 1000:.1f} ms")
+        print(f"latency p99: {percentile(latencies, 99) * 1000:.1f} ms")
+        print(f"latency avg: {statistics.mean(latencies) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()